@@ -0,0 +1,360 @@
+"""Micro-benchmark suite for the numeric kernels in ``services/``.
+
+Run from ``backend/``:
+
+    python -m benchmarks.run                   # run, compare with baseline.json
+    python -m benchmarks.run --filter pdr      # only cases whose name contains "pdr"
+    python -m benchmarks.run --update          # re-record baseline.json
+    python -m benchmarks.run --threshold 0.5   # allowed slowdown (default 0.25)
+
+Every case is parameterised by input size (anchors, reference points, APs,
+samples) so scaling regressions show up as well as constant-factor ones.
+Each case runs in repeats of at least ``MIN_REPEAT_S`` seconds, and the
+best per-call time is kept. The best time is the least noisy statistic on
+a shared machine. Short cases get more repeats (``REPEATS`` up to
+``MAX_REPEATS``, within ``MEASURE_BUDGET_S`` per case), since a
+millisecond-scale case is hit hardest by one scheduler hiccup.
+
+A case regresses when it is slower than ``(1 + threshold) ×`` its baseline
+even after ``RETRIES`` re-measurements, and the run then exits with status
+1. ``--update`` records the median of ``UPDATE_RUNS`` measurements, so one
+unusually quiet moment does not set a bar later runs cannot reach. 
+The baseline records the environment (Python / NumPy / SciPy versions, CPU)
+it was taken in. When the current environment differs, timings are still
+shown but the gate is skipped with a warning – a different machine is not a
+regression – unless ``--ignore-environment`` is given. Re-record the
+baseline with ``--update`` after an intended speed change or on a different
+machine, and commit it together with the change it measures.
+"""
+
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+import numpy as np
+from typing import Callable, Dict, List, Optional
+
+from services.trilateration import trilaterate_ls, trilaterate_wls
+from services.ftm import multilaterate
+from services.fingerprinting import knn_match, weighted_knn_match, knn_match_batch, knn_match_rssi_dict
+from services.pdr import detect_steps, weinberg_stride_length, estimate_heading, compute_trajectory, PDRStream
+from services.ble import smooth_rssi_kalman, smooth_rssi_kalman_batch, RSSIStateTable
+from services.device_free import WelfordBaseline, detect_anomaly, SlidingPresenceDetector
+from services.analysis import compute_cdf, error_statistics, ErrorSketch
+
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+MIN_REPEAT_S = 0.05
+REPEATS = 5
+MAX_REPEATS = 25
+MEASURE_BUDGET_S = 0.75
+RETRIES = 2
+UPDATE_RUNS = 3
+
+# name → factory returning the zero-argument callable to time
+CASES: Dict[str, Callable[[], Callable[[], object]]] = {}
+
+
+def case(name: str):
+    def register(factory):
+        CASES[name] = factory
+        return factory
+    return register
+
+
+def _rng():
+    return np.random.default_rng(0)
+
+
+# ─── Trilateration / FTM ─────────────────────────────────────────
+
+def _ranging(n_anchors: int):
+    rng = _rng()
+    anchors = rng.uniform(0, 50, (n_anchors, 2))
+    truth = rng.uniform(10, 40, 2)
+    d = np.linalg.norm(anchors - truth, axis=1) + rng.normal(0, 0.5, n_anchors)
+    return [tuple(a) for a in anchors.tolist()], np.abs(d).tolist()
+
+
+for _n in (4, 16, 64):
+    for _name, _solver in (
+        ("trilateration.ls", trilaterate_ls),
+        ("trilateration.wls", trilaterate_wls),
+        ("ftm.multilaterate", multilaterate),
+    ):
+        @case(f"{_name}[anchors={_n}]")
+        def _ranging_case(n=_n, solver=_solver):
+            anchors, distances = _ranging(n)
+            return lambda: solver(anchors, distances)
+
+
+# ─── Fingerprinting ──────────────────────────────────────────────
+
+def _radio_map(m: int, n: int):
+    rng = _rng()
+    return rng.uniform(-95, -30, (m, n)), rng.uniform(0, 50, (m, 2)), rng.uniform(-95, -30, n)
+
+
+for _m in (100, 1_000, 10_000):
+    for _name, _match in (("knn_match", knn_match), ("weighted_knn_match", weighted_knn_match)):
+        @case(f"fingerprinting.{_name}[refs={_m},aps=50]")
+        def _knn(m=_m, match=_match):
+            rm, coords, scan = _radio_map(m, 50)
+            return lambda: match(rm, coords, scan, 3)
+
+for _n in (20, 200):
+    @case(f"fingerprinting.knn_match_batch[scans=1000,refs=1000,aps={_n}]")
+    def _knn_batch(n=_n):
+        rm, coords, _ = _radio_map(1_000, n)
+        scans = _rng().uniform(-95, -30, (1_000, n))
+        return lambda: knn_match_batch(rm, coords, scans, 3, weighted=True)
+
+for _m in (100, 1_000):
+    @case(f"fingerprinting.knn_match_rssi_dict[refs={_m},aps=50]")
+    def _knn_dict(m=_m):
+        rng = _rng()
+        bssids = [f"ap{i}" for i in range(50)]
+        fp_db = {str(r): {b: float(v) for b, v in zip(bssids, rng.uniform(-95, -30, 50)) if v > -85}
+                 for r in range(m)}
+        fp_coords = {str(r): tuple(rng.uniform(0, 50, 2)) for r in range(m)}
+        scan = {b: float(v) for b, v in zip(bssids, rng.uniform(-95, -30, 50))}
+        return lambda: knn_match_rssi_dict(fp_db, fp_coords, scan, k=3)
+
+
+# ─── PDR ─────────────────────────────────────────────────────────
+
+def _imu(samples: int, rate: float = 100.0):
+    rng = _rng()
+    t = np.arange(samples) / rate
+    phase = 2 * np.pi * 1.8 * t
+    acc_z = 8.3 + 6.0 * np.maximum(np.sin(phase), 0.0) ** 2 + rng.normal(0, 0.08, samples)
+    acc_x = 0.6 * np.sin(phase / 2) + rng.normal(0, 0.08, samples)
+    acc_y = 0.3 * np.cos(phase) + rng.normal(0, 0.08, samples)
+    gyro_z = 0.05 * np.sin(0.1 * t) + rng.normal(0, 0.01, samples)
+    return acc_x, acc_y, acc_z, gyro_z
+
+
+for _s in (6_000, 60_000, 600_000):
+    @case(f"pdr.pipeline[samples={_s}]")
+    def _pdr(s=_s):
+        acc_x, acc_y, acc_z, gyro_z = _imu(s)
+
+        def run():
+            acc = np.sqrt(acc_x ** 2 + acc_y ** 2 + acc_z ** 2)
+            steps = detect_steps(acc, 100.0, 1.0, 30)
+            sl = weinberg_stride_length(acc, steps)
+            headings = estimate_heading(gyro_z, None, 0.01, 0.98, len(acc))
+            return compute_trajectory(steps, sl, headings)
+        return run
+
+    @case(f"pdr.stream[samples={_s},chunk=100]")
+    def _pdr_stream(s=_s):
+        chunks = [np.split(a, range(100, s, 100)) for a in _imu(s)]
+
+        def run():
+            stream = PDRStream()
+            for ax, ay, az, gz in zip(*chunks):
+                stream.push(ax, ay, az, gz)
+            return stream.flush()
+        return run
+
+
+# ─── BLE ─────────────────────────────────────────────────────────
+
+for _t in (1_000, 10_000):
+    @case(f"ble.smooth_rssi_kalman[samples={_t}]")
+    def _kalman(t=_t):
+        values = _rng().normal(-65, 4, t).tolist()
+        return lambda: smooth_rssi_kalman(values)
+
+for _b in (10, 200):
+    @case(f"ble.smooth_rssi_kalman_batch[samples=1000,beacons={_b}]")
+    def _kalman_batch(b=_b):
+        rssi = _rng().normal(-65, 4, (1_000, b))
+        rssi[_rng().random(rssi.shape) < 0.2] = np.nan
+        return lambda: smooth_rssi_kalman_batch(rssi)
+
+    @case(f"ble.RSSIStateTable.update_kalman[beacons={_b},batch=200]")
+    def _state_table(b=_b):
+        keys = [("device", f"beacon{i % b}") for i in range(200)]
+        values = _rng().normal(-65, 4, 200)
+        table = RSSIStateTable(window_size=5)
+        return lambda: table.update_kalman(keys, values)
+
+
+# ─── Device-free ─────────────────────────────────────────────────
+
+for _l in (10, 100, 1_000):
+    @case(f"device_free.WelfordBaseline.update[samples=1000,links={_l}]")
+    def _welford(links=_l):
+        rssi = _rng().normal(-60, 2, (1_000, links))
+        return lambda: WelfordBaseline(links).update(rssi)
+
+    @case(f"device_free.detect_anomaly[samples=1000,links={_l}]")
+    def _anomaly(links=_l):
+        rssi = _rng().normal(-60, 2, (1_000, links))
+        return lambda: detect_anomaly(rssi, np.full(links, -60.0), np.full(links, 2.0))
+
+    @case(f"device_free.SlidingPresenceDetector.push[samples=1000,links={_l}]")
+    def _sliding(links=_l):
+        chunks = np.split(_rng().normal(-60, 2, (1_000, links)), 10)
+
+        def run():
+            det = SlidingPresenceDetector(np.full(links, -60.0), np.full(links, 2.0), window_size=50)
+            for c in chunks:
+                det.push(c)
+        return run
+
+
+# ─── Analysis ────────────────────────────────────────────────────
+
+for _e in (1_000, 100_000, 1_000_000):
+    @case(f"analysis.compute_cdf[errors={_e}]")
+    def _cdf(e=_e):
+        errors = np.abs(_rng().normal(0, 3, e))
+        return lambda: compute_cdf(errors)
+
+    @case(f"analysis.error_statistics[errors={_e}]")
+    def _stats(e=_e):
+        errors = np.abs(_rng().normal(0, 3, e))
+        return lambda: error_statistics(errors)
+
+    @case(f"analysis.ErrorSketch.add[errors={_e}]")
+    def _sketch(e=_e):
+        errors = np.abs(_rng().normal(0, 3, e))
+        return lambda: ErrorSketch().add(errors)
+
+
+# ─── Runner ──────────────────────────────────────────────────────
+
+def measure(fn: Callable[[], object]) -> float:
+    """Best per-call time in seconds over ``REPEATS``..``MAX_REPEATS`` repeats of ≥ MIN_REPEAT_S."""
+    fn()                                   # warm-up (imports, caches, allocations)
+    number = 1
+    while True:
+        t0 = time.perf_counter()
+        for _ in range(number):
+            fn()
+        elapsed = time.perf_counter() - t0
+        if elapsed >= MIN_REPEAT_S:
+            break
+        number *= max(2, int(MIN_REPEAT_S / max(elapsed, 1e-9) * 1.2))
+    best = elapsed / number
+    repeats = min(max(REPEATS, int(MEASURE_BUDGET_S / elapsed)), MAX_REPEATS)
+    for _ in range(repeats - 1):
+        t0 = time.perf_counter()
+        for _ in range(number):
+            fn()
+        best = min(best, (time.perf_counter() - t0) / number)
+    return best
+
+
+def environment() -> Dict[str, str]:
+    import scipy
+    return {
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "scipy": scipy.__version__,
+        "machine": platform.machine(),
+        "processor": platform.processor() or platform.machine(),
+        "cpus": str(os.cpu_count()),
+    }
+
+
+def _fmt(seconds: float) -> str:
+    if seconds < 1e-3:
+        return f"{seconds * 1e6:9.1f} µs"
+    if seconds < 1.0:
+        return f"{seconds * 1e3:9.2f} ms"
+    return f"{seconds:9.3f} s "
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--filter", default="", help="run cases whose name contains this")
+    parser.add_argument("--threshold", type=float, default=0.25, help="allowed slowdown, 0.25 = 25%%")
+    parser.add_argument("--update", action="store_true", help="write results as the new baseline")
+    parser.add_argument("--baseline", default=BASELINE_PATH)
+    parser.add_argument("--list", action="store_true", help="list case names and exit")
+    parser.add_argument(
+        "--ignore-environment", action="store_true",
+        help="gate even when the baseline was recorded in a different environment",
+    )
+    args = parser.parse_args(argv)
+
+    names = [n for n in CASES if args.filter in n]
+    if args.list:
+        print("\n".join(names))
+        return 0
+    if not names:
+        parser.error(f"No cases match '{args.filter}'")
+
+    baseline: Dict[str, float] = {}
+    baseline_env: Dict[str, str] = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as fh:
+            stored = json.load(fh)
+        baseline = stored.get("results", {})
+        baseline_env = stored.get("environment", {})
+
+    env = environment()
+    env_diff = {
+        k: (baseline_env.get(k), v) for k, v in env.items() if baseline_env.get(k) != v
+    }
+    gate = not args.update and (not env_diff or args.ignore_environment)
+    if baseline and env_diff and not args.update:
+        print("WARNING: baseline was recorded in a different environment:")
+        for k, (old, new) in env_diff.items():
+            print(f"  {k}: {old} -> {new}")
+        if not args.ignore_environment:
+            print("Regression gate skipped; re-record with --update on this machine.\n")
+
+    width = max(len(n) for n in names)
+    print(f"{'case':<{width}}  {'time':>12}  {'baseline':>12}  ratio")
+    results, regressions = {}, []
+    for name in names:
+        fn = CASES[name]()
+        if args.update:
+            t = float(np.median([measure(fn) for _ in range(UPDATE_RUNS)]))
+        else:
+            t = measure(fn)
+        base = baseline.get(name)
+        # A slow result is re-measured before it counts: one-off interference
+        # (other processes, frequency scaling) only ever makes a case slower
+        for _ in range(RETRIES if gate else 0):
+            if not base or t <= base * (1 + args.threshold):
+                break
+            t = min(t, measure(fn))
+        results[name] = t
+        if base:
+            ratio = t / base
+            flag = "  REGRESSION" if ratio > 1 + args.threshold else ""
+            if flag:
+                regressions.append(name)
+            print(f"{name:<{width}}  {_fmt(t)}  {_fmt(base)}  {ratio:5.2f}{flag}")
+        else:
+            print(f"{name:<{width}}  {_fmt(t)}  {'—':>12}")
+
+    if args.update:
+        merged = dict(baseline)
+        merged.update(results)
+        with open(args.baseline, "w") as fh:
+            json.dump({"environment": env, "results": dict(sorted(merged.items()))}, fh, indent=2)
+            fh.write("\n")
+        print(f"Baseline written to {args.baseline}")
+        return 0
+
+    if regressions and not gate:
+        print(f"\n{len(regressions)} case(s) above {1 + args.threshold:.2f}× baseline (gate skipped)")
+        return 0
+    if regressions:
+        print(f"\n{len(regressions)} case(s) slower than {1 + args.threshold:.2f}× baseline:")
+        for name in regressions:
+            print(f"  {name}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
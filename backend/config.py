@@ -24,6 +24,10 @@ MAX_UPLOAD_SIZE_MB = 50
 ALLOWED_IMAGE_EXTENSIONS = {".png", ".jpg", ".jpeg", ".svg", ".bmp", ".gif"}
 ALLOWED_DATA_EXTENSIONS = {".csv", ".json"}
 
+# Cap on the total uncompressed size of an .npz body on the binary experiment
+# endpoints, read from the zip headers before any array is inflated.
+BINARY_MAX_UNCOMPRESSED_MB = int(os.getenv("BINARY_MAX_UNCOMPRESSED_MB", "256"))
+
 # Ingest API keys for the mobile collector app (comma-separated).
 # Override in production via the INGEST_API_KEYS env var.
 INGEST_API_KEYS = {
@@ -31,3 +35,63 @@ INGEST_API_KEYS = {
     for k in os.getenv("INGEST_API_KEYS", "dev-key").split(",")
     if k.strip()
 }
+
+# Idle timeout (seconds) for live PDR sessions pushed by the collector app
+PDR_SESSION_TTL_S = float(os.getenv("PDR_SESSION_TTL_S", "900"))
+
+# Idle timeout (seconds) for per-beacon live BLE filter state
+BLE_STATE_TTL_S = float(os.getenv("BLE_STATE_TTL_S", "600"))
+# Ring-buffer length (samples) of the live causal moving average
+BLE_LIVE_WINDOW = int(os.getenv("BLE_LIVE_WINDOW", "5"))
+
+# Idle timeout (seconds) for real-time DFP presence detectors
+DFP_DETECTOR_TTL_S = float(os.getenv("DFP_DETECTOR_TTL_S", "3600"))
+
+# Thread pool size for the multi-engine evaluation endpoint. 1 runs engines
+# sequentially so their wall_time_s / throughput are not skewed by each other.
+EVALUATION_MAX_WORKERS = int(os.getenv("EVALUATION_MAX_WORKERS", "1"))
+
+# Floor occupancy grid: cell size (m) and grayscale level below which a pixel is a wall
+OCCUPANCY_CELL_M = float(os.getenv("OCCUPANCY_CELL_M", "0.1"))
+OCCUPANCY_WALL_THRESHOLD = int(os.getenv("OCCUPANCY_WALL_THRESHOLD", "128"))
+
+# Radio-map densification: background worker threads and maximum grid cells per job
+DENSIFY_MAX_WORKERS = int(os.getenv("DENSIFY_MAX_WORKERS", "1"))
+DENSIFY_MAX_CELLS = int(os.getenv("DENSIFY_MAX_CELLS", "200000"))
+
+# Radio tomographic imaging: maximum voxels per image and links (AP pairs) per model
+RTI_MAX_VOXELS = int(os.getenv("RTI_MAX_VOXELS", "200000"))
+RTI_MAX_LINKS = int(os.getenv("RTI_MAX_LINKS", "2000"))
+
+# On-demand request profiling (X-Profile header or ?profile=1 with an X-Admin-Key).
+# Disabled – and the middleware not installed – unless admin keys are set.
+PROFILER_ADMIN_KEYS = {
+    k.strip()
+    for k in os.getenv("PROFILER_ADMIN_KEYS", "").split(",")
+    if k.strip()
+}
+# Sampling interval; the sampler needs the GIL, so below the 5 ms switch interval buys little
+PROFILE_INTERVAL_S = float(os.getenv("PROFILE_INTERVAL_S", "0.005"))
+PROFILE_MAX_ARTIFACTS = int(os.getenv("PROFILE_MAX_ARTIFACTS", "50"))
+
+# Process pool for CPU-bound experiment engines (/pdr, /fingerprint, /dfp, /trilateration).
+# 0 workers runs everything in the thread pool. Tasks with fewer array elements
+# than OFFLOAD_MIN_ELEMENTS stay in the thread pool (IPC would cost more than the work).
+OFFLOAD_WORKERS = int(os.getenv("OFFLOAD_WORKERS", str(os.cpu_count() or 1)))
+OFFLOAD_MIN_ELEMENTS = int(os.getenv("OFFLOAD_MIN_ELEMENTS", "100000"))
+# Tasks waiting or running in the pool before requests are refused with 503
+OFFLOAD_QUEUE_LIMIT = int(os.getenv("OFFLOAD_QUEUE_LIMIT", "64"))
+# Per-route concurrency, e.g. "pdr=2,fingerprint=4" (unlisted routes: OFFLOAD_WORKERS)
+OFFLOAD_ROUTE_LIMITS = {
+    name.strip(): int(limit)
+    for name, _, limit in (
+        item.partition("=") for item in os.getenv("OFFLOAD_ROUTE_LIMITS", "").split(",")
+    )
+    if name.strip()
+}
+
+# Background workers for experiment jobs (/api/experiments/jobs/*)
+EXPERIMENT_JOB_WORKERS = int(os.getenv("EXPERIMENT_JOB_WORKERS", "2"))
+
+# Responses at least this large are brotli / gzip compressed when the client accepts it
+COMPRESSION_MIN_BYTES = int(os.getenv("COMPRESSION_MIN_BYTES", "4096"))
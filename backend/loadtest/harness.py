@@ -0,0 +1,361 @@
+"""Load harness – drive the API at a target request rate and report latencies.
+
+Generate a workload first, start a local server, then run from ``backend/``:
+
+    python -m loadtest.workload --synthetic --out /tmp/workload
+    uvicorn main:app --port 8000 &
+    python -m loadtest.harness --url http://127.0.0.1:8000 --workload /tmp/workload \\
+        --rate 50 --duration 60 --workers 16 --json /tmp/report.json
+
+Like a locust user mix, each request picks a task by weight (override with
+``--weights ingest_location=10,exp_pdr=0``). Arrivals are open-loop: a
+scheduler releases requests at ``--rate`` per second regardless of how fast
+the server answers, and latency is measured from the scheduled time, so a
+saturated server shows up as growing latency instead of a quietly lower
+rate. ``service`` is the time from sending to the last response byte.
+
+Only the standard library is used here, so the harness can run from any
+machine that can reach the server.
+"""
+
+import argparse
+import csv
+import glob
+import http.client
+import json
+import math
+import os
+import queue
+import random
+import threading
+import time
+import uuid
+from typing import Callable, Dict, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+# (method, path, body, headers)
+Request = Tuple[str, str, Optional[bytes], Dict[str, str]]
+
+
+class Task:
+    """A named request builder with a selection weight."""
+
+    def __init__(self, name: str, weight: float, build: Callable[[random.Random], Request]):
+        self.name = name
+        self.weight = weight
+        self.build = build
+
+
+# ─── Workload → tasks ────────────────────────────────────────────
+
+def _json_request(method: str, path: str, payload, headers: Optional[Dict[str, str]] = None) -> Request:
+    h = {"Content-Type": "application/json"}
+    h.update(headers or {})
+    return method, path, json.dumps(payload).encode(), h
+
+
+def _multipart(fields: Dict[str, str], files: Dict[str, Tuple[str, bytes]]) -> Tuple[bytes, str]:
+    boundary = uuid.uuid4().hex
+    parts = []
+    for name, value in fields.items():
+        parts.append(
+            f'--{boundary}\r\nContent-Disposition: form-data; name="{name}"\r\n\r\n{value}\r\n'.encode()
+        )
+    for name, (filename, data) in files.items():
+        parts.append(
+            f'--{boundary}\r\nContent-Disposition: form-data; name="{name}"; filename="{filename}"\r\n'
+            f"Content-Type: text/plain\r\n\r\n".encode() + data + b"\r\n"
+        )
+    parts.append(f"--{boundary}--\r\n".encode())
+    return b"".join(parts), f"multipart/form-data; boundary={boundary}"
+
+
+def _read_csv(path: str) -> List[Dict[str, str]]:
+    with open(path, newline="") as fh:
+        return list(csv.DictReader(fh))
+
+
+def build_tasks(workload_dir: str, api_key: str = "dev-key", pdr_window_s: float = 20.0) -> List[Task]:
+    """Request mix for a directory written by ``loadtest.workload``."""
+    with open(os.path.join(workload_dir, "floor.json")) as fh:
+        floor = json.load(fh)
+    walks = sorted(glob.glob(os.path.join(workload_dir, "walk_*.txt")))
+    if not walks:
+        raise ValueError(f"No walks in {workload_dir}; run loadtest.workload first")
+    stems = [w[:-len(".txt")] for w in walks]
+    auth = {"X-API-Key": api_key}
+    aps = {ap["bssid"]: ap for ap in floor["aps"]}
+    floor_id = floor.get("floor_id")
+
+    live = []
+    for stem in stems:
+        with open(stem + "_live.jsonl") as fh:
+            live.extend(json.loads(line) for line in fh if line.strip())
+    logs = []
+    for w in walks:
+        with open(w, "rb") as fh:
+            logs.append((os.path.basename(w), fh.read()))
+
+    # Scans: {timestamp: {bssid: rssi}} with the true position
+    scans = []
+    for stem in stems:
+        by_t: Dict[str, dict] = {}
+        for row in _read_csv(stem + "_rssi.csv"):
+            s = by_t.setdefault(row["timestamp"], {"x": float(row["x"]), "y": float(row["y"]), "rssi": {}})
+            s["rssi"][row["ap_id"]] = float(row["rssi"])
+        scans.extend(by_t.values())
+
+    survey = _read_csv(os.path.join(workload_dir, "radio_map.csv"))
+    bssids = list(aps)
+    radio_map = [[float(r[b]) if r[b] else -100.0 for b in bssids] for r in survey]
+    radio_coords = [[float(r["x"]), float(r["y"])] for r in survey]
+
+    imu = []
+    for stem in stems:
+        rows = _read_csv(stem + "_imu.csv")
+        cols = {c: [float(r[c]) for r in rows] for c in ("timestamp", "acc_x", "acc_y", "acc_z", "gyro_z")}
+        imu.append(cols)
+
+    def ingest_location(rng):
+        return _json_request("POST", "/api/ingest/location", rng.choice(live), auth)
+
+    def ingest_locations(rng):
+        return "GET", "/api/ingest/locations", None, dict(auth)
+
+    def ingest_logfile(rng):
+        name, data = rng.choice(logs)
+        fields = {} if floor_id is None else {"floor_id": str(floor_id)}
+        body, ctype = _multipart(fields, {"file": (f"loadtest_{name}", data)})
+        return "POST", "/api/ingest/logfile", body, {"Content-Type": ctype, **auth}
+
+    def signal_aps(rng):
+        query = "" if floor_id is None else f"?floor_id={floor_id}"
+        return "GET", f"/api/signal/aps{query}", None, {}
+
+    def signal_synthetic_heatmap(rng):
+        bssid = rng.choice(bssids).lower()
+        return "GET", f"/api/signal/synthetic/{floor_id}/heatmap/{bssid}", None, {}
+
+    def exp_trilateration(rng):
+        scan = rng.choice(scans)
+        heard = sorted(scan["rssi"].items(), key=lambda kv: -kv[1])[:6]
+        anchors = [{"x": aps[b]["x_m"], "y": aps[b]["y_m"], "rssi": r} for b, r in heard]
+        return _json_request("POST", "/api/experiments/trilateration",
+                             {"anchors": anchors, "A": -40.0, "n": 2.2, "solver": rng.choice(["ls", "wls"])})
+
+    def exp_fingerprint(rng):
+        scan = rng.choice(scans)
+        test = [scan["rssi"].get(b, -100.0) for b in bssids]
+        return _json_request("POST", "/api/experiments/fingerprint", {
+            "radio_map": radio_map, "radio_map_coords": radio_coords, "test_scan": test,
+            "k": 3, "algorithm": rng.choice(["knn", "wknn"]),
+        })
+
+    def exp_pdr(rng):
+        walk = rng.choice(imu)
+        n = len(walk["timestamp"])
+        rate = (n - 1) / max(walk["timestamp"][-1] - walk["timestamp"][0], 1e-9)
+        size = min(n, int(pdr_window_s * rate))
+        start = rng.randrange(0, n - size + 1)
+        sl = slice(start, start + size)
+        return _json_request("POST", "/api/experiments/pdr", {
+            "sampling_rate": rate,
+            "acc_x": walk["acc_x"][sl], "acc_y": walk["acc_y"][sl], "acc_z": walk["acc_z"][sl],
+            "gyro_z": walk["gyro_z"][sl],
+        })
+
+    def exp_analysis_error(rng):
+        picked = [rng.choice(scans) for _ in range(200)]
+        truth = [[s["x"], s["y"]] for s in picked]
+        est = [[x + rng.gauss(0, 2), y + rng.gauss(0, 2)] for x, y in truth]
+        return _json_request("POST", "/api/experiments/analysis/error",
+                             {"estimated": est, "ground_truth": truth})
+
+    tasks = [
+        Task("ingest_location", 30, ingest_location),
+        Task("ingest_locations", 5, ingest_locations),
+        Task("ingest_logfile", 1, ingest_logfile),
+        Task("signal_aps", 5, signal_aps),
+        Task("exp_trilateration", 20, exp_trilateration),
+        Task("exp_fingerprint", 15, exp_fingerprint),
+        Task("exp_pdr", 5, exp_pdr),
+        Task("exp_analysis_error", 5, exp_analysis_error),
+    ]
+    if floor_id is not None:
+        tasks.append(Task("signal_synthetic_heatmap", 5, signal_synthetic_heatmap))
+    return tasks
+
+
+# ─── Runner ──────────────────────────────────────────────────────
+
+class _Recorder:
+    """Per-task latency samples and status counts (thread-safe)."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.latency: Dict[str, List[float]] = {}
+        self.service: Dict[str, List[float]] = {}
+        self.status: Dict[str, Dict[str, int]] = {}
+        self.bytes_in: Dict[str, int] = {}
+
+    def add(self, task: str, latency: float, service: float, status: str, size: int):
+        with self._lock:
+            self.latency.setdefault(task, []).append(latency)
+            self.service.setdefault(task, []).append(service)
+            counts = self.status.setdefault(task, {})
+            counts[status] = counts.get(status, 0) + 1
+            self.bytes_in[task] = self.bytes_in.get(task, 0) + size
+
+
+def _percentile(sorted_values: List[float], q: float) -> float:
+    """Nearest-rank percentile of an ascending list."""
+    if not sorted_values:
+        return float("nan")
+    rank = max(1, math.ceil(q / 100.0 * len(sorted_values)))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+def _worker(base: str, jobs: "queue.Queue", recorder: _Recorder, timeout: float):
+    parts = urlsplit(base)
+    conn_cls = http.client.HTTPSConnection if parts.scheme == "https" else http.client.HTTPConnection
+    conn = None
+    while True:
+        item = jobs.get()
+        if item is None:
+            return
+        task_name, (method, path, body, headers), scheduled = item
+        start = time.perf_counter()
+        size = 0
+        try:
+            if conn is None:
+                conn = conn_cls(parts.hostname, parts.port, timeout=timeout)
+            conn.request(method, path, body=body, headers=headers)
+            resp = conn.getresponse()
+            size = len(resp.read())
+            status = str(resp.status)
+        except (OSError, http.client.HTTPException) as e:
+            status = type(e).__name__
+            if conn is not None:
+                conn.close()
+            conn = None
+        end = time.perf_counter()
+        recorder.add(task_name, end - scheduled, end - start, status, size)
+
+
+def run(
+    base_url: str,
+    tasks: List[Task],
+    rate: float,
+    duration: float,
+    workers: int = 16,
+    poisson: bool = True,
+    timeout: float = 60.0,
+    seed: int = 0,
+) -> Dict[str, object]:
+    """Drive ``tasks`` at ``rate`` requests/s for ``duration`` seconds; return the report."""
+    tasks = [t for t in tasks if t.weight > 0]
+    if not tasks:
+        raise ValueError("No tasks with a positive weight")
+    rng = random.Random(seed)
+    recorder = _Recorder()
+    jobs: "queue.Queue" = queue.Queue()
+    threads = [
+        threading.Thread(target=_worker, args=(base_url, jobs, recorder, timeout), daemon=True)
+        for _ in range(workers)
+    ]
+    for th in threads:
+        th.start()
+
+    weights = [t.weight for t in tasks]
+    t0 = time.perf_counter()
+    next_at, sent = t0, 0
+    while next_at - t0 < duration:
+        delay = next_at - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+        task = rng.choices(tasks, weights)[0]
+        jobs.put((task.name, task.build(rng), next_at))
+        sent += 1
+        next_at += rng.expovariate(rate) if poisson else 1.0 / rate
+
+    for _ in threads:
+        jobs.put(None)
+    for th in threads:
+        th.join()
+    elapsed = time.perf_counter() - t0
+    return report(recorder, elapsed, rate, sent)
+
+
+def report(recorder: _Recorder, elapsed: float, target_rate: float, sent: int) -> Dict[str, object]:
+    out: Dict[str, object] = {
+        "target_rate": target_rate,
+        "elapsed_s": round(elapsed, 3),
+        "sent": sent,
+        "achieved_rate": round(sent / elapsed, 2) if elapsed else 0.0,
+        "tasks": {},
+    }
+    all_latency: List[float] = []
+    for name in sorted(recorder.latency):
+        lat = sorted(recorder.latency[name])
+        svc = sorted(recorder.service[name])
+        all_latency.extend(lat)
+        ok = sum(c for s, c in recorder.status[name].items() if s.startswith("2"))
+        out["tasks"][name] = {
+            "count": len(lat),
+            "errors": len(lat) - ok,
+            "status": recorder.status[name],
+            "rate": round(len(lat) / elapsed, 2) if elapsed else 0.0,
+            "bytes_in": recorder.bytes_in[name],
+            **{f"p{q}_ms": round(1000 * _percentile(lat, q), 2) for q in (50, 90, 95, 99)},
+            "max_ms": round(1000 * lat[-1], 2),
+            "service_p50_ms": round(1000 * _percentile(svc, 50), 2),
+        }
+    all_latency.sort()
+    out["overall"] = {f"p{q}_ms": round(1000 * _percentile(all_latency, q), 2) for q in (50, 90, 95, 99)}
+    return out
+
+
+def print_report(rep: Dict[str, object]):
+    tasks = rep["tasks"]
+    width = max([len(n) for n in tasks] + [len("task")])
+    print(f"target {rep['target_rate']}/s, achieved {rep['achieved_rate']}/s over {rep['elapsed_s']} s")
+    print(f"{'task':<{width}} {'count':>7} {'err':>5} {'p50':>9} {'p90':>9} {'p99':>9} {'max':>9}   ms")
+    for name, t in tasks.items():
+        print(f"{name:<{width}} {t['count']:>7} {t['errors']:>5} {t['p50_ms']:>9.1f} "
+              f"{t['p90_ms']:>9.1f} {t['p99_ms']:>9.1f} {t['max_ms']:>9.1f}")
+    o = rep["overall"]
+    print(f"{'overall':<{width}} {rep['sent']:>7} {'':>5} {o['p50_ms']:>9.1f} {o['p90_ms']:>9.1f} {o['p99_ms']:>9.1f}")
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--url", default="http://127.0.0.1:8000")
+    parser.add_argument("--workload", required=True, help="directory written by loadtest.workload")
+    parser.add_argument("--rate", type=float, default=20.0, help="requests per second")
+    parser.add_argument("--duration", type=float, default=30.0, help="seconds")
+    parser.add_argument("--workers", type=int, default=16, help="concurrent connections")
+    parser.add_argument("--weights", default="", help="task=weight overrides, comma-separated")
+    parser.add_argument("--uniform", action="store_true", help="fixed spacing instead of Poisson arrivals")
+    parser.add_argument("--api-key", default="dev-key")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", help="also write the report here")
+    args = parser.parse_args(argv)
+
+    tasks = build_tasks(args.workload, args.api_key)
+    by_name = {t.name: t for t in tasks}
+    for item in filter(None, args.weights.split(",")):
+        name, _, weight = item.partition("=")
+        if name not in by_name:
+            parser.error(f"Unknown task '{name}'. Tasks: {sorted(by_name)}")
+        by_name[name].weight = float(weight)
+
+    rep = run(args.url, tasks, args.rate, args.duration, args.workers,
+              poisson=not args.uniform, seed=args.seed)
+    print_report(rep)
+    if args.json:
+        with open(args.json, "w") as fh:
+            json.dump(rep, fh, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,402 @@
+"""Synthetic workload generator – realistic walks, logs and datasets per floor.
+
+Run from ``backend/``:
+
+    python -m loadtest.workload --floor-id 3 --out /tmp/workload
+    python -m loadtest.workload --synthetic --aps 12 --walks 5 --out /tmp/workload
+
+A floor is read from the stored ``Building`` / ``Floor`` / ``AccessPoint``
+rows (its discretised paths are walked when it has any) or made up with
+``--synthetic``. For every simulated walk the generator writes:
+
+  - ``walk_<i>.txt``        GetSensorData log (ACCE / GYRO / WIFI / POSI lines)
+  - ``walk_<i>_rssi.csv``   long-form RSSI dataset (timestamp, ap_id, rssi, x, y)
+  - ``walk_<i>_imu.csv``    IMU dataset (timestamp, acc_*, gyro_*)
+  - ``walk_<i>_ftm.csv``    FTM dataset (timestamp, ap_id, distance_m, rssi, x, y)
+  - ``walk_<i>_live.jsonl`` live-location updates as sent to /api/ingest/location
+
+plus ``radio_map.csv`` (wide-form fingerprint survey on a grid) and
+``floor.json`` (the floor model the load harness uses).
+
+RSSI comes from the log-distance model in ``services.propagation`` with
+log-normal shadowing; IMU signals carry one acceleration peak per step and
+the yaw rate of the walked heading. Everything is seeded and offline.
+"""
+
+import argparse
+import csv
+import json
+import math
+import os
+import numpy as np
+from typing import Dict, List, Optional
+
+from services.propagation import predict_rssi
+
+GRAVITY = 9.80665
+# Meters per degree of latitude (spherical Earth)
+METERS_PER_DEG = 111_320.0
+
+
+# ─── Floor model ─────────────────────────────────────────────────
+
+def load_floor(floor_id: int) -> Dict[str, object]:
+    """Floor model from the database: bounds, positioned APs, paths, geo reference."""
+    from database import SessionLocal
+    from models.building import Floor
+
+    db = SessionLocal()
+    try:
+        f = db.query(Floor).get(floor_id)
+        if f is None:
+            raise ValueError(f"Floor {floor_id} not found")
+        if not f.pixels_per_meter or not f.origin_px:
+            raise ValueError("Floor must be calibrated and have an origin")
+        ppm, ox, oy = f.pixels_per_meter, f.origin_px["x"], f.origin_px["y"]
+        aps = [
+            {"bssid": ap.bssid, "ssid": ap.ssid or ap.label or "", "x_m": ap.x_m, "y_m": ap.y_m,
+             "tx_power_dbm": ap.tx_power_dbm, "frequency_mhz": ap.frequency_mhz}
+            for ap in (f.access_points or []) if ap.x_m is not None and ap.y_m is not None
+        ]
+        if not aps:
+            raise ValueError("Floor has no positioned access points")
+        paths = []
+        for p in f.paths or []:
+            arr = p.discrete_array
+            if arr is not None and len(arr) >= 2:
+                paths.append(arr[:, 2:4].tolist())
+
+        if f.width_px and f.height_px:
+            bounds = [-ox / ppm, (oy - f.height_px) / ppm, (f.width_px - ox) / ppm, oy / ppm]
+        else:
+            xy = np.array([[ap["x_m"], ap["y_m"]] for ap in aps])
+            bounds = [*(xy.min(axis=0) - 5.0), *(xy.max(axis=0) + 5.0)]
+
+        geo = None
+        if f.geo_anchors:
+            a = f.geo_anchors[0]
+            geo = {
+                "x_m": (a["px"]["x"] - ox) / ppm,
+                "y_m": (oy - a["px"]["y"]) / ppm,
+                "lat": a["lat"],
+                "lon": a["lon"],
+            }
+        return {
+            "building_id": f.building_id,
+            "floor_id": f.id,
+            "floor_number": f.floor_number,
+            "bounds": [float(b) for b in bounds],
+            "aps": aps,
+            "paths": paths,
+            "geo": geo,
+        }
+    finally:
+        db.close()
+
+
+def synthetic_floor(
+    n_aps: int = 8,
+    width_m: float = 40.0,
+    height_m: float = 25.0,
+    seed: int = 0,
+) -> Dict[str, object]:
+    """A made-up rectangular floor with APs spread over it (no database needed)."""
+    rng = np.random.default_rng(seed)
+    xy = rng.uniform((1.0, 1.0), (width_m - 1.0, height_m - 1.0), (n_aps, 2))
+    aps = [
+        {"bssid": "02:00:00:00:%02x:%02x" % divmod(i, 256), "ssid": f"LOADTEST-{i}",
+         "x_m": float(x), "y_m": float(y), "tx_power_dbm": 20.0,
+         "frequency_mhz": 5180 if i % 2 else 2437}
+        for i, (x, y) in enumerate(xy)
+    ]
+    return {
+        "building_id": None,
+        "floor_id": None,
+        "floor_number": 0,
+        "bounds": [0.0, 0.0, width_m, height_m],
+        "aps": aps,
+        "paths": [],
+        "geo": None,
+    }
+
+
+def to_latlon(floor: Dict[str, object], xy: np.ndarray) -> np.ndarray:
+    """
+    Floor meters → (lat, lon) on a local tangent plane at the floor's first
+    geo anchor (or 0°, 0°). Rotation between the image and north is ignored.
+    """
+    geo = floor.get("geo") or {"x_m": 0.0, "y_m": 0.0, "lat": 0.0, "lon": 0.0}
+    lat = geo["lat"] + (xy[:, 1] - geo["y_m"]) / METERS_PER_DEG
+    lon = geo["lon"] + (xy[:, 0] - geo["x_m"]) / (METERS_PER_DEG * math.cos(math.radians(geo["lat"])))
+    return np.column_stack((lat, lon))
+
+
+# ─── Walks and sensor signals ────────────────────────────────────
+
+def _waypoints(floor: Dict[str, object], rng: np.random.Generator, count: int) -> np.ndarray:
+    """A path's points (when the floor has paths), else random points inside the bounds."""
+    if floor["paths"]:
+        return np.asarray(floor["paths"][rng.integers(len(floor["paths"]))], dtype=float)
+    xmin, ymin, xmax, ymax = floor["bounds"]
+    margin = 0.1 * min(xmax - xmin, ymax - ymin)
+    return rng.uniform((xmin + margin, ymin + margin), (xmax - margin, ymax - margin), (count, 2))
+
+
+def simulate_walk(
+    floor: Dict[str, object],
+    duration_s: float = 60.0,
+    sampling_rate: float = 100.0,
+    speed: float = 1.2,
+    step_freq: float = 1.8,
+    seed: int = 0,
+) -> Dict[str, np.ndarray]:
+    """
+    Constant-speed walk along waypoints, sampled at ``sampling_rate``.
+
+    Returns:
+        {"t", "x", "y", "heading" (rad, 0 = +x), "acc" (T, 3), "gyro" (T, 3)}
+    """
+    rng = np.random.default_rng(seed)
+    n = int(duration_s * sampling_rate)
+    t = np.arange(n) / sampling_rate
+
+    pts = _waypoints(floor, rng, 8)
+    while True:
+        seg = np.linalg.norm(np.diff(pts, axis=0), axis=1)
+        if seg.sum() >= speed * duration_s or len(pts) > 100_000:
+            break
+        nxt = _waypoints(floor, rng, 8)
+        # Continue from whichever end of the next leg is closer
+        if np.linalg.norm(nxt[-1] - pts[-1]) < np.linalg.norm(nxt[0] - pts[-1]):
+            nxt = nxt[::-1]
+        pts = np.vstack((pts, nxt))
+    arc = np.concatenate(([0.0], np.cumsum(seg)))
+    s = np.minimum(speed * t, arc[-1])
+    x, y = np.interp(s, arc, pts[:, 0]), np.interp(s, arc, pts[:, 1])
+    heading = np.unwrap(np.arctan2(np.gradient(y), np.gradient(x) + 1e-12))
+
+    # One vertical acceleration peak per step, a smaller lateral sway at half
+    # the cadence, and sensor noise
+    phase = 2 * np.pi * step_freq * t
+    acc = np.column_stack((
+        0.6 * np.sin(phase / 2),
+        0.3 * np.cos(phase),
+        GRAVITY - 1.5 + 6.0 * np.maximum(np.sin(phase), 0.0) ** 2,
+    )) + rng.normal(0.0, 0.08, (n, 3))
+    yaw_rate = np.gradient(heading) * sampling_rate
+    gyro = np.column_stack((np.zeros(n), np.zeros(n), yaw_rate)) + rng.normal(0.0, 0.01, (n, 3))
+    return {"t": t, "x": x, "y": y, "heading": heading, "acc": acc, "gyro": gyro}
+
+
+def wifi_scans(
+    floor: Dict[str, object],
+    walk: Dict[str, np.ndarray],
+    scan_interval_s: float = 2.0,
+    shadowing_db: float = 4.0,
+    sensitivity_dbm: float = -95.0,
+    seed: int = 0,
+) -> Dict[str, np.ndarray]:
+    """
+    Periodic scans along a walk: {"t" (S,), "xy" (S, 2), "rssi" (S, A) with
+    NaN where the AP fell below ``sensitivity_dbm``}.
+    """
+    rng = np.random.default_rng(seed)
+    idx = np.flatnonzero(np.diff(np.floor(walk["t"] / scan_interval_s), prepend=-1) > 0)
+    xy = np.column_stack((walk["x"][idx], walk["y"][idx]))
+    rssi = predict_rssi(floor["aps"], xy, floor_dbm=-128).astype(float)
+    rssi += rng.normal(0.0, shadowing_db, rssi.shape)
+    rssi = np.round(rssi)
+    rssi[rssi < sensitivity_dbm] = np.nan
+    return {"t": walk["t"][idx], "xy": xy, "rssi": rssi}
+
+
+def ftm_ranges(
+    floor: Dict[str, object],
+    scans: Dict[str, np.ndarray],
+    sigma_m: float = 0.5,
+    max_range_m: float = 30.0,
+    seed: int = 0,
+) -> Dict[str, np.ndarray]:
+    """FTM distance per scan and AP (NaN beyond ``max_range_m`` or unheard)."""
+    rng = np.random.default_rng(seed)
+    aps = np.array([[ap["x_m"], ap["y_m"]] for ap in floor["aps"]])
+    d = np.linalg.norm(scans["xy"][:, None, :] - aps[None, :, :], axis=2)
+    d = np.abs(d + rng.normal(0.0, sigma_m, d.shape) + 0.3)    # positive multipath bias
+    d[(d > max_range_m) | np.isnan(scans["rssi"])] = np.nan
+    return d
+
+
+def radio_map_survey(
+    floor: Dict[str, object],
+    spacing_m: float = 2.0,
+    shadowing_db: float = 3.0,
+    sensitivity_dbm: float = -95.0,
+    seed: int = 0,
+) -> Dict[str, np.ndarray]:
+    """Fingerprint survey on a regular grid: {"xy" (M, 2), "rssi" (M, A)}."""
+    rng = np.random.default_rng(seed)
+    xmin, ymin, xmax, ymax = floor["bounds"]
+    gx, gy = np.meshgrid(np.arange(xmin + spacing_m / 2, xmax, spacing_m),
+                         np.arange(ymin + spacing_m / 2, ymax, spacing_m))
+    xy = np.column_stack((gx.ravel(), gy.ravel()))
+    rssi = predict_rssi(floor["aps"], xy, floor_dbm=-128).astype(float)
+    rssi = np.round(rssi + rng.normal(0.0, shadowing_db, rssi.shape))
+    rssi[rssi < sensitivity_dbm] = np.nan
+    return {"xy": xy, "rssi": rssi}
+
+
+# ─── Writers ─────────────────────────────────────────────────────
+
+_LOG_HEADER = """% LogFile created by the 'GetSensorData' App for Android.
+% Synthetic walk generated by loadtest.workload
+%
+% LogFile Data format:
+% Accelerometer data: \t'ACCE;AppTimestamp(s);SensorTimestamp(s);Acc_X(m/s^2);Acc_Y(m/s^2);Acc_Z(m/s^2);Accuracy(integer)'
+% Gyroscope data:     \t'GYRO;AppTimestamp(s);SensorTimestamp(s);Gyr_X(rad/s);Gyr_Y(rad/s);Gyr_Z(rad/s);Accuracy(integer)'
+% WIFI data:          \t'WIFI;AppTimestamp(s);SensorTimeStamp(s);Name_SSID;MAC_BSSID;RSS(dBm);'
+% POSI Reference:    \t\t'POSI;Timestamp(s);Counter;Latitude(degrees); Longitude(degrees);floor ID(0,1,2..4);Building ID(0,1,2..3);'
+%
+"""
+
+
+def getsensordata_log(
+    floor: Dict[str, object],
+    walk: Dict[str, np.ndarray],
+    scans: Dict[str, np.ndarray],
+    posi_interval_s: float = 5.0,
+    sensor_t0: float = 1_000_000.0,
+) -> str:
+    """One walk as a GetSensorData log, lines in AppTimestamp order."""
+    rows = []     # (time, order, line)
+    t = walk["t"]
+    for i in range(len(t)):
+        st = sensor_t0 + t[i]
+        a, g = walk["acc"][i], walk["gyro"][i]
+        rows.append((t[i], 0, f"ACCE;{t[i]:.3f};{st:.3f};{a[0]:.5f};{a[1]:.5f};{a[2]:.5f};3"))
+        rows.append((t[i], 1, f"GYRO;{t[i]:.3f};{st:.3f};{g[0]:.5f};{g[1]:.5f};{g[2]:.5f};3"))
+
+    for ts, scan in zip(scans["t"], scans["rssi"]):
+        for ap, rssi in zip(floor["aps"], scan):
+            if np.isfinite(rssi):
+                rows.append((ts, 2, f"WIFI;{ts:.3f};{sensor_t0 + ts:.3f};{ap['ssid']};{ap['bssid']};{int(rssi)}"))
+
+    posi = np.flatnonzero(np.diff(np.floor(t / posi_interval_s), prepend=-1) > 0)
+    latlon = to_latlon(floor, np.column_stack((walk["x"][posi], walk["y"][posi])))
+    for counter, (i, (lat, lon)) in enumerate(zip(posi, latlon), start=1):
+        rows.append((t[i], 3, f"POSI;{t[i]:.3f};{counter};{lat:.8f};{lon:.8f};{floor['floor_number']};0"))
+
+    rows.sort(key=lambda r: (r[0], r[1]))
+    return _LOG_HEADER + "\n".join(r[2] for r in rows) + "\n"
+
+
+def live_locations(
+    floor: Dict[str, object],
+    walk: Dict[str, np.ndarray],
+    surveyor: str,
+    interval_s: float = 1.0,
+    accuracy_m: float = 3.0,
+) -> List[Dict[str, object]]:
+    """/api/ingest/location payloads along a walk."""
+    idx = np.flatnonzero(np.diff(np.floor(walk["t"] / interval_s), prepend=-1) > 0)
+    latlon = to_latlon(floor, np.column_stack((walk["x"][idx], walk["y"][idx])))
+    return [
+        {"lat": float(lat), "lon": float(lon), "accuracy": accuracy_m,
+         "building_id": floor["building_id"], "floor_id": floor["floor_id"],
+         "surveyor": surveyor, "ts": f"{walk['t'][i]:.3f}"}
+        for i, (lat, lon) in zip(idx, latlon)
+    ]
+
+
+def _write_csv(path: str, header: List[str], rows):
+    with open(path, "w", newline="") as fh:
+        w = csv.writer(fh)
+        w.writerow(header)
+        w.writerows(rows)
+
+
+def write_walk(
+    out_dir: str,
+    name: str,
+    floor: Dict[str, object],
+    walk: Dict[str, np.ndarray],
+    scans: Dict[str, np.ndarray],
+    ftm: np.ndarray,
+):
+    """Write one walk's log, datasets and live stream into ``out_dir``."""
+    with open(os.path.join(out_dir, f"{name}.txt"), "w") as fh:
+        fh.write(getsensordata_log(floor, walk, scans))
+
+    bssids = [ap["bssid"] for ap in floor["aps"]]
+    _write_csv(
+        os.path.join(out_dir, f"{name}_rssi.csv"),
+        ["timestamp", "ap_id", "rssi", "x", "y"],
+        ((f"{ts:.3f}", b, int(r), f"{xy[0]:.3f}", f"{xy[1]:.3f}")
+         for ts, xy, row in zip(scans["t"], scans["xy"], scans["rssi"])
+         for b, r in zip(bssids, row) if np.isfinite(r)),
+    )
+    _write_csv(
+        os.path.join(out_dir, f"{name}_imu.csv"),
+        ["timestamp", "acc_x", "acc_y", "acc_z", "gyro_x", "gyro_y", "gyro_z"],
+        ((f"{ts:.3f}", *(f"{v:.5f}" for v in a), *(f"{v:.5f}" for v in g))
+         for ts, a, g in zip(walk["t"], walk["acc"], walk["gyro"])),
+    )
+    _write_csv(
+        os.path.join(out_dir, f"{name}_ftm.csv"),
+        ["timestamp", "ap_id", "distance_m", "rssi", "x", "y"],
+        ((f"{ts:.3f}", b, f"{d:.3f}", int(r), f"{xy[0]:.3f}", f"{xy[1]:.3f}")
+         for ts, xy, drow, rrow in zip(scans["t"], scans["xy"], ftm, scans["rssi"])
+         for b, d, r in zip(bssids, drow, rrow) if np.isfinite(d)),
+    )
+    with open(os.path.join(out_dir, f"{name}_live.jsonl"), "w") as fh:
+        for loc in live_locations(floor, walk, surveyor=name):
+            fh.write(json.dumps(loc) + "\n")
+
+
+def write_radio_map(path: str, floor: Dict[str, object], survey: Dict[str, np.ndarray]):
+    """Wide-form ``fingerprint_radio_map`` CSV (x, y, one column per BSSID)."""
+    _write_csv(
+        path,
+        ["x", "y", *(ap["bssid"] for ap in floor["aps"])],
+        ((f"{xy[0]:.3f}", f"{xy[1]:.3f}", *("" if np.isnan(r) else int(r) for r in row))
+         for xy, row in zip(survey["xy"], survey["rssi"])),
+    )
+
+
+def generate(
+    floor: Dict[str, object],
+    out_dir: str,
+    walks: int = 3,
+    duration_s: float = 60.0,
+    seed: int = 0,
+) -> List[str]:
+    """Write ``walks`` walks plus a radio-map survey and ``floor.json``; return the file names."""
+    os.makedirs(out_dir, exist_ok=True)
+    for i in range(walks):
+        walk = simulate_walk(floor, duration_s, seed=seed + i)
+        scans = wifi_scans(floor, walk, seed=seed + i)
+        write_walk(out_dir, f"walk_{i:03d}", floor, walk, scans, ftm_ranges(floor, scans, seed=seed + i))
+    write_radio_map(os.path.join(out_dir, "radio_map.csv"), floor, radio_map_survey(floor, seed=seed))
+    with open(os.path.join(out_dir, "floor.json"), "w") as fh:
+        json.dump(floor, fh, indent=2)
+    return sorted(os.listdir(out_dir))
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    src = parser.add_mutually_exclusive_group(required=True)
+    src.add_argument("--floor-id", type=int, help="stored floor to generate for")
+    src.add_argument("--synthetic", action="store_true", help="made-up rectangular floor")
+    parser.add_argument("--aps", type=int, default=8, help="APs on a synthetic floor")
+    parser.add_argument("--walks", type=int, default=3)
+    parser.add_argument("--duration", type=float, default=60.0, help="seconds per walk")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", required=True, help="output directory")
+    args = parser.parse_args(argv)
+
+    floor = synthetic_floor(args.aps, seed=args.seed) if args.synthetic else load_floor(args.floor_id)
+    files = generate(floor, args.out, args.walks, args.duration, args.seed)
+    print(f"Wrote {len(files)} files to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
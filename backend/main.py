@@ -2,17 +2,29 @@
 
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import Response
 
-from config import CORS_ORIGINS
+from config import CORS_ORIGINS, PROFILER_ADMIN_KEYS, PROFILE_INTERVAL_S, COMPRESSION_MIN_BYTES
 from database import init_db
-from routers import maps, datasets, experiments, buildings, signal, ingest
+from metrics import REGISTRY, CONTENT_TYPE, MetricsMiddleware
+from offload import OFFLOADER
+from profiling import ProfilingMiddleware
+from responses import NumpyJSONResponse, CompressionMiddleware
+from routers import maps, datasets, experiments, buildings, signal, ingest, profiles, jobs
 
 app = FastAPI(
     title="IPS Research Platform",
     description="Indoor Positioning System experimentation backend",
     version="0.1.0",
+    default_response_class=NumpyJSONResponse,
 )
 
+# On-demand profiling; only installed when admin keys are configured
+if PROFILER_ADMIN_KEYS:
+    app.add_middleware(
+        ProfilingMiddleware, admin_keys=PROFILER_ADMIN_KEYS, interval_s=PROFILE_INTERVAL_S,
+    )
+
 # CORS
 app.add_middleware(
     CORSMiddleware,
@@ -21,21 +33,39 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+# brotli / gzip for large bodies
+app.add_middleware(CompressionMiddleware, minimum_size=COMPRESSION_MIN_BYTES)
+# Outermost, so latency covers every other middleware as well
+app.add_middleware(MetricsMiddleware)
 
 # Routers
 app.include_router(maps.router)
 app.include_router(datasets.router)
 app.include_router(experiments.router)
+app.include_router(jobs.router)
 app.include_router(buildings.router)
 app.include_router(signal.router)
 app.include_router(ingest.router)
+app.include_router(profiles.router)
 
 
 @app.on_event("startup")
 def on_startup():
     init_db()
+    jobs.fail_interrupted_jobs()
+
+
+@app.on_event("shutdown")
+def on_shutdown():
+    OFFLOADER.shutdown()
 
 
 @app.get("/api/health")
 def health():
     return {"status": "ok", "version": "0.1.0"}
+
+
+@app.get("/api/metrics", include_in_schema=False)
+def metrics():
+    """Prometheus scrape endpoint (per-route latency, sizes, errors, stage timings)."""
+    return Response(REGISTRY.render(), media_type=CONTENT_TYPE)
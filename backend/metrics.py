@@ -0,0 +1,265 @@
+"""Request metrics – per-route latency, sizes, in-flight and errors.
+
+``MetricsMiddleware`` is a plain ASGI middleware: it wraps ``receive`` and
+``send`` to count body bytes and catch the response status, and records one
+sample per request under a single lock. Routes are labelled by their
+template (``/api/signal/heatmap/{bssid}``), never by the raw path, and
+requests that match no route share the ``<unmatched>`` label, so label
+cardinality stays bounded by the number of routes.
+
+Endpoints time their internal stages with
+
+    with stage("solve"):
+        ...
+
+and the timings are recorded under the route of the request that runs
+them, including work handed to the thread pool. Everything is rendered in
+the Prometheus text exposition format by ``render``.
+"""
+
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, List, Optional, Sequence, Tuple
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+SIZE_BUCKETS = (100, 1_000, 10_000, 100_000, 1_000_000, 10_000_000, 100_000_000)
+
+UNMATCHED_ROUTE = "<unmatched>"
+BACKGROUND_ROUTE = "<background>"     # stages timed outside any request
+
+# (stage, seconds) pairs of the request being served; None outside a request
+_stages: ContextVar[Optional[List[Tuple[str, float]]]] = ContextVar("metrics_stages", default=None)
+
+
+class Histogram:
+    """Fixed-bucket histogram (one label set)."""
+
+    __slots__ = ("bounds", "counts", "total", "count")
+
+    def __init__(self, bounds: Sequence[float]):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)    # last slot is +Inf
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.total += value
+        self.count += 1
+
+    def cumulative(self) -> List[Tuple[str, int]]:
+        out, running = [], 0
+        for le, n in zip([_fmt_value(b) for b in self.bounds] + ["+Inf"], self.counts):
+            running += n
+            out.append((le, running))
+        return out
+
+
+class MetricsRegistry:
+    """All request and stage metrics of the process."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.started = time.time()
+        self.in_flight = 0
+        self.requests: Dict[Tuple[str, str, str], int] = {}          # (method, route, status)
+        self.exceptions: Dict[Tuple[str, str], int] = {}             # (method, route)
+        self.latency: Dict[Tuple[str, str], Histogram] = {}
+        self.request_size: Dict[Tuple[str, str], Histogram] = {}
+        self.response_size: Dict[Tuple[str, str], Histogram] = {}
+        self.stage_latency: Dict[Tuple[str, str], Histogram] = {}    # (route, stage)
+
+    def _hist(self, table: Dict, key: tuple, bounds: Sequence[float]) -> Histogram:
+        hist = table.get(key)
+        if hist is None:
+            hist = table[key] = Histogram(bounds)
+        return hist
+
+    def begin(self):
+        with self._lock:
+            self.in_flight += 1
+
+    def record(
+        self,
+        method: str,
+        route: str,
+        status: int,
+        seconds: float,
+        request_bytes: int,
+        response_bytes: int,
+        failed: bool,
+        stages: List[Tuple[str, float]],
+    ):
+        key = (method, route)
+        with self._lock:
+            self.in_flight -= 1
+            rkey = (method, route, str(status))
+            self.requests[rkey] = self.requests.get(rkey, 0) + 1
+            if failed:
+                self.exceptions[key] = self.exceptions.get(key, 0) + 1
+            self._hist(self.latency, key, LATENCY_BUCKETS).observe(seconds)
+            self._hist(self.request_size, key, SIZE_BUCKETS).observe(request_bytes)
+            self._hist(self.response_size, key, SIZE_BUCKETS).observe(response_bytes)
+            totals: Dict[str, float] = {}
+            for name, elapsed in stages:          # a stage entered twice counts once, summed
+                totals[name] = totals.get(name, 0.0) + elapsed
+            for name, elapsed in totals.items():
+                self._hist(self.stage_latency, (route, name), LATENCY_BUCKETS).observe(elapsed)
+
+    def record_stage(self, route: str, name: str, seconds: float):
+        with self._lock:
+            self._hist(self.stage_latency, (route, name), LATENCY_BUCKETS).observe(seconds)
+
+    def render(self) -> str:
+        """Prometheus text exposition of every metric."""
+        with self._lock:
+            lines: List[str] = []
+            _header(lines, "ips_process_start_time_seconds", "gauge", "Start time of the process (unix seconds).")
+            lines.append(f"ips_process_start_time_seconds {_fmt_value(self.started)}")
+            _header(lines, "ips_http_requests_in_flight", "gauge", "Requests currently being served.")
+            lines.append(f"ips_http_requests_in_flight {self.in_flight}")
+
+            _header(lines, "ips_http_requests_total", "counter", "Completed requests by method, route and status.")
+            for (method, route, status), n in sorted(self.requests.items()):
+                lines.append(f"ips_http_requests_total{_labels(method=method, route=route, status=status)} {n}")
+            _header(lines, "ips_http_exceptions_total", "counter", "Requests that raised an unhandled exception.")
+            for (method, route), n in sorted(self.exceptions.items()):
+                lines.append(f"ips_http_exceptions_total{_labels(method=method, route=route)} {n}")
+
+            for name, help_text, table in (
+                ("ips_http_request_duration_seconds", "Request latency from first byte in to last byte out.", self.latency),
+                ("ips_http_request_size_bytes", "Request body size.", self.request_size),
+                ("ips_http_response_size_bytes", "Response body size.", self.response_size),
+            ):
+                _header(lines, name, "histogram", help_text)
+                for (method, route), hist in sorted(table.items()):
+                    _histogram_lines(lines, name, hist, method=method, route=route)
+
+            _header(lines, "ips_stage_duration_seconds", "histogram", "Time spent in named stages inside endpoints.")
+            for (route, stage_name), hist in sorted(self.stage_latency.items()):
+                _histogram_lines(lines, "ips_stage_duration_seconds", hist, route=route, stage=stage_name)
+        lines.append("")
+        return "\n".join(lines)
+
+
+def _fmt_value(value: float) -> str:
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(**labels: str) -> str:
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in labels.items()) + "}"
+
+
+def _header(lines: List[str], name: str, kind: str, help_text: str):
+    lines.append(f"# HELP {name} {help_text}")
+    lines.append(f"# TYPE {name} {kind}")
+
+
+def _histogram_lines(lines: List[str], name: str, hist: Histogram, **labels: str):
+    for le, n in hist.cumulative():
+        lines.append(f"{name}_bucket{_labels(**labels, le=le)} {n}")
+    lines.append(f"{name}_sum{_labels(**labels)} {_fmt_value(hist.total)}")
+    lines.append(f"{name}_count{_labels(**labels)} {hist.count}")
+
+
+REGISTRY = MetricsRegistry()
+
+
+@contextmanager
+def stage(name: str):
+    """Time a named stage of the current request (parse, build_index, solve, serialise…)."""
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - t0
+        stages = _stages.get()
+        if stages is None:
+            REGISTRY.record_stage(BACKGROUND_ROUTE, name, elapsed)
+        else:
+            stages.append((name, elapsed))
+
+
+@contextmanager
+def capture_stages():
+    """Collect stage timings into a local list instead of recording them
+    (used in worker processes, whose registry is never scraped)."""
+    stages: List[Tuple[str, float]] = []
+    token = _stages.set(stages)
+    try:
+        yield stages
+    finally:
+        _stages.reset(token)
+
+
+def add_stages(stages: List[Tuple[str, float]]):
+    """Attribute stage timings captured elsewhere to the current request."""
+    current = _stages.get()
+    if current is None:
+        for name, elapsed in stages:
+            REGISTRY.record_stage(BACKGROUND_ROUTE, name, elapsed)
+    else:
+        current.extend(stages)
+
+
+class MetricsMiddleware:
+    """ASGI middleware feeding ``REGISTRY`` (HTTP requests only)."""
+
+    def __init__(self, app, registry: MetricsRegistry = REGISTRY):
+        self.app = app
+        self.registry = registry
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        sizes = [0, 0]          # request, response body bytes
+        status = [500]
+
+        async def counting_receive():
+            message = await receive()
+            if message["type"] == "http.request":
+                sizes[0] += len(message.get("body", b""))
+            return message
+
+        async def counting_send(message):
+            if message["type"] == "http.response.start":
+                status[0] = message["status"]
+            elif message["type"] == "http.response.body":
+                sizes[1] += len(message.get("body", b""))
+            await send(message)
+
+        stages: List[Tuple[str, float]] = []
+        token = _stages.set(stages)
+        self.registry.begin()
+        failed = False
+        t0 = time.perf_counter()
+        try:
+            await self.app(scope, counting_receive, counting_send)
+        except BaseException:
+            failed = True
+            raise
+        finally:
+            elapsed = time.perf_counter() - t0
+            _stages.reset(token)
+            route = scope.get("route")
+            self.registry.record(
+                scope["method"],
+                getattr(route, "path", None) or UNMATCHED_ROUTE,
+                500 if failed else status[0],
+                elapsed,
+                sizes[0],
+                sizes[1],
+                failed,
+                stages,
+            )
@@ -1,3 +1,5 @@
 from models.map import FloorMap, MapCalibration
 from models.dataset import Dataset
-from models.building import Building, Floor, FloorPath, AccessPoint
+from models.building import Building, Floor, FloorPath, FloorPathPoints, AccessPoint
+from models.dfp import DFPBaseline
+from models.job import ExperimentJob
@@ -1,6 +1,9 @@
 """Models for Building → Floor → Path / AP / Calibration hierarchy."""
 
-from sqlalchemy import Column, Integer, String, Float, DateTime, JSON, ForeignKey, Text
+import numpy as np
+from typing import List, Optional
+
+from sqlalchemy import Column, Integer, String, Float, DateTime, JSON, ForeignKey, Text, LargeBinary
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from database import Base
@@ -69,14 +72,78 @@ class FloorPath(Base):
     # Discretisation spacing in meters
     spacing_m = Column(Float, nullable=True, default=1.0)
 
-    # Auto-computed discrete test points (meters, relative to origin)
-    discrete_points_m = Column(JSON, nullable=True)  # [{"x":..,"y":..,"z":0}, ...]
-    # Same in pixel space for rendering
-    discrete_points_px = Column(JSON, nullable=True)
+    # Legacy JSON discretisation, only read for paths not re-discretised
+    # since discretisation moved to the packed ``points`` table
+    legacy_points_m = Column("discrete_points_m", JSON, nullable=True)
+    legacy_points_px = Column("discrete_points_px", JSON, nullable=True)
 
     created_at = Column(DateTime(timezone=True), server_default=func.now())
 
     floor = relationship("Floor", back_populates="paths")
+    points = relationship("FloorPathPoints", uselist=False, back_populates="path",
+                          cascade="all, delete-orphan")
+
+    @property
+    def discrete_array(self) -> Optional[np.ndarray]:
+        """(K, 4) float64 rows of x_px, y_px, x_m, y_m, or None if not discretised."""
+        if self.points is not None:
+            return self.points.array
+        if self.legacy_points_m and self.legacy_points_px:
+            px = [(p["x"], p["y"]) for p in self.legacy_points_px]
+            m = [(p["x"], p["y"]) for p in self.legacy_points_m]
+            return np.hstack((np.array(px, dtype=float), np.array(m, dtype=float)))
+        return None
+
+    def set_discrete_array(self, arr: Optional[np.ndarray]):
+        self.legacy_points_m = None
+        self.legacy_points_px = None
+        if arr is None:
+            self.points = None
+        elif self.points is None:
+            self.points = FloorPathPoints.from_array(arr)
+        else:
+            self.points.set_array(arr)
+
+    # JSON views, generated on access
+    @property
+    def discrete_points_m(self) -> Optional[List[dict]]:
+        arr = self.discrete_array
+        if arr is None:
+            return None
+        return [{"x": x, "y": y, "z": 0} for x, y in arr[:, 2:4].tolist()]
+
+    @property
+    def discrete_points_px(self) -> Optional[List[dict]]:
+        arr = self.discrete_array
+        if arr is None:
+            return None
+        return [{"x": x, "y": y} for x, y in arr[:, 0:2].tolist()]
+
+
+class FloorPathPoints(Base):
+    """Packed discretisation of one FloorPath: little-endian float64 (K, 4)."""
+    __tablename__ = "floor_path_points"
+
+    path_id = Column(Integer, ForeignKey("floor_paths.id"), primary_key=True)
+    count = Column(Integer, nullable=False)
+    data = Column(LargeBinary, nullable=False)
+
+    path = relationship("FloorPath", back_populates="points")
+
+    @classmethod
+    def from_array(cls, arr: np.ndarray) -> "FloorPathPoints":
+        row = cls()
+        row.set_array(arr)
+        return row
+
+    def set_array(self, arr: np.ndarray):
+        arr = np.ascontiguousarray(arr, dtype="<f8").reshape(-1, 4)
+        self.count = len(arr)
+        self.data = arr.tobytes()
+
+    @property
+    def array(self) -> np.ndarray:
+        return np.frombuffer(self.data, dtype="<f8").reshape(self.count, 4)
 
 
 class AccessPoint(Base):
@@ -0,0 +1,23 @@
+"""Model for persisted device-free positioning baselines."""
+
+from sqlalchemy import Column, Integer, String, DateTime, JSON
+from sqlalchemy.sql import func
+from database import Base
+
+
+class DFPBaseline(Base):
+    __tablename__ = "dfp_baselines"
+
+    id = Column(Integer, primary_key=True, index=True)
+    name = Column(String, nullable=True)
+
+    # Number of links (columns) every sample block must have
+    link_count = Column(Integer, nullable=False)
+
+    # Welford running statistics per link
+    sample_count = Column(Integer, nullable=False, default=0)
+    mean = Column(JSON, nullable=False)  # [float] × link_count
+    m2 = Column(JSON, nullable=False)    # sum of squared deviations per link
+
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), onupdate=func.now())
@@ -0,0 +1,29 @@
+"""Model for background experiment jobs (lab runs submitted asynchronously)."""
+
+from sqlalchemy import Column, Integer, String, Float, DateTime, Text
+from sqlalchemy.sql import func
+from database import Base
+
+
+class ExperimentJob(Base):
+    __tablename__ = "experiment_jobs"
+
+    id = Column(String, primary_key=True)                 # uuid4 hex
+    kind = Column(String, nullable=False)                 # "trilateration-lab" | "fingerprinting-lab" | "radio-map-densify"
+
+    # SHA-256 of kind, parameters and uploaded files; identical submissions
+    # reuse a queued, running or finished job with the same hash
+    input_hash = Column(String, nullable=False, index=True)
+
+    status = Column(String, nullable=False, default="queued")   # queued | running | done | failed
+    progress = Column(Float, nullable=False, default=0.0)       # 0 … 1
+    error = Column(Text, nullable=True)
+
+    # gzip-compressed JSON of the lab response under uploads/jobs
+    result_path = Column(String, nullable=True)
+    result_bytes = Column(Integer, nullable=True)
+
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    started_at = Column(DateTime(timezone=True), nullable=True)
+    finished_at = Column(DateTime(timezone=True), nullable=True)
+    elapsed_s = Column(Float, nullable=True)
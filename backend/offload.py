@@ -0,0 +1,205 @@
+"""Process-pool execution for CPU-bound experiment engines.
+
+Sync endpoints run in Starlette's shared thread pool, where NumPy calls and
+Python loops hold the GIL, so one large PDR or fingerprint request stalls
+every other request. ``ProcessOffloader.run`` executes that work in a
+process pool instead:
+
+  - Arrays of at least ``SHARE_MIN_BYTES`` are copied once into
+    ``multiprocessing.shared_memory`` and attached by name in the worker
+    instead of being pickled through the pool's pipe.
+  - Admission is bounded: at most ``queue_limit`` tasks wait or run in the
+    pool, beyond that ``run`` raises ``OffloadRejected``.
+  - Every route has its own concurrency limit, so one hot route cannot
+    occupy all workers.
+  - Tasks with fewer than ``min_elements`` array elements keep running in
+    the thread pool, where they cost no IPC round trip.
+  - Inside ``in_process()`` (set by the profiling middleware) every task
+    runs in the thread pool, so the request's own stack sampler sees it.
+
+Stage timings (``metrics.stage``) taken inside the worker are sent back and
+attributed to the calling request. The pool starts on first use, with the
+forkserver start method where available (forking a threaded server is
+unsafe), and is rebuilt if a worker dies.
+"""
+
+import asyncio
+import multiprocessing
+import threading
+from collections import namedtuple
+from contextlib import contextmanager
+from contextvars import ContextVar
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from multiprocessing import shared_memory
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+from starlette.concurrency import run_in_threadpool
+
+from config import OFFLOAD_WORKERS, OFFLOAD_MIN_ELEMENTS, OFFLOAD_QUEUE_LIMIT, OFFLOAD_ROUTE_LIMITS
+from metrics import stage, capture_stages, add_stages
+
+SHARE_MIN_BYTES = 64 * 1024
+
+# Descriptor of an array placed in shared memory (picklable, a few bytes)
+_Shared = namedtuple("_Shared", ["name", "shape", "dtype"])
+
+
+class OffloadRejected(Exception):
+    """The process pool queue is full."""
+
+
+# True while the current request must not leave this process
+_in_process: ContextVar[bool] = ContextVar("offload_in_process", default=False)
+
+
+@contextmanager
+def in_process():
+    """Run every ``ProcessOffloader.run`` in this context in the thread pool."""
+    token = _in_process.set(True)
+    try:
+        yield
+    finally:
+        _in_process.reset(token)
+
+
+def _share(value, blocks: List[shared_memory.SharedMemory]):
+    if (
+        isinstance(value, np.ndarray)
+        and value.nbytes >= SHARE_MIN_BYTES
+        and not value.dtype.hasobject
+    ):
+        shm = shared_memory.SharedMemory(create=True, size=value.nbytes)
+        blocks.append(shm)
+        np.ndarray(value.shape, value.dtype, buffer=shm.buf)[...] = value
+        return _Shared(shm.name, value.shape, value.dtype.str)
+    return value
+
+
+def _attach(value, blocks: List[shared_memory.SharedMemory]):
+    if isinstance(value, _Shared):
+        shm = shared_memory.SharedMemory(name=value.name)
+        blocks.append(shm)
+        return np.ndarray(value.shape, np.dtype(value.dtype), buffer=shm.buf)
+    return value
+
+
+def _run_shared(fn: Callable, args: list, kwargs: dict):
+    """Worker side: attach shared arrays, run ``fn``, return (result, stages)."""
+    blocks: List[shared_memory.SharedMemory] = []
+    try:
+        args = [_attach(a, blocks) for a in args]
+        kwargs = {k: _attach(v, blocks) for k, v in kwargs.items()}
+        with capture_stages() as stages:
+            result = fn(*args, **kwargs)
+        return result, stages
+    finally:
+        del args, kwargs
+        for shm in blocks:
+            try:
+                shm.close()
+            except BufferError:         # the result still views the block
+                pass
+
+
+def _elements(args, kwargs) -> int:
+    return sum(
+        v.size for v in (*args, *kwargs.values()) if isinstance(v, np.ndarray)
+    )
+
+
+class ProcessOffloader:
+    """Bounded, per-route limited process pool for engine calls."""
+
+    def __init__(
+        self,
+        workers: int = OFFLOAD_WORKERS,
+        queue_limit: int = OFFLOAD_QUEUE_LIMIT,
+        route_limits: Optional[Dict[str, int]] = None,
+        min_elements: int = OFFLOAD_MIN_ELEMENTS,
+    ):
+        self.workers = workers
+        self.queue_limit = queue_limit
+        self.route_limits = dict(OFFLOAD_ROUTE_LIMITS if route_limits is None else route_limits)
+        self.min_elements = min_elements
+        self.admitted = 0               # waiting + running; only touched on the event loop
+        self._limits: Dict[str, asyncio.Semaphore] = {}
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._pool_lock = threading.Lock()
+
+    def _executor(self) -> ProcessPoolExecutor:
+        with self._pool_lock:
+            if self._pool is None:
+                methods = multiprocessing.get_all_start_methods()
+                context = multiprocessing.get_context("forkserver" if "forkserver" in methods else "spawn")
+                self._pool = ProcessPoolExecutor(self.workers, mp_context=context)
+            return self._pool
+
+    def _limit(self, route: str) -> asyncio.Semaphore:
+        sem = self._limits.get(route)
+        if sem is None:
+            sem = self._limits[route] = asyncio.Semaphore(max(self.route_limits.get(route, self.workers), 1))
+        return sem
+
+    async def run(self, route: str, fn: Callable, *args, **kwargs):
+        """
+        ``fn(*args, **kwargs)`` in a worker process (``fn`` must be a
+        module-level function; arguments and result must pickle), or in the
+        thread pool when the pool is disabled, the task is small or the
+        caller is inside ``in_process()``.
+
+        Raises:
+            OffloadRejected: ``queue_limit`` tasks are already admitted.
+        """
+        if (
+            self.workers <= 0
+            or _in_process.get()
+            or _elements(args, kwargs) < self.min_elements
+        ):
+            return await run_in_threadpool(fn, *args, **kwargs)
+        if self.admitted >= self.queue_limit:
+            raise OffloadRejected(f"{self.admitted} tasks queued for the process pool")
+
+        self.admitted += 1
+        blocks: List[shared_memory.SharedMemory] = []
+        try:
+            sem = self._limit(route)
+            with stage("queue"):
+                await sem.acquire()
+            try:
+                with stage("share"):
+                    shared_args = [_share(a, blocks) for a in args]
+                    shared_kwargs = {k: _share(v, blocks) for k, v in kwargs.items()}
+                loop = asyncio.get_running_loop()
+                try:
+                    result, stages = await loop.run_in_executor(
+                        self._executor(), _run_shared, fn, shared_args, shared_kwargs,
+                    )
+                except BrokenProcessPool:
+                    self._reset()
+                    raise
+            finally:
+                sem.release()
+        finally:
+            self.admitted -= 1
+            for shm in blocks:
+                shm.close()
+                shm.unlink()
+        add_stages(stages)
+        return result
+
+    def _reset(self):
+        with self._pool_lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=False, cancel_futures=True)
+
+    def shutdown(self):
+        with self._pool_lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=True, cancel_futures=True)
+
+
+OFFLOADER = ProcessOffloader()
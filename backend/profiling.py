@@ -0,0 +1,227 @@
+"""On-demand request profiling – wall-clock stack sampling of single requests.
+
+A request that carries an ``X-Profile: 1`` header (or ``?profile=1``) and a
+valid ``X-Admin-Key`` runs under ``StackSampler``: a background thread reads
+every thread's Python stack from ``sys._current_frames()`` at a fixed
+interval. Sampling all threads (instead of profiling the event-loop thread
+only, as cProfile / pyinstrument would) also covers sync endpoints and
+``run_in_threadpool`` work. Stacks with no frame from the backend source
+tree – idle pool workers, the idle event loop – are dropped, but concurrent
+requests running at the same time do show up.
+
+Artifacts are written to ``uploads/profiles``:
+
+  - ``{id}.folded``: collapsed stacks (``outer;…;leaf count``), the input of
+    flamegraph.pl, speedscope and inferno.
+  - ``{id}.json``: request metadata and the hottest frames.
+
+The response carries the artifact id in ``X-Profile-Id``. When no admin keys
+are configured the middleware is not installed, so profiling costs nothing.
+
+Worker processes cannot be sampled from here, so a profiled request runs its
+engines in the thread pool (``offload.in_process``) instead of the process
+pool; its timings then include GIL contention the offloaded path avoids.
+"""
+
+import json
+import os
+import sys
+import threading
+import time
+import uuid
+from typing import Dict, List, Optional, Set
+
+from starlette.concurrency import run_in_threadpool
+from starlette.responses import JSONResponse
+
+from config import BASE_DIR, UPLOAD_DIR, PROFILE_MAX_ARTIFACTS
+from offload import in_process
+
+PROFILE_DIR = UPLOAD_DIR / "profiles"
+PROFILE_DIR.mkdir(exist_ok=True)
+
+_ROOT = str(BASE_DIR) + os.sep
+_FALSE = {"", "0", "false", "no", "off"}
+
+
+class StackSampler:
+    """Sample the Python stacks of all threads until ``stop``."""
+
+    def __init__(self, interval_s: float = 0.005, root: str = _ROOT):
+        self.interval_s = interval_s
+        self.root = root
+        self.samples: Dict[tuple, int] = {}       # (outermost code, …, leaf code) → count
+        self.ticks = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="stack-sampler", daemon=True)
+
+    def start(self) -> "StackSampler":
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        me = threading.get_ident()
+        root = self.root
+        while not self._stop.wait(self.interval_s):
+            self.ticks += 1
+            for ident, frame in sys._current_frames().items():
+                if ident == me:
+                    continue
+                codes = []
+                ours = False
+                while frame is not None:
+                    code = frame.f_code
+                    codes.append(code)
+                    ours = ours or code.co_filename.startswith(root)
+                    frame = frame.f_back
+                if ours:
+                    key = tuple(reversed(codes))
+                    self.samples[key] = self.samples.get(key, 0) + 1
+
+    def _label(self, code) -> str:
+        path = code.co_filename
+        if path.startswith(self.root):
+            path = path[len(self.root):]
+        else:
+            path = "/".join(path.replace(os.sep, "/").split("/")[-2:])
+        return f"{code.co_name} ({path}:{code.co_firstlineno})".replace(";", ",")
+
+    def folded(self) -> str:
+        """Collapsed-stack text, one ``frame;frame;… count`` line per stack."""
+        lines = [
+            ";".join(self._label(c) for c in stack) + f" {n}"
+            for stack, n in sorted(self.samples.items(), key=lambda item: -item[1])
+        ]
+        return "\n".join(lines) + "\n"
+
+    def top(self, limit: int = 30) -> List[Dict[str, object]]:
+        """Frames by self samples, with the samples of stacks they appear in."""
+        own: Dict[object, int] = {}
+        total: Dict[object, int] = {}
+        for stack, n in self.samples.items():
+            own[stack[-1]] = own.get(stack[-1], 0) + n
+            for code in set(stack):
+                total[code] = total.get(code, 0) + n
+        ranked = sorted(total, key=lambda c: (-own.get(c, 0), -total[c]))[:limit]
+        return [
+            {"frame": self._label(c), "self_samples": own.get(c, 0), "total_samples": total[c]}
+            for c in ranked
+        ]
+
+
+# ── Artifact store ──────────────────────────────────────────────
+
+def artifact_path(profile_id: str, kind: str):
+    return PROFILE_DIR / f"{profile_id}.{kind}"
+
+
+def save_profile(profile_id: str, sampler: StackSampler, meta: Dict[str, object]):
+    """Write the ``.folded`` / ``.json`` pair, keeping the newest
+    ``PROFILE_MAX_ARTIFACTS`` profiles."""
+    artifact_path(profile_id, "folded").write_text(sampler.folded())
+    meta = dict(meta, id=profile_id, samples=sum(sampler.samples.values()),
+                ticks=sampler.ticks, interval_s=sampler.interval_s, top=sampler.top())
+    artifact_path(profile_id, "json").write_text(json.dumps(meta))
+
+    stored = sorted(PROFILE_DIR.glob("*.json"), key=lambda p: p.stat().st_mtime)
+    for path in stored[:max(len(stored) - PROFILE_MAX_ARTIFACTS, 0)]:
+        for kind in ("json", "folded"):
+            artifact_path(path.stem, kind).unlink(missing_ok=True)
+
+
+def _finish(profile_id: str, sampler: StackSampler, meta: Dict[str, object]):
+    sampler.stop()
+    save_profile(profile_id, sampler, meta)
+
+
+def load_profile(profile_id: str) -> Optional[Dict[str, object]]:
+    path = artifact_path(profile_id, "json")
+    if not path.exists():
+        return None
+    return json.loads(path.read_text())
+
+
+def list_profiles() -> List[Dict[str, object]]:
+    """Metadata of stored profiles, newest first (without the frame table)."""
+    out = []
+    for path in PROFILE_DIR.glob("*.json"):
+        meta = json.loads(path.read_text())
+        meta.pop("top", None)
+        out.append(meta)
+    return sorted(out, key=lambda m: -m["created_at"])
+
+
+# ── Middleware ──────────────────────────────────────────────────
+
+def _header(scope, name: bytes) -> Optional[str]:
+    for key, value in scope["headers"]:
+        if key == name:
+            return value.decode("latin-1")
+    return None
+
+
+def _wants_profile(scope) -> bool:
+    flag = _header(scope, b"x-profile")
+    if flag is not None:
+        return flag.strip().lower() not in _FALSE
+    query = scope.get("query_string", b"")
+    if b"profile=" not in query:
+        return False
+    for part in query.decode("latin-1").split("&"):
+        key, _, value = part.partition("=")
+        if key == "profile":
+            return value.strip().lower() not in _FALSE
+    return False
+
+
+class ProfilingMiddleware:
+    """ASGI middleware profiling flagged requests from admin-key holders."""
+
+    def __init__(self, app, admin_keys: Set[str], interval_s: float = 0.005):
+        self.app = app
+        self.admin_keys = admin_keys
+        self.interval_s = interval_s
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not _wants_profile(scope):
+            await self.app(scope, receive, send)
+            return
+        if _header(scope, b"x-admin-key") not in self.admin_keys:
+            await JSONResponse({"detail": "Profiling requires a valid X-Admin-Key"}, 403)(scope, receive, send)
+            return
+
+        profile_id = uuid.uuid4().hex[:12]
+        status: List[int] = [500]
+
+        async def tagged_send(message):
+            if message["type"] == "http.response.start":
+                status[0] = message["status"]
+                message = dict(message)
+                message["headers"] = list(message.get("headers", [])) + [
+                    (b"x-profile-id", profile_id.encode()),
+                ]
+            await send(message)
+
+        created_at = time.time()
+        sampler = StackSampler(self.interval_s).start()
+        t0 = time.perf_counter()
+        try:
+            with in_process():
+                await self.app(scope, receive, tagged_send)
+        finally:
+            duration = time.perf_counter() - t0
+            route = scope.get("route")
+            meta = {
+                "method": scope["method"],
+                "path": scope["path"],
+                "route": getattr(route, "path", None),
+                "status": status[0],
+                "duration_s": duration,
+                "created_at": created_at,
+            }
+            # Joining the sampler and writing artifacts block; keep them off the loop
+            await run_in_threadpool(_finish, profile_id, sampler, meta)
@@ -0,0 +1,151 @@
+"""JSON responses for array-heavy endpoints, and response compression.
+
+``NumpyJSONResponse`` is the app's default response class: orjson with
+native NumPy support (arrays are written straight from their buffers,
+NaN / ±inf become null). Heavy endpoints return it directly, with the
+arrays inside,
+
+    return NumpyJSONResponse({"trajectory": traj, "stride_lengths": sl})
+
+which skips FastAPI's response-model validation and ``jsonable_encoder``
+pass; the ``response_model`` still documents the schema. Results that
+are already Pydantic models go out through ``model_response`` (one
+pydantic-core JSON dump instead of dump → validate → dump).
+
+``CompressionMiddleware`` negotiates brotli (when the ``brotli`` package
+is installed) or gzip for complete bodies of at least ``minimum_size``
+bytes. Streamed responses and bodies that already carry a
+Content-Encoding are left alone.
+"""
+
+import gzip
+from typing import Any, Dict, Optional
+
+import numpy as np
+import orjson
+from fastapi.responses import ORJSONResponse, Response
+from pydantic import BaseModel
+from starlette.datastructures import Headers, MutableHeaders
+
+try:                                   # optional: gzip only without it
+    import brotli
+except ImportError:
+    brotli = None
+
+
+def _default(obj: Any) -> Any:
+    """Types orjson does not serialise natively."""
+    if isinstance(obj, np.ndarray):
+        # orjson falls through here for non-contiguous arrays and for
+        # dtypes it does not support (float16, object, …)
+        return obj.tolist()
+    if isinstance(obj, np.generic):
+        return obj.item()
+    if isinstance(obj, BaseModel):
+        return obj.model_dump()
+    raise TypeError(f"Type is not JSON serializable: {type(obj).__name__}")
+
+
+class NumpyJSONResponse(ORJSONResponse):
+    """orjson response accepting NumPy arrays / scalars and Pydantic models anywhere in the content."""
+
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(
+            content,
+            default=_default,
+            option=orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY,
+        )
+
+
+def model_response(model: BaseModel, status_code: int = 200) -> Response:
+    """Send an already-built response model without FastAPI re-validating it."""
+    return Response(model.model_dump_json(), status_code=status_code, media_type="application/json")
+
+
+# ── Compression ─────────────────────────────────────────────────
+
+_COMPRESSIBLE = ("application/json", "text/", "application/javascript", "image/svg+xml")
+
+
+def _accepted_codings(accept_encoding: str) -> Dict[str, float]:
+    """{coding: q} from an Accept-Encoding header."""
+    codings: Dict[str, float] = {}
+    for item in accept_encoding.split(","):
+        coding, _, params = item.strip().partition(";")
+        if not coding:
+            continue
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        codings[coding.strip().lower()] = q
+    return codings
+
+
+def negotiate_encoding(accept_encoding: str) -> Optional[str]:
+    """"br", "gzip" or None (identity) for an Accept-Encoding header."""
+    codings = _accepted_codings(accept_encoding)
+    wildcard = codings.get("*", 0.0)
+    q_br = codings.get("br", wildcard) if brotli is not None else 0.0
+    q_gzip = codings.get("gzip", wildcard)
+    if q_br > 0 and q_br >= q_gzip:
+        return "br"
+    if q_gzip > 0:
+        return "gzip"
+    return None
+
+
+class CompressionMiddleware:
+    """ASGI middleware compressing large, complete, compressible bodies."""
+
+    def __init__(self, app, minimum_size: int = 4096, gzip_level: int = 5, brotli_quality: int = 4):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+
+    def _compress(self, body: bytes, coding: str) -> bytes:
+        if coding == "br":
+            return brotli.compress(body, quality=self.brotli_quality)
+        return gzip.compress(body, compresslevel=self.gzip_level)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        coding = negotiate_encoding(Headers(scope=scope).get("accept-encoding", ""))
+        if coding is None:
+            await self.app(scope, receive, send)
+            return
+
+        pending: Dict[str, Any] = {}          # the held-back http.response.start
+
+        async def compressing_send(message):
+            if message["type"] == "http.response.start":
+                pending["start"] = message
+                return
+            start = pending.pop("start", None)
+            if start is None:                 # start already sent (streamed body)
+                await send(message)
+                return
+
+            headers = MutableHeaders(scope=start)
+            body = message.get("body", b"")
+            if (
+                not message.get("more_body", False)
+                and len(body) >= self.minimum_size
+                and "content-encoding" not in headers
+                and headers.get("content-type", "").startswith(_COMPRESSIBLE)
+            ):
+                body = self._compress(body, coding)
+                headers["Content-Encoding"] = coding
+                headers["Content-Length"] = str(len(body))
+                headers.add_vary_header("Accept-Encoding")
+                message = dict(message, body=body)
+            await send(start)
+            await send(message)
+
+        await self.app(scope, receive, compressing_send)
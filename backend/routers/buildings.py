@@ -1,15 +1,20 @@
 """Router for Map Builder — Buildings, Floors, Paths, Access Points."""
 
-import io, json, math, os, re, shutil, zipfile
+import io, json, os, re, shutil, zipfile
 from typing import List
 
+import numpy as np
+
 from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Form
 from fastapi.responses import FileResponse, StreamingResponse
 from sqlalchemy.orm import Session, joinedload
 
 from database import get_db
-from config import UPLOAD_DIR, ALLOWED_IMAGE_EXTENSIONS
+from config import UPLOAD_DIR, ALLOWED_IMAGE_EXTENSIONS, OCCUPANCY_CELL_M, OCCUPANCY_WALL_THRESHOLD
 from models.building import Building, Floor, FloorPath, AccessPoint
+from services.occupancy import OccupancyGrid, load_floor_grid
+from services.paths import discretize_polyline
+from services.calibration import pixels_to_meters
 from schemas.building import (
     BuildingCreate,
     BuildingUpdate,
@@ -25,6 +30,9 @@ from schemas.building import (
     APCreate,
     APResponse,
     MasterMapJSON,
+    OccupancyResponse,
+    SegmentCheckRequest,
+    SegmentCheckResponse,
 )
 
 router = APIRouter(prefix="/api/buildings", tags=["buildings"])
@@ -143,6 +151,35 @@ def get_floor_image(building_id: int, floor_id: int, db: Session = Depends(get_d
     return FileResponse(f.filepath)
 
 
+@router.get("/{building_id}/floors/{floor_id}/occupancy", response_model=OccupancyResponse)
+def get_floor_occupancy(building_id: int, floor_id: int, db: Session = Depends(get_db)):
+    """Wall grid derived from the floor image (built once, then cached)."""
+    f = _get_floor(building_id, floor_id, db)
+    return OccupancyResponse(floor_id=f.id, **floor_occupancy(f).summary())
+
+
+@router.post(
+    "/{building_id}/floors/{floor_id}/occupancy/check",
+    response_model=SegmentCheckResponse,
+)
+def check_floor_segments(
+    building_id: int,
+    floor_id: int,
+    payload: SegmentCheckRequest,
+    db: Session = Depends(get_db),
+):
+    """Which of the given moves (meters) cross a wall on this floor."""
+    if any(len(s) != 4 for s in payload.segments):
+        raise HTTPException(400, "Each segment must be [x0, y0, x1, y1]")
+    f = _get_floor(building_id, floor_id, db)
+    seg = np.array(payload.segments, dtype=float).reshape(-1, 4)
+    try:
+        crosses = floor_occupancy(f).segments_cross_wall(seg[:, 0], seg[:, 1], seg[:, 2], seg[:, 3])
+    except ValueError as e:
+        raise HTTPException(400, str(e))
+    return SegmentCheckResponse(crosses=crosses.tolist(), wall_count=int(crosses.sum()))
+
+
 @router.post("/{building_id}/floors/{floor_id}/calibrate", response_model=FloorResponse)
 def calibrate_floor(
     building_id: int,
@@ -360,7 +397,7 @@ def export_master_zip(building_id: int, db: Session = Depends(get_db)):
 def _get_building(building_id: int, db: Session) -> Building:
     b = (
         db.query(Building)
-        .options(joinedload(Building.floors).joinedload(Floor.paths),
+        .options(joinedload(Building.floors).joinedload(Floor.paths).joinedload(FloorPath.points),
                  joinedload(Building.floors).joinedload(Floor.access_points))
         .filter(Building.id == building_id)
         .first()
@@ -373,7 +410,8 @@ def _get_building(building_id: int, db: Session) -> Building:
 def _get_floor(building_id: int, floor_id: int, db: Session) -> Floor:
     f = (
         db.query(Floor)
-        .options(joinedload(Floor.paths), joinedload(Floor.access_points))
+        .options(joinedload(Floor.paths).joinedload(FloorPath.points),
+                 joinedload(Floor.access_points))
         .filter(Floor.id == floor_id, Floor.building_id == building_id)
         .first()
     )
@@ -411,6 +449,23 @@ def _floor_response(f: Floor) -> FloorResponse:
     )
 
 
+def floor_occupancy(f: Floor) -> OccupancyGrid:
+    """Cached occupancy grid for a calibrated floor with an image."""
+    if not f.pixels_per_meter or not f.origin_px:
+        raise HTTPException(400, "Floor must be calibrated and have an origin")
+    try:
+        return load_floor_grid(
+            str(BUILDINGS_UPLOAD / f"floor_{f.id}_occupancy.npz"),
+            f.filepath,
+            f.pixels_per_meter,
+            (f.origin_px["x"], f.origin_px["y"]),
+            OCCUPANCY_CELL_M,
+            OCCUPANCY_WALL_THRESHOLD,
+        )
+    except ValueError as e:
+        raise HTTPException(400, str(e))
+
+
 def _recompute_ap_meters(f: Floor):
     if not f.pixels_per_meter or not f.origin_px:
         return
@@ -433,45 +488,12 @@ def _discretize_path(p: FloorPath, f: Floor):
         return
 
     spacing_px = p.spacing_m * ppm if p.spacing_m else ppm
+    wp = np.array([(w["x"], w["y"]) for w in waypoints], dtype=float)
 
-    # Build discrete points in pixel space along the polyline
-    discrete_px = [waypoints[0]]
-    remaining = spacing_px
-
-    for i in range(1, len(waypoints)):
-        prev = waypoints[i - 1]
-        curr = waypoints[i]
-        dx = curr["x"] - prev["x"]
-        dy = curr["y"] - prev["y"]
-        seg_len = math.sqrt(dx * dx + dy * dy)
-        if seg_len == 0:
-            continue
-        ux, uy = dx / seg_len, dy / seg_len
-
-        consumed = 0.0
-        start_x, start_y = prev["x"], prev["y"]
-
-        while consumed + remaining <= seg_len:
-            consumed += remaining
-            start_x = prev["x"] + ux * consumed
-            start_y = prev["y"] + uy * consumed
-            discrete_px.append({"x": round(start_x, 2), "y": round(start_y, 2)})
-            remaining = spacing_px
-
-        remaining -= (seg_len - consumed)
-
-    # Convert to metres
-    ox, oy = origin["x"], origin["y"]
-    discrete_m = []
-    for pt in discrete_px:
-        discrete_m.append({
-            "x": round((pt["x"] - ox) / ppm, 4),
-            "y": round((oy - pt["y"]) / ppm, 4),
-            "z": 0,
-        })
-
-    p.discrete_points_px = discrete_px
-    p.discrete_points_m = discrete_m
+    discrete_px = np.round(discretize_polyline(wp, spacing_px), 2)
+    discrete_px[0] = wp[0]
+    discrete_m = np.round(pixels_to_meters(discrete_px, (origin["x"], origin["y"]), ppm), 4)
+    p.set_discrete_array(np.hstack((discrete_px, discrete_m)))
 
 
 def _rediscretize_paths(f: Floor):
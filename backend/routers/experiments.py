@@ -1,14 +1,30 @@
 """Experiment engine endpoints – Trilateration, Fingerprinting, PDR, BLE, FTM, DFP."""
 
-from fastapi import APIRouter, HTTPException, UploadFile, File as FastFile, Form
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, UploadFile, File as FastFile, Form
+from starlette.concurrency import run_in_threadpool
 from pydantic import BaseModel, Field
-from typing import List, Tuple, Optional, Dict
+from sqlalchemy.orm import Session
+from typing import Callable, List, Tuple, Optional, Dict
 import numpy as np
 import csv
 import io
 import tempfile
 import os
-
+import time
+from contextlib import contextmanager
+
+from database import get_db
+from metrics import stage
+from offload import OFFLOADER, OffloadRejected
+from sessions import SessionStore, SessionNotFound
+from responses import NumpyJSONResponse, model_response
+from routers.buildings import floor_occupancy
+from models.dfp import DFPBaseline
+from models.building import Floor, AccessPoint
+from config import (
+    PDR_SESSION_TTL_S, BLE_STATE_TTL_S, BLE_LIVE_WINDOW, EVALUATION_MAX_WORKERS,
+    RTI_MAX_VOXELS, RTI_MAX_LINKS, BINARY_MAX_UNCOMPRESSED_MB,
+)
 from services.trilateration import rssi_to_distance, trilaterate_ls, trilaterate_wls
 from services.fingerprinting import (
     knn_match,
@@ -22,17 +38,80 @@ from services.pdr import (
     detect_steps,
     weinberg_stride_length,
     height_based_stride,
-    complementary_filter,
+    estimate_heading,
     compute_trajectory,
+    PDRStream,
+)
+from services.ble import (
+    smooth_rssi_kalman,
+    smooth_rssi_kalman_batch,
+    smooth_rssi_moving_average,
+    causal_moving_average,
+    exponential_moving_average,
+    RSSIStateTable,
 )
-from services.ble import smooth_rssi_kalman, smooth_rssi_moving_average
 from services.ftm import multilaterate, rtt_to_distance
-from services.device_free import compute_baseline, detect_anomaly
-from services.analysis import euclidean_error, compute_cdf, error_statistics
+from services.device_free import compute_baseline, detect_anomaly, WelfordBaseline
+from services.rti import RTIModel, link_pairs
+from services.particle_filter import ParticleFilter, FusionStream, MeasurementModel, fuse
+from services.map_matching import PathGraph, ViterbiStream, viterbi, log_emissions
+from services.analysis import euclidean_error, compute_cdf, error_statistics, ErrorSketch
+from services.array_io import decode_arrays, check_arrays
+from services.evaluation import ENGINES, available_engines, benchmark
 
 router = APIRouter(prefix="/api/experiments", tags=["experiments"])
 
 
+async def _offload(route: str, fn, *args):
+    """Run an engine through the process pool (see ``offload``); 503 when full."""
+    try:
+        return await OFFLOADER.run(route, fn, *args)
+    except OffloadRejected as e:
+        raise HTTPException(503, f"Server busy: {e}", headers={"Retry-After": "1"})
+
+
+_IMU_REQUIRED = {"acc_x": 1, "acc_y": 1, "acc_z": 1}
+_IMU_OPTIONAL = {"gyro_z": 1, "mag_heading": 1}
+
+
+@contextmanager
+def _session(store: SessionStore, session_id: str, close: bool = False):
+    """``store.locked`` (one push per session at a time) with unknown ids as 404."""
+    try:
+        with store.locked(session_id, close) as state:
+            yield state
+    except SessionNotFound as e:
+        raise HTTPException(404, e.args[0])
+
+
+async def _read_binary_arrays(
+    request: Request,
+    columns: Optional[str],
+    required: Dict[str, int],
+    optional: Optional[Dict[str, int]] = None,
+) -> Dict[str, np.ndarray]:
+    """Decode a binary (float32 column block / .npz) body into named arrays.
+
+    ``required`` and ``optional`` map array names to their expected ndim;
+    a missing required array, a non-numeric dtype or a wrong ndim is a 400.
+    """
+    names = [c.strip() for c in columns.split(",") if c.strip()] if columns else list(required)
+    body = await request.body()
+    try:
+        with stage("parse"):
+            arrays = decode_arrays(
+                body, request.headers.get("content-type", ""), names,
+                max_bytes=BINARY_MAX_UNCOMPRESSED_MB * 1024 * 1024,
+            )
+            check_arrays(arrays, {**required, **(optional or {})})
+    except ValueError as e:
+        raise HTTPException(400, str(e))
+    missing = [name for name in required if name not in arrays]
+    if missing:
+        raise HTTPException(400, f"Missing arrays in binary body: {missing}")
+    return arrays
+
+
 # ─── Trilateration ───────────────────────────────────────────────
 
 class AnchorInput(BaseModel):
@@ -54,20 +133,32 @@ class PositionResponse(BaseModel):
     distances: Optional[List[float]] = None
 
 
+def _trilateration_arrays(
+    anchors: np.ndarray,
+    rssi: np.ndarray,
+    A: float,
+    n: float,
+    solver: str,
+) -> PositionResponse:
+    distances = rssi_to_distance(rssi, A, n)
+    with stage("solve"):
+        if solver == "wls":
+            x, y = trilaterate_wls(anchors, distances)
+        else:
+            x, y = trilaterate_ls(anchors, distances)
+
+    return PositionResponse(x=x, y=y, distances=distances.tolist())
+
+
 @router.post("/trilateration", response_model=PositionResponse)
-def run_trilateration(req: TrilaterationRequest):
+async def run_trilateration(req: TrilaterationRequest):
     if len(req.anchors) < 3:
         raise HTTPException(400, "Need at least 3 anchors")
 
-    anchors = [(a.x, a.y) for a in req.anchors]
-    distances = [rssi_to_distance(a.rssi, req.A, req.n) for a in req.anchors]
-
-    if req.solver == "wls":
-        x, y = trilaterate_wls(anchors, distances)
-    else:
-        x, y = trilaterate_ls(anchors, distances)
-
-    return PositionResponse(x=x, y=y, distances=distances)
+    with stage("parse"):
+        anchors = np.array([(a.x, a.y) for a in req.anchors])
+        rssi = np.array([a.rssi for a in req.anchors])
+    return await _offload("trilateration", _trilateration_arrays, anchors, rssi, req.A, req.n, req.solver)
 
 
 # ─── Trilateration Lab (file-based, mirrors Lab01/Main.py) ───────
@@ -120,50 +211,62 @@ class LabTrilaterationResponse(BaseModel):
     solver: str
 
 
-@router.post("/trilateration-lab", response_model=LabTrilaterationResponse)
-async def run_trilateration_lab(
-    aps_csv: UploadFile = FastFile(..., description="APs CSV: ssid,x,y,bssid"),
-    refpts_csv: UploadFile = FastFile(..., description="RefPts CSV: id,x,y,filetag"),
-    log_files: List[UploadFile] = FastFile(..., description="Dataset log files (one per ref point)"),
-    rssi0: float = Form(-32.0),
-    path_loss_exponent: float = Form(2.45),
-    solver: str = Form("ls"),
-    room_width: float = Form(13.0),
-    room_height: float = Form(13.0),
-):
+async def read_log_uploads(files: List[UploadFile]) -> Dict[str, str]:
+    """{filename: text} of uploaded log files, in upload order."""
+    contents: Dict[str, str] = {}
+    for lf in files:
+        contents[lf.filename or ""] = (await lf.read()).decode("utf-8", errors="replace")
+    return contents
+
+
+def trilateration_lab(
+    aps_content: str,
+    ref_content: str,
+    log_contents: Dict[str, str],
+    rssi0: float = -32.0,
+    path_loss_exponent: float = 2.45,
+    solver: str = "ls",
+    room_width: float = 13.0,
+    room_height: float = 13.0,
+    progress: Optional[Callable[[float], None]] = None,
+) -> LabTrilaterationResponse:
+    """
+    Trilaterate every reference point from its log file.
+
+    Args:
+        aps_content: APs CSV (ssid,x,y,bssid).
+        ref_content: RefPts CSV (id,x,y,filetag).
+        log_contents: {filename: GetSensorData log}; a ref point uses the
+            first file whose name contains its filetag.
+        progress: Called with the fraction of ref points processed.
+    """
     # ── Parse APs CSV ─────────────────────────────────────────────
-    aps_content = (await aps_csv.read()).decode('utf-8')
     ap_infos = []
-    for row in csv.reader(io.StringIO(aps_content)):
-        if not row or row[0].startswith('#'):
-            continue
-        ssid, x, y, bssid = row[0].strip(), float(row[1]), float(row[2]), row[3].strip()
-        ap_infos.append({"ssid": ssid, "x": x, "y": y, "bssid": bssid})
+    with stage("parse"):
+        for row in csv.reader(io.StringIO(aps_content)):
+            if not row or row[0].startswith('#'):
+                continue
+            ssid, x, y, bssid = row[0].strip(), float(row[1]), float(row[2]), row[3].strip()
+            ap_infos.append({"ssid": ssid, "x": x, "y": y, "bssid": bssid})
 
     if len(ap_infos) < 3:
         raise HTTPException(400, "Need at least 3 APs in the CSV")
 
     # ── Parse Ref Points CSV ──────────────────────────────────────
-    ref_content = (await refpts_csv.read()).decode('utf-8')
     ref_ptsinfo = []
-    for row in csv.reader(io.StringIO(ref_content)):
-        if not row or row[0].startswith('#'):
-            continue
-        refno, x, y, filetag = int(row[0]), float(row[1]), float(row[2]), row[3].strip()
-        ref_ptsinfo.append({"id": refno, "x": x, "y": y, "filetag": filetag})
-
-    # ── Index log files by filetag ────────────────────────────────
-    log_contents: Dict[str, str] = {}
-    for lf in log_files:
-        fname = lf.filename or ""
-        content = (await lf.read()).decode('utf-8', errors='replace')
-        # Index by full filename and also by matching ref tags
-        log_contents[fname] = content
+    with stage("parse"):
+        for row in csv.reader(io.StringIO(ref_content)):
+            if not row or row[0].startswith('#'):
+                continue
+            refno, x, y, filetag = int(row[0]), float(row[1]), float(row[2]), row[3].strip()
+            ref_ptsinfo.append({"id": refno, "x": x, "y": y, "filetag": filetag})
 
     # ── Process each reference point ──────────────────────────────
     results: List[LabTrilaterationRefResult] = []
     skipped_ref_points: List[str] = []
-    for ref in ref_ptsinfo:
+    for i, ref in enumerate(ref_ptsinfo):
+        if progress:
+            progress(i / len(ref_ptsinfo))
         # Find matching log file by filetag in filename
         filetag = ref["filetag"]
         matched_content = None
@@ -177,7 +280,8 @@ async def run_trilateration_lab(
             skipped_ref_points.append(filetag)
             continue
 
-        bssid_rssi = _parse_wifi_scan(matched_content)
+        with stage("parse"):
+            bssid_rssi = _parse_wifi_scan(matched_content)
 
         # Compute distances from each AP
         distances = []
@@ -193,10 +297,11 @@ async def run_trilateration_lab(
         # Trilaterate
         anchors = [(ap["x"], ap["y"]) for ap in ap_infos]
         try:
-            if solver == "wls":
-                est_x, est_y = trilaterate_wls(anchors, distances)
-            else:
-                est_x, est_y = trilaterate_ls(anchors, distances)
+            with stage("solve"):
+                if solver == "wls":
+                    est_x, est_y = trilaterate_wls(anchors, distances)
+                else:
+                    est_x, est_y = trilaterate_ls(anchors, distances)
             error = float(np.sqrt((est_x - ref["x"])**2 + (est_y - ref["y"])**2))
         except Exception:
             est_x, est_y, error = None, None, None
@@ -234,6 +339,27 @@ async def run_trilateration_lab(
     )
 
 
+@router.post("/trilateration-lab", response_model=LabTrilaterationResponse)
+async def run_trilateration_lab(
+    aps_csv: UploadFile = FastFile(..., description="APs CSV: ssid,x,y,bssid"),
+    refpts_csv: UploadFile = FastFile(..., description="RefPts CSV: id,x,y,filetag"),
+    log_files: List[UploadFile] = FastFile(..., description="Dataset log files (one per ref point)"),
+    rssi0: float = Form(-32.0),
+    path_loss_exponent: float = Form(2.45),
+    solver: str = Form("ls"),
+    room_width: float = Form(13.0),
+    room_height: float = Form(13.0),
+):
+    """Synchronous run; large submissions should use ``/jobs/trilateration-lab``."""
+    return model_response(await run_in_threadpool(
+        trilateration_lab,
+        (await aps_csv.read()).decode("utf-8"),
+        (await refpts_csv.read()).decode("utf-8"),
+        await read_log_uploads(log_files),
+        rssi0, path_loss_exponent, solver, room_width, room_height,
+    ))
+
+
 # ─── Fingerprinting Lab (file-based, mirrors Lab02) ──────────────
 
 def _parse_all_wifi_scans(content: str) -> List[Dict[str, int]]:
@@ -294,36 +420,40 @@ class LabFingerprintingResponse(BaseModel):
     statistics: dict
 
 
-@router.post("/fingerprinting-lab", response_model=LabFingerprintingResponse)
-async def run_fingerprinting_lab(
-    refpts_csv: UploadFile = FastFile(..., description="Ref Points CSV: ID,X,Y,File"),
-    testpts_csv: UploadFile = FastFile(..., description="Test Points CSV: ID,X,Y,File"),
-    train_log_files: List[UploadFile] = FastFile(..., description="Training log files"),
-    test_log_files: List[UploadFile] = FastFile(..., description="Test log files"),
-    k: int = Form(1),
-    algorithm: str = Form("nearest"),
-    max_aps: int = Form(0),
-    pixels_per_meter: float = Form(20.0),
-    scan_mode: str = Form("average"),
-):
+def fingerprinting_lab(
+    ref_content: str,
+    test_content: str,
+    train_contents: Dict[str, str],
+    test_contents: Dict[str, str],
+    k: int = 1,
+    algorithm: str = "nearest",
+    max_aps: int = 0,
+    pixels_per_meter: float = 20.0,
+    scan_mode: str = "average",
+    progress: Optional[Callable[[float], None]] = None,
+) -> LabFingerprintingResponse:
+    """
+    Build the fingerprint database from the training logs and locate every
+    test point.
+
+    Args:
+        ref_content / test_content: Points CSVs (ID,X,Y,File).
+        train_contents / test_contents: {filename: GetSensorData log}.
+        progress: Called with the fraction done (database build is the
+            first half, matching the second).
+    """
     # ── Parse Reference Points CSV ────────────────────────────────
-    ref_content = (await refpts_csv.read()).decode("utf-8")
     ref_infos: List[dict] = []
-    for row in csv.reader(io.StringIO(ref_content)):
-        if not row or row[0].strip().upper() == "ID" or row[0].startswith("#"):
-            continue
-        ref_infos.append({
-            "id": row[0].strip(),
-            "x": float(row[1]),
-            "y": float(row[2]),
-            "filetag": row[3].strip(),
-        })
-
-    # ── Index training log files ──────────────────────────────────
-    train_contents: Dict[str, str] = {}
-    for lf in train_log_files:
-        content = (await lf.read()).decode("utf-8", errors="replace")
-        train_contents[lf.filename or ""] = content
+    with stage("parse"):
+        for row in csv.reader(io.StringIO(ref_content)):
+            if not row or row[0].strip().upper() == "ID" or row[0].startswith("#"):
+                continue
+            ref_infos.append({
+                "id": row[0].strip(),
+                "x": float(row[1]),
+                "y": float(row[2]),
+                "filetag": row[3].strip(),
+            })
 
     # ── Build Fingerprint Database ────────────────────────────────
     fp_db: Dict[str, Dict[str, float]] = {}
@@ -331,7 +461,9 @@ async def run_fingerprinting_lab(
     ref_point_models: List[LabFPRefPoint] = []
 
     skipped_ref_points: List[str] = []
-    for ref in ref_infos:
+    for i, ref in enumerate(ref_infos):
+        if progress:
+            progress(0.5 * i / len(ref_infos))
         filetag = ref["filetag"]
         matched_content = None
         for fname, content in train_contents.items():
@@ -343,14 +475,16 @@ async def run_fingerprinting_lab(
             skipped_ref_points.append(filetag)
             continue
 
-        all_scans = _parse_all_wifi_scans(matched_content)
+        with stage("parse"):
+            all_scans = _parse_all_wifi_scans(matched_content)
         if not all_scans:
             raise HTTPException(400, f"No WiFi scans in training file for '{filetag}'")
 
-        if scan_mode == "first":
-            fingerprint = {b: float(r) for b, r in all_scans[0].items()}
-        else:
-            fingerprint = average_wifi_scans(all_scans)
+        with stage("build_index"):
+            if scan_mode == "first":
+                fingerprint = {b: float(r) for b, r in all_scans[0].items()}
+            else:
+                fingerprint = average_wifi_scans(all_scans)
 
         rid = ref["id"]
         fp_db[rid] = fingerprint
@@ -369,23 +503,17 @@ async def run_fingerprinting_lab(
         )
 
     # ── Parse Test Points CSV ─────────────────────────────────────
-    test_content = (await testpts_csv.read()).decode("utf-8")
     test_infos: List[dict] = []
-    for row in csv.reader(io.StringIO(test_content)):
-        if not row or row[0].strip().upper() == "ID" or row[0].startswith("#"):
-            continue
-        test_infos.append({
-            "id": row[0].strip(),
-            "x": float(row[1]),
-            "y": float(row[2]),
-            "filetag": row[3].strip(),
-        })
-
-    # ── Index test log files ──────────────────────────────────────
-    test_contents: Dict[str, str] = {}
-    for lf in test_log_files:
-        content = (await lf.read()).decode("utf-8", errors="replace")
-        test_contents[lf.filename or ""] = content
+    with stage("parse"):
+        for row in csv.reader(io.StringIO(test_content)):
+            if not row or row[0].strip().upper() == "ID" or row[0].startswith("#"):
+                continue
+            test_infos.append({
+                "id": row[0].strip(),
+                "x": float(row[1]),
+                "y": float(row[2]),
+                "filetag": row[3].strip(),
+            })
 
     # ── Match each test point ─────────────────────────────────────
     all_unique_bssids: set = set()
@@ -396,7 +524,9 @@ async def run_fingerprinting_lab(
     errors_m: List[float] = []
 
     skipped_test_points: List[str] = []
-    for tp in test_infos:
+    for i, tp in enumerate(test_infos):
+        if progress:
+            progress(0.5 + 0.5 * i / len(test_infos))
         filetag = tp["filetag"]
         matched_content = None
         for fname, content in test_contents.items():
@@ -408,7 +538,8 @@ async def run_fingerprinting_lab(
             skipped_test_points.append(filetag)
             continue
 
-        all_scans = _parse_all_wifi_scans(matched_content)
+        with stage("parse"):
+            all_scans = _parse_all_wifi_scans(matched_content)
         if not all_scans:
             raise HTTPException(400, f"No WiFi scans in test file for '{filetag}'")
 
@@ -418,18 +549,19 @@ async def run_fingerprinting_lab(
             online_scan = average_wifi_scans(all_scans)
 
         # Run matching
-        if algorithm == "nearest":
-            matched_id, est_x, est_y, rssi_err = nearest_match_rssi_dict(
-                fp_db, fp_coords, online_scan, max_aps,
-            )
-        elif algorithm == "wknn":
-            matched_id, est_x, est_y, rssi_err = knn_match_rssi_dict(
-                fp_db, fp_coords, online_scan, k, max_aps, weighted=True,
-            )
-        else:  # knn
-            matched_id, est_x, est_y, rssi_err = knn_match_rssi_dict(
-                fp_db, fp_coords, online_scan, k, max_aps, weighted=False,
-            )
+        with stage("solve"):
+            if algorithm == "nearest":
+                matched_id, est_x, est_y, rssi_err = nearest_match_rssi_dict(
+                    fp_db, fp_coords, online_scan, max_aps,
+                )
+            elif algorithm == "wknn":
+                matched_id, est_x, est_y, rssi_err = knn_match_rssi_dict(
+                    fp_db, fp_coords, online_scan, k, max_aps, weighted=True,
+                )
+            else:  # knn
+                matched_id, est_x, est_y, rssi_err = knn_match_rssi_dict(
+                    fp_db, fp_coords, online_scan, k, max_aps, weighted=False,
+                )
 
         if matched_id is not None:
             err_px = math.sqrt((est_x - tp["x"]) ** 2 + (est_y - tp["y"]) ** 2)
@@ -462,8 +594,9 @@ async def run_fingerprinting_lab(
     # ── CDF & statistics ──────────────────────────────────────────
     if errors_m:
         err_arr = np.array(errors_m)
-        cdf = compute_cdf(err_arr)
-        stats = error_statistics(err_arr)
+        with stage("analyse"):
+            cdf = compute_cdf(err_arr)
+            stats = error_statistics(err_arr)
     else:
         cdf = {"x": [], "y": []}
         stats = {}
@@ -486,6 +619,29 @@ async def run_fingerprinting_lab(
     )
 
 
+@router.post("/fingerprinting-lab", response_model=LabFingerprintingResponse)
+async def run_fingerprinting_lab(
+    refpts_csv: UploadFile = FastFile(..., description="Ref Points CSV: ID,X,Y,File"),
+    testpts_csv: UploadFile = FastFile(..., description="Test Points CSV: ID,X,Y,File"),
+    train_log_files: List[UploadFile] = FastFile(..., description="Training log files"),
+    test_log_files: List[UploadFile] = FastFile(..., description="Test log files"),
+    k: int = Form(1),
+    algorithm: str = Form("nearest"),
+    max_aps: int = Form(0),
+    pixels_per_meter: float = Form(20.0),
+    scan_mode: str = Form("average"),
+):
+    """Synchronous run; large submissions should use ``/jobs/fingerprinting-lab``."""
+    return model_response(await run_in_threadpool(
+        fingerprinting_lab,
+        (await refpts_csv.read()).decode("utf-8"),
+        (await testpts_csv.read()).decode("utf-8"),
+        await read_log_uploads(train_log_files),
+        await read_log_uploads(test_log_files),
+        k, algorithm, max_aps, pixels_per_meter, scan_mode,
+    ))
+
+
 # ─── Fingerprinting (JSON) ───────────────────────────────────────
 
 class FingerprintRequest(BaseModel):
@@ -496,31 +652,57 @@ class FingerprintRequest(BaseModel):
     algorithm: str = "knn"              # "knn" or "wknn"
 
 
-@router.post("/fingerprint", response_model=PositionResponse)
-def run_fingerprint(req: FingerprintRequest):
-    rm = np.array(req.radio_map, dtype=float)
-    coords = np.array(req.radio_map_coords, dtype=float)
-    scan = np.array(req.test_scan, dtype=float)
-
-    if rm.shape[1] != len(scan):
+def _fingerprint_arrays(
+    rm: np.ndarray,
+    coords: np.ndarray,
+    scan: np.ndarray,
+    k: int,
+    algorithm: str,
+) -> PositionResponse:
+    if rm.ndim != 2 or rm.shape[1] != len(scan):
         raise HTTPException(400, "Radio map AP count must match test scan length")
+    if coords.shape != (rm.shape[0], 2):
+        raise HTTPException(400, "radio_map_coords must be an M×2 matrix, one row per radio map entry")
 
-    if req.algorithm == "wknn":
-        x, y = weighted_knn_match(rm, coords, scan, req.k)
-    else:
-        x, y = knn_match(rm, coords, scan, req.k)
+    with stage("solve"):
+        if algorithm == "wknn":
+            x, y = weighted_knn_match(rm, coords, scan, k)
+        else:
+            x, y = knn_match(rm, coords, scan, k)
 
     return PositionResponse(x=x, y=y)
 
 
+@router.post("/fingerprint", response_model=PositionResponse)
+async def run_fingerprint(req: FingerprintRequest):
+    with stage("parse"):
+        rm = np.array(req.radio_map, dtype=float)
+        coords = np.array(req.radio_map_coords, dtype=float)
+        scan = np.array(req.test_scan, dtype=float)
+    return await _offload("fingerprint", _fingerprint_arrays, rm, coords, scan, req.k, req.algorithm)
+
+
+@router.post("/fingerprint/binary", response_model=PositionResponse)
+async def run_fingerprint_binary(
+    request: Request,
+    k: int = Query(3),
+    algorithm: str = Query("knn"),
+):
+    """Fingerprint match with an ``.npz`` body holding ``radio_map`` (M×N),
+    ``radio_map_coords`` (M×2) and ``test_scan`` (N)."""
+    arrays = await _read_binary_arrays(
+        request, None, {"radio_map": 2, "radio_map_coords": 2, "test_scan": 1},
+    )
+    return await _offload(
+        "fingerprint", _fingerprint_arrays,
+        arrays["radio_map"], arrays["radio_map_coords"], arrays["test_scan"],
+        k, algorithm,
+    )
+
+
 # ─── PDR ──────────────────────────────────────────────────────────
 
-class PDRRequest(BaseModel):
-    acc_x: List[float]
-    acc_y: List[float]
-    acc_z: List[float]
-    gyro_z: Optional[List[float]] = None
-    mag_heading: Optional[List[float]] = None
+class PDRParams(BaseModel):
     sampling_rate: float = 100.0
     peak_height: float = 1.0
     peak_distance: int = 30
@@ -532,61 +714,519 @@ class PDRRequest(BaseModel):
     start_y: float = 0.0
 
 
+class PDRRequest(PDRParams):
+    acc_x: List[float]
+    acc_y: List[float]
+    acc_z: List[float]
+    gyro_z: Optional[List[float]] = None
+    mag_heading: Optional[List[float]] = None
+
+
 class PDRResponse(BaseModel):
     trajectory: List[List[float]]
     step_count: int
     stride_lengths: List[float]
 
 
-@router.post("/pdr", response_model=PDRResponse)
-def run_pdr(req: PDRRequest):
-    acc = np.sqrt(
-        np.array(req.acc_x)**2 +
-        np.array(req.acc_y)**2 +
-        np.array(req.acc_z)**2
-    )
+def _check_imu_lengths(acc_x, acc_y, acc_z, gyro_z=None, mag_heading=None):
+    """400 unless every IMU series given has one value per accelerometer sample."""
+    if not (len(acc_x) == len(acc_y) == len(acc_z)):
+        raise HTTPException(400, "acc_x, acc_y and acc_z must have the same length")
+    for name, series in (("gyro_z", gyro_z), ("mag_heading", mag_heading)):
+        if series is not None and len(series) and len(series) != len(acc_x):
+            raise HTTPException(400, f"{name} must have the same length as acc_x")
+
+
+def _pdr_steps(
+    acc_x: np.ndarray,
+    acc_y: np.ndarray,
+    acc_z: np.ndarray,
+    gyro_z: Optional[np.ndarray],
+    mag_heading: Optional[np.ndarray],
+    params: PDRParams,
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """(step indices, stride lengths, per-sample headings) for one walk."""
+    _check_imu_lengths(acc_x, acc_y, acc_z, gyro_z, mag_heading)
+    acc = np.sqrt(acc_x**2 + acc_y**2 + acc_z**2)
 
-    steps = detect_steps(acc, req.sampling_rate, req.peak_height, req.peak_distance)
+    steps = detect_steps(acc, params.sampling_rate, params.peak_height, params.peak_distance)
 
-    if req.stride_method == "height":
-        sl = np.full(len(steps), height_based_stride(req.user_height_m))
+    if params.stride_method == "height":
+        sl = np.full(len(steps), height_based_stride(params.user_height_m))
     else:
-        sl = weinberg_stride_length(acc, steps, req.weinberg_K)
+        sl = weinberg_stride_length(acc, steps, params.weinberg_K)
 
     # Heading
-    dt = 1.0 / req.sampling_rate
-    if req.gyro_z and req.mag_heading:
-        headings = complementary_filter(
-            np.array(req.gyro_z),
-            np.array(req.mag_heading),
-            dt,
-            req.complementary_alpha,
+    headings = estimate_heading(
+        gyro_z,
+        mag_heading,
+        1.0 / params.sampling_rate,
+        params.complementary_alpha,
+        len(acc),
+    )
+    return steps, sl, headings
+
+
+def _pdr_arrays(
+    acc_x: np.ndarray,
+    acc_y: np.ndarray,
+    acc_z: np.ndarray,
+    gyro_z: Optional[np.ndarray],
+    mag_heading: Optional[np.ndarray],
+    params: PDRParams,
+) -> NumpyJSONResponse:
+    with stage("solve"):
+        steps, sl, headings = _pdr_steps(acc_x, acc_y, acc_z, gyro_z, mag_heading, params)
+        traj = compute_trajectory(steps, sl, headings, params.start_x, params.start_y)
+
+    # Rendered here, so offloaded runs also serialise in the worker process
+    with stage("serialise"):
+        return NumpyJSONResponse({
+            "trajectory": traj,
+            "step_count": len(steps),
+            "stride_lengths": sl,
+        })
+
+
+@router.post("/pdr", response_model=PDRResponse)
+async def run_pdr(req: PDRRequest):
+    with stage("parse"):
+        arrays = (
+            np.array(req.acc_x),
+            np.array(req.acc_y),
+            np.array(req.acc_z),
+            np.array(req.gyro_z) if req.gyro_z else None,
+            np.array(req.mag_heading) if req.mag_heading else None,
         )
-    elif req.gyro_z:
-        # Gyro-only: integrate yaw rate to get heading
-        headings = np.cumsum(np.array(req.gyro_z) * dt)
-    elif req.mag_heading:
-        headings = np.array(req.mag_heading)
-    else:
-        headings = np.zeros(len(acc))
+    # Parameters only – the request model still holds the sample lists
+    params = PDRParams(**{name: getattr(req, name) for name in PDRParams.model_fields})
+    return await _offload("pdr", _pdr_arrays, *arrays, params)
+
+
+@router.post("/pdr/binary", response_model=PDRResponse)
+async def run_pdr_binary(
+    request: Request,
+    params: PDRParams = Depends(),
+    columns: Optional[str] = Query(
+        None, description="Column order of a float32 block, e.g. acc_x,acc_y,acc_z,gyro_z",
+    ),
+):
+    """PDR over a binary IMU body (float32 column block or ``.npz``)."""
+    arrays = await _read_binary_arrays(request, columns, _IMU_REQUIRED, _IMU_OPTIONAL)
+    return await _offload(
+        "pdr", _pdr_arrays,
+        arrays["acc_x"], arrays["acc_y"], arrays["acc_z"],
+        arrays.get("gyro_z"), arrays.get("mag_heading"),
+        params,
+    )
+
+
+# ─── PDR live sessions ────────────────────────────────────────────
+
+class PDRChunk(BaseModel):
+    acc_x: List[float]
+    acc_y: List[float]
+    acc_z: List[float]
+    gyro_z: Optional[List[float]] = None
+    mag_heading: Optional[List[float]] = None
+
+
+class PDRSessionResponse(BaseModel):
+    session_id: str
 
-    traj = compute_trajectory(steps, sl, headings, req.start_x, req.start_y)
 
-    return PDRResponse(
-        trajectory=[list(p) for p in traj],
+class PDRChunkResponse(BaseModel):
+    step_indices: List[int]          # global sample indices of the new steps
+    stride_lengths: List[float]
+    headings: List[float]            # heading at each new step (rad)
+    trajectory: List[List[float]]    # new positions only (start excluded)
+    step_count: int
+    sample_count: int
+    position: List[float]
+
+
+# In-memory live PDR sessions (dev-grade, single process), evicted after
+# PDR_SESSION_TTL_S seconds without a chunk.
+_PDR_SESSIONS: SessionStore[PDRStream] = SessionStore(PDR_SESSION_TTL_S, "PDR session")
+
+
+def _pdr_chunk_response(stream: PDRStream, result: dict) -> PDRChunkResponse:
+    return PDRChunkResponse(
+        **result,
+        step_count=stream.step_count,
+        sample_count=stream.sample_count,
+        position=[stream.x, stream.y],
+    )
+
+
+@router.post("/pdr/sessions", response_model=PDRSessionResponse, status_code=201)
+def create_pdr_session(params: PDRParams):
+    """Start a live PDR session; IMU chunks are then pushed incrementally."""
+    return PDRSessionResponse(session_id=_PDR_SESSIONS.create(PDRStream(**params.model_dump())))
+
+
+@router.post("/pdr/sessions/{session_id}/chunk", response_model=PDRChunkResponse)
+def push_pdr_chunk(session_id: str, chunk: PDRChunk):
+    """Feed the next IMU chunk and return only the steps it confirmed."""
+    _check_imu_lengths(chunk.acc_x, chunk.acc_y, chunk.acc_z, chunk.gyro_z, chunk.mag_heading)
+    with _session(_PDR_SESSIONS, session_id) as stream:
+        result = stream.push(
+            chunk.acc_x, chunk.acc_y, chunk.acc_z,
+            chunk.gyro_z or None, chunk.mag_heading or None,
+        )
+        return _pdr_chunk_response(stream, result)
+
+
+def _push_pdr_arrays(session_id: str, arrays: Dict[str, np.ndarray]) -> PDRChunkResponse:
+    with _session(_PDR_SESSIONS, session_id) as stream:
+        result = stream.push(
+            arrays["acc_x"], arrays["acc_y"], arrays["acc_z"],
+            arrays.get("gyro_z"), arrays.get("mag_heading"),
+        )
+        return _pdr_chunk_response(stream, result)
+
+
+@router.post("/pdr/sessions/{session_id}/chunk/binary", response_model=PDRChunkResponse)
+async def push_pdr_chunk_binary(
+    session_id: str,
+    request: Request,
+    columns: Optional[str] = Query(None, description="Column order of a float32 block"),
+):
+    """Binary variant of the chunk push (float32 column block or ``.npz``)."""
+    arrays = await _read_binary_arrays(request, columns, _IMU_REQUIRED, _IMU_OPTIONAL)
+    _check_imu_lengths(
+        arrays["acc_x"], arrays["acc_y"], arrays["acc_z"],
+        arrays.get("gyro_z"), arrays.get("mag_heading"),
+    )
+    # The session lock is taken in the worker thread, never on the event loop
+    return await run_in_threadpool(_push_pdr_arrays, session_id, arrays)
+
+
+@router.delete("/pdr/sessions/{session_id}", response_model=PDRChunkResponse)
+def close_pdr_session(session_id: str):
+    """End the walk: flush the pending window and drop the session."""
+    with _session(_PDR_SESSIONS, session_id, close=True) as stream:
+        return _pdr_chunk_response(stream, stream.flush())
+
+
+# ─── PDR + WiFi fusion (particle filter) ──────────────────────────
+
+class FusionParams(PDRParams):
+    n_particles: int = Field(2000, ge=1, le=100_000)
+    init_spread: float = 1.0
+    init_heading_spread: float = 0.2
+    stride_noise: float = 0.1
+    heading_noise: float = 0.05
+    heading_drift: float = 0.01
+    resample_threshold: float = Field(0.5, ge=0, le=1)
+    anchors: Optional[List[List[float]]] = None            # for range fixes
+    radio_map: Optional[List[List[Optional[float]]]] = None  # for scan fixes
+    radio_map_coords: Optional[List[List[float]]] = None
+    floor_id: Optional[int] = None        # reject particle moves through walls
+    seed: Optional[int] = None
+
+
+class FusionFix(BaseModel):
+    """One measurement at time ``t`` (s since the first IMU sample):
+    a position fix (x, y), ranges to ``anchors``, or a raw RSSI ``scan``."""
+    t: float
+    x: Optional[float] = None
+    y: Optional[float] = None
+    distances: Optional[List[Optional[float]]] = None
+    scan: Optional[List[Optional[float]]] = None
+    sigma: Optional[float] = None       # m for x/y and ranges, dB for scans
+
+
+class FusionRequest(FusionParams):
+    acc_x: List[float]
+    acc_y: List[float]
+    acc_z: List[float]
+    gyro_z: Optional[List[float]] = None
+    mag_heading: Optional[List[float]] = None
+    fixes: List[FusionFix] = []
+
+
+class FusionEstimate(BaseModel):
+    t: float
+    x: float
+    y: float
+    std: float
+    source: str                          # "step" or "fix"
+
+
+class FusionResponse(BaseModel):
+    estimates: List[FusionEstimate]
+    step_count: int
+    resample_count: int
+
+
+class FusionChunk(PDRChunk):
+    fixes: List[FusionFix] = []
+
+
+class FusionChunkResponse(BaseModel):
+    estimates: List[FusionEstimate]
+    step_count: int
+    sample_count: int
+    position: List[float]
+    std: float
+
+
+def _particle_filter(params: FusionParams, db: Session) -> ParticleFilter:
+    def _arr(rows):
+        return None if rows is None else np.array(rows, dtype=float)
+
+    wall_check = None
+    if params.floor_id is not None:
+        f = db.query(Floor).filter(Floor.id == params.floor_id).first()
+        if not f:
+            raise HTTPException(404, "Floor not found")
+        wall_check = floor_occupancy(f).segments_cross_wall
+
+    return ParticleFilter(
+        n_particles=params.n_particles,
+        start_x=params.start_x,
+        start_y=params.start_y,
+        init_spread=params.init_spread,
+        init_heading_spread=params.init_heading_spread,
+        stride_noise=params.stride_noise,
+        heading_noise=params.heading_noise,
+        heading_drift=params.heading_drift,
+        resample_threshold=params.resample_threshold,
+        anchors=_arr(params.anchors),
+        radio_map=_arr(params.radio_map),
+        radio_map_coords=_arr(params.radio_map_coords),
+        wall_check=wall_check,
+        seed=params.seed,
+    )
+
+
+def _fix_dicts(fixes: List[FusionFix]) -> List[dict]:
+    return [
+        {k: (np.array(v, dtype=float) if k in ("distances", "scan") else v)
+         for k, v in f.model_dump(exclude_none=True).items()}
+        for f in fixes
+    ]
+
+
+@router.post("/fusion", response_model=FusionResponse)
+def run_fusion(req: FusionRequest, db: Session = Depends(get_db)):
+    """Batch replay: PDR steps + timestamped WiFi/FTM fixes through a particle filter."""
+    steps, sl, headings = _pdr_steps(
+        np.array(req.acc_x), np.array(req.acc_y), np.array(req.acc_z),
+        np.array(req.gyro_z) if req.gyro_z else None,
+        np.array(req.mag_heading) if req.mag_heading else None,
+        req,
+    )
+    pf = _particle_filter(req, db)
+    step_headings = headings[np.minimum(steps, len(headings) - 1)] if len(steps) else np.zeros(0)
+    try:
+        estimates = fuse(pf, steps / req.sampling_rate, sl, step_headings, _fix_dicts(req.fixes))
+    except ValueError as e:
+        raise HTTPException(400, str(e))
+    return FusionResponse(
+        estimates=estimates,
         step_count=len(steps),
-        stride_lengths=sl.tolist(),
+        resample_count=pf.resample_count,
+    )
+
+
+# In-memory live fusion sessions, same lifetime rules as PDR sessions
+_FUSION_SESSIONS: SessionStore[FusionStream] = SessionStore(PDR_SESSION_TTL_S, "Fusion session")
+
+
+def _fusion_chunk_response(stream: FusionStream, estimates: List[dict]) -> FusionChunkResponse:
+    est = stream.pf.estimate()
+    return FusionChunkResponse(
+        estimates=estimates,
+        step_count=stream.pdr.step_count,
+        sample_count=stream.pdr.sample_count,
+        position=[est["x"], est["y"]],
+        std=est["std"],
+    )
+
+
+@router.post("/fusion/sessions", response_model=PDRSessionResponse, status_code=201)
+def create_fusion_session(params: FusionParams, db: Session = Depends(get_db)):
+    """Start a live fusion session (one particle filter per walker)."""
+    pdr = PDRStream(**PDRParams(**params.model_dump()).model_dump())
+    session_id = _FUSION_SESSIONS.create(FusionStream(pdr, _particle_filter(params, db)))
+    return PDRSessionResponse(session_id=session_id)
+
+
+@router.post("/fusion/sessions/{session_id}/chunk", response_model=FusionChunkResponse)
+def push_fusion_chunk(session_id: str, chunk: FusionChunk):
+    """Feed the next IMU chunk plus any fixes observed during it."""
+    _check_imu_lengths(chunk.acc_x, chunk.acc_y, chunk.acc_z, chunk.gyro_z, chunk.mag_heading)
+    with _session(_FUSION_SESSIONS, session_id) as stream:
+        try:
+            estimates = stream.push(
+                chunk.acc_x, chunk.acc_y, chunk.acc_z,
+                chunk.gyro_z or None, chunk.mag_heading or None,
+                _fix_dicts(chunk.fixes),
+            )
+        except ValueError as e:
+            raise HTTPException(400, str(e))
+        return _fusion_chunk_response(stream, estimates)
+
+
+@router.delete("/fusion/sessions/{session_id}", response_model=FusionChunkResponse)
+def close_fusion_session(session_id: str):
+    """End the walk: flush pending steps and fixes, then drop the session."""
+    with _session(_FUSION_SESSIONS, session_id, close=True) as stream:
+        return _fusion_chunk_response(stream, stream.flush())
+
+
+# ─── HMM map matching ─────────────────────────────────────────────
+
+class MapMatchParams(BaseModel):
+    floor_id: int
+    join_radius: float = Field(1.0, gt=0)   # link points of different paths closer than this
+    max_step: float = Field(3.0, gt=0)      # max walking distance between epochs (m)
+    step_sigma: float = Field(1.0, gt=0)
+    anchors: Optional[List[List[float]]] = None            # for range observations
+    radio_map: Optional[List[List[Optional[float]]]] = None  # for scan observations
+    radio_map_coords: Optional[List[List[float]]] = None
+
+
+class MapMatchObservation(BaseModel):
+    """One epoch: a position estimate (x, y), ranges to ``anchors``, or a raw scan."""
+    x: Optional[float] = None
+    y: Optional[float] = None
+    distances: Optional[List[Optional[float]]] = None
+    scan: Optional[List[Optional[float]]] = None
+    sigma: Optional[float] = None
+
+
+class MapMatchRequest(MapMatchParams):
+    observations: List[MapMatchObservation]
+
+
+class MatchedPoint(BaseModel):
+    epoch: int
+    x: float
+    y: float
+    node: int
+    path_id: int
+
+
+class MapMatchResponse(BaseModel):
+    points: List[MatchedPoint]
+    log_score: Optional[float] = None
+    node_count: int
+
+
+class MapMatchSessionParams(MapMatchParams):
+    lag: int = Field(5, ge=0, le=1000)
+
+
+class MapMatchChunk(BaseModel):
+    observations: List[MapMatchObservation]
+
+
+_PATH_GRAPHS: Dict[tuple, Tuple[PathGraph, List[int]]] = {}
+_PATH_GRAPHS_MAX = 16
+
+
+def _path_graph(params: MapMatchParams, db: Session) -> Tuple[PathGraph, List[int]]:
+    """Cached graph over the floor's discrete path points (+ owning path ids)."""
+    f = db.query(Floor).filter(Floor.id == params.floor_id).first()
+    if not f:
+        raise HTTPException(404, "Floor not found")
+    arrays = [(p.id, p.discrete_array) for p in sorted(f.paths, key=lambda p: p.id)]
+    arrays = [(pid, arr) for pid, arr in arrays if arr is not None and len(arr)]
+    if not arrays:
+        raise HTTPException(400, "Floor has no discretised paths (calibrate it and draw paths first)")
+
+    points = np.vstack([arr[:, 2:4] for _, arr in arrays])
+    owner = [pid for pid, arr in arrays for _ in range(len(arr))]
+    key = (f.id, points.round(4).tobytes(), tuple(owner),
+           params.join_radius, params.max_step, params.step_sigma)
+    cached = _PATH_GRAPHS.get(key)
+    if cached is None:
+        cached = (PathGraph(points, np.array(owner), params.join_radius,
+                            params.max_step, params.step_sigma), owner)
+        if len(_PATH_GRAPHS) >= _PATH_GRAPHS_MAX:
+            _PATH_GRAPHS.pop(next(iter(_PATH_GRAPHS)))
+        _PATH_GRAPHS[key] = cached
+    return cached
+
+
+def _measurement_model(params: MapMatchParams) -> MeasurementModel:
+    def _arr(rows):
+        return None if rows is None else np.array(rows, dtype=float)
+    return MeasurementModel(_arr(params.anchors), _arr(params.radio_map), _arr(params.radio_map_coords))
+
+
+def _matched(graph: PathGraph, owner: List[int], decided) -> List[MatchedPoint]:
+    return [
+        MatchedPoint(
+            epoch=epoch, x=float(graph.points[node, 0]), y=float(graph.points[node, 1]),
+            node=int(node), path_id=owner[node],
+        )
+        for epoch, node in decided
+    ]
+
+
+@router.post("/mapmatch", response_model=MapMatchResponse)
+def run_map_match(req: MapMatchRequest, db: Session = Depends(get_db)):
+    """Snap a whole sequence of position estimates / measurements onto the floor paths."""
+    graph, owner = _path_graph(req, db)
+    try:
+        emissions = log_emissions(graph, _fix_dicts(req.observations), _measurement_model(req))
+    except ValueError as e:
+        raise HTTPException(400, str(e))
+    path, score = viterbi(graph, emissions)
+    return MapMatchResponse(
+        points=_matched(graph, owner, enumerate(path.tolist())),
+        log_score=score,
+        node_count=graph.node_count,
+    )
+
+
+# Live fixed-lag map matching sessions, same lifetime rules as PDR sessions
+_MAPMATCH_SESSIONS: SessionStore[Tuple[ViterbiStream, MeasurementModel, List[int]]] = SessionStore(
+    PDR_SESSION_TTL_S, "Map matching session",
+)
+
+
+@router.post("/mapmatch/sessions", response_model=PDRSessionResponse, status_code=201)
+def create_map_match_session(params: MapMatchSessionParams, db: Session = Depends(get_db)):
+    """Start fixed-lag map matching: each epoch is decided ``lag`` epochs later."""
+    graph, owner = _path_graph(params, db)
+    session_id = _MAPMATCH_SESSIONS.create(
+        (ViterbiStream(graph, params.lag), _measurement_model(params), owner),
     )
+    return PDRSessionResponse(session_id=session_id)
+
+
+@router.post("/mapmatch/sessions/{session_id}/observations", response_model=MapMatchResponse)
+def push_map_match_observations(session_id: str, chunk: MapMatchChunk):
+    with _session(_MAPMATCH_SESSIONS, session_id) as (stream, model, owner):
+        try:
+            emissions = log_emissions(stream.graph, _fix_dicts(chunk.observations), model)
+        except ValueError as e:
+            raise HTTPException(400, str(e))
+        decided = [d for e in emissions for d in stream.push(e)]
+        return MapMatchResponse(points=_matched(stream.graph, owner, decided), node_count=stream.graph.node_count)
+
+
+@router.delete("/mapmatch/sessions/{session_id}", response_model=MapMatchResponse)
+def close_map_match_session(session_id: str):
+    """End the walk: decide the remaining epochs and drop the session."""
+    with _session(_MAPMATCH_SESSIONS, session_id, close=True) as (stream, _, owner):
+        return MapMatchResponse(points=_matched(stream.graph, owner, stream.flush()), node_count=stream.graph.node_count)
 
 
 # ─── BLE Smoothing ───────────────────────────────────────────────
 
 class BLESmoothRequest(BaseModel):
     rssi_values: List[float]
-    method: str = "kalman"  # "kalman" or "moving_average"
+    method: str = "kalman"  # "kalman", "moving_average", "causal_moving_average" or "ema"
     process_noise: float = 1.0
     measurement_noise: float = 5.0
     window_size: int = 5
+    alpha: float = 0.3      # EMA smoothing factor
 
 
 class BLESmoothResponse(BaseModel):
@@ -598,11 +1238,119 @@ class BLESmoothResponse(BaseModel):
 def run_ble_smooth(req: BLESmoothRequest):
     if req.method == "moving_average":
         smoothed = smooth_rssi_moving_average(req.rssi_values, req.window_size)
+    elif req.method == "causal_moving_average":
+        smoothed = causal_moving_average(req.rssi_values, req.window_size)
+    elif req.method == "ema":
+        smoothed = exponential_moving_average(req.rssi_values, req.alpha)
     else:
         smoothed = smooth_rssi_kalman(req.rssi_values, req.process_noise, req.measurement_noise)
     return BLESmoothResponse(original=req.rssi_values, smoothed=smoothed)
 
 
+class BLEBatchSmoothRequest(BaseModel):
+    rssi: List[List[Optional[float]]]   # (T, B) matrix, null = missing sample
+    process_noise: float = 1.0
+    measurement_noise: float = 5.0
+    steady_state: bool = False          # constant-gain IIR fast path
+
+
+class BLEBatchSmoothResponse(BaseModel):
+    smoothed: List[List[Optional[float]]]   # (T, B), null before first reading
+
+
+def _ble_smooth_batch_arrays(
+    rssi: np.ndarray,
+    process_noise: float,
+    measurement_noise: float,
+    steady_state: bool,
+) -> BLEBatchSmoothResponse:
+    if rssi.ndim != 2:
+        raise HTTPException(400, "rssi must be a 2-D matrix (time × beacons)")
+    smoothed = smooth_rssi_kalman_batch(
+        rssi, process_noise, measurement_noise, steady_state=steady_state,
+    )
+    out = smoothed.astype(object)
+    out[np.isnan(smoothed)] = None
+    return BLEBatchSmoothResponse(smoothed=out.tolist())
+
+
+@router.post("/ble/smooth-batch", response_model=BLEBatchSmoothResponse)
+def run_ble_smooth_batch(req: BLEBatchSmoothRequest):
+    """Kalman-smooth a (time × beacons) RSSI matrix in one pass."""
+    try:
+        rssi = np.array(req.rssi, dtype=float)
+    except ValueError:
+        raise HTTPException(400, "rssi rows must all have the same length")
+    return _ble_smooth_batch_arrays(
+        rssi, req.process_noise, req.measurement_noise, req.steady_state,
+    )
+
+
+@router.post("/ble/smooth-batch/binary", response_model=BLEBatchSmoothResponse)
+async def run_ble_smooth_batch_binary(
+    request: Request,
+    process_noise: float = Query(1.0),
+    measurement_noise: float = Query(5.0),
+    steady_state: bool = Query(False),
+):
+    """Batch smoothing with an ``.npz`` body holding ``rssi`` (T×B, NaN = missing)."""
+    arrays = await _read_binary_arrays(request, None, {"rssi": 2})
+    return await run_in_threadpool(
+        _ble_smooth_batch_arrays,
+        arrays["rssi"], process_noise, measurement_noise, steady_state,
+    )
+
+
+# ─── BLE live smoothing (server-side state) ──────────────────────
+
+class BLEReading(BaseModel):
+    beacon: str
+    rssi: float
+
+
+class BLELiveRequest(BaseModel):
+    device_id: str
+    readings: List[BLEReading]          # new readings only, in arrival order
+    method: str = "kalman"              # "kalman", "moving_average" or "ema"
+    process_noise: float = 1.0
+    measurement_noise: float = 5.0
+    alpha: float = 0.3                  # EMA smoothing factor
+
+
+class BLELiveResponse(BaseModel):
+    device_id: str
+    filtered: List[float]               # aligned with readings
+    tracked_beacons: int                # live (device, beacon) states server-wide
+
+
+# Per-(device, beacon) filter state, kept between requests and evicted after
+# BLE_STATE_TTL_S seconds without a reading. The causal moving average uses
+# a fixed BLE_LIVE_WINDOW-sample ring buffer per key.
+_BLE_STATE = RSSIStateTable(window_size=BLE_LIVE_WINDOW)
+
+
+@router.post("/ble/live", response_model=BLELiveResponse)
+def run_ble_live(req: BLELiveRequest):
+    """Filter a batch of new readings against the stored per-beacon state."""
+    now = time.time()
+    _BLE_STATE.maybe_evict(BLE_STATE_TTL_S, now)
+    keys = [(req.device_id, r.beacon) for r in req.readings]
+    values = [r.rssi for r in req.readings]
+    if req.method == "moving_average":
+        filtered = _BLE_STATE.update_moving_average(keys, values, now)
+    elif req.method == "ema":
+        filtered = _BLE_STATE.update_ema(keys, values, req.alpha, now)
+    else:
+        filtered = _BLE_STATE.update_kalman(
+            keys, values, req.process_noise, req.measurement_noise, now,
+        )
+    return BLELiveResponse(
+        device_id=req.device_id,
+        filtered=filtered.tolist(),
+        tracked_beacons=len(_BLE_STATE),
+    )
+
+
 # ─── FTM ──────────────────────────────────────────────────────────
 
 class FTMAnchorInput(BaseModel):
@@ -641,14 +1389,11 @@ class DFPResponse(BaseModel):
     z_scores: List[float]
 
 
-@router.post("/dfp", response_model=DFPResponse)
-def run_dfp(req: DFPRequest):
-    try:
-        baseline = np.array(req.baseline_rssi, dtype=float)
-        active = np.array(req.active_rssi, dtype=float)
-    except ValueError:
-        raise HTTPException(400, "baseline_rssi and active_rssi rows must all have the same length")
-
+def _dfp_arrays(
+    baseline: np.ndarray,
+    active: np.ndarray,
+    threshold_sigma: float,
+) -> DFPResponse:
     if baseline.ndim != 2 or active.ndim != 2:
         raise HTTPException(400, "baseline_rssi and active_rssi must be non-empty 2-D matrices (time × links)")
     if baseline.shape[1] != active.shape[1]:
@@ -657,17 +1402,326 @@ def run_dfp(req: DFPRequest):
             f"Link count mismatch: baseline has {baseline.shape[1]} links, active has {active.shape[1]}",
         )
 
-    b_mean, b_std = compute_baseline(baseline)
-    result = detect_anomaly(active, b_mean, b_std, req.threshold_sigma)
+    with stage("solve"):
+        b_mean, b_std = compute_baseline(baseline)
+        result = detect_anomaly(active, b_mean, b_std, threshold_sigma)
 
     return DFPResponse(**result)
 
 
+@router.post("/dfp", response_model=DFPResponse)
+async def run_dfp(req: DFPRequest):
+    try:
+        with stage("parse"):
+            baseline = np.array(req.baseline_rssi, dtype=float)
+            active = np.array(req.active_rssi, dtype=float)
+    except ValueError:
+        raise HTTPException(400, "baseline_rssi and active_rssi rows must all have the same length")
+
+    return await _offload("dfp", _dfp_arrays, baseline, active, req.threshold_sigma)
+
+
+@router.post("/dfp/binary", response_model=DFPResponse)
+async def run_dfp_binary(
+    request: Request,
+    threshold_sigma: float = Query(2.0),
+):
+    """DFP with an ``.npz`` body holding ``baseline_rssi`` and ``active_rssi``
+    (time × links) matrices."""
+    arrays = await _read_binary_arrays(request, None, {"baseline_rssi": 2, "active_rssi": 2})
+    return await _offload(
+        "dfp", _dfp_arrays, arrays["baseline_rssi"], arrays["active_rssi"], threshold_sigma,
+    )
+
+
+# ─── DFP baselines (streaming, persisted) ─────────────────────────
+
+class DFPBaselineCreate(BaseModel):
+    link_count: int = Field(..., gt=0)
+    name: Optional[str] = None
+    baseline_rssi: Optional[List[List[float]]] = None  # optional first (T, L) block
+
+
+class DFPSamplesRequest(BaseModel):
+    rssi: List[List[float]]   # (T, L) block of empty-room samples
+
+
+class DFPBaselineResponse(BaseModel):
+    id: int
+    name: Optional[str] = None
+    link_count: int
+    sample_count: int
+    mean: List[float]
+    std: List[float]
+
+
+class DFPDetectRequest(BaseModel):
+    active_rssi: List[List[float]]   # (T_active, L) matrix
+    threshold_sigma: float = 2.0
+
+
+def _get_dfp_baseline(baseline_id: int, db: Session, for_update: bool = False) -> DFPBaseline:
+    query = db.query(DFPBaseline).filter(DFPBaseline.id == baseline_id)
+    row = (query.with_for_update() if for_update else query).first()
+    if not row:
+        raise HTTPException(404, "DFP baseline not found")
+    return row
+
+
+def _welford(row: DFPBaseline) -> WelfordBaseline:
+    return WelfordBaseline(row.link_count, row.sample_count, row.mean, row.m2)
+
+
+def _dfp_baseline_response(row: DFPBaseline) -> DFPBaselineResponse:
+    return DFPBaselineResponse(
+        id=row.id,
+        name=row.name,
+        link_count=row.link_count,
+        sample_count=row.sample_count,
+        mean=row.mean,
+        std=_welford(row).std.tolist(),
+    )
+
+
+# Compare-and-swap attempts before a contended append gives up with 409
+_DFP_APPEND_RETRIES = 8
+
+
+def _append_dfp_samples(baseline_id: int, rssi: np.ndarray, db: Session) -> DFPBaselineResponse:
+    """
+    Fold a sample block into a stored baseline without losing concurrent blocks.
+
+    The row is read FOR UPDATE (a no-op on SQLite) and written back only if
+    ``sample_count`` – which every non-empty block increases – is unchanged;
+    otherwise another block landed in between and the merge is redone.
+    """
+    for _ in range(_DFP_APPEND_RETRIES):
+        row = _get_dfp_baseline(baseline_id, db, for_update=True)
+        seen = row.sample_count
+        try:
+            stats = _welford(row).update(rssi)
+        except ValueError as e:
+            db.rollback()
+            raise HTTPException(400, str(e))
+        if stats.count == seen:                 # empty block, nothing to write
+            db.rollback()
+            return _dfp_baseline_response(_get_dfp_baseline(baseline_id, db))
+        updated = (
+            db.query(DFPBaseline)
+            .filter(DFPBaseline.id == baseline_id, DFPBaseline.sample_count == seen)
+            .update(
+                {"sample_count": stats.count, "mean": stats.mean.tolist(), "m2": stats.m2.tolist()},
+                synchronize_session=False,
+            )
+        )
+        db.commit()
+        if updated:
+            return _dfp_baseline_response(_get_dfp_baseline(baseline_id, db))
+    raise HTTPException(409, "DFP baseline is being updated concurrently, retry the request")
+
+
+def _as_matrix(rows: List[List[float]], name: str) -> np.ndarray:
+    try:
+        return np.array(rows, dtype=float)
+    except ValueError:
+        raise HTTPException(400, f"{name} rows must all have the same length")
+
+
+@router.post("/dfp/baselines", response_model=DFPBaselineResponse, status_code=201)
+def create_dfp_baseline(req: DFPBaselineCreate, db: Session = Depends(get_db)):
+    """Create a persisted baseline, optionally seeded with a first sample block."""
+    row = DFPBaseline(
+        name=req.name,
+        link_count=req.link_count,
+        sample_count=0,
+        mean=[0.0] * req.link_count,
+        m2=[0.0] * req.link_count,
+    )
+    if req.baseline_rssi:
+        try:
+            stats = WelfordBaseline(req.link_count).update(
+                _as_matrix(req.baseline_rssi, "baseline_rssi"),
+            )
+        except ValueError as e:
+            raise HTTPException(400, str(e))
+        row.sample_count = stats.count
+        row.mean = stats.mean.tolist()
+        row.m2 = stats.m2.tolist()
+    db.add(row)
+    db.commit()
+    db.refresh(row)
+    return _dfp_baseline_response(row)
+
+
+@router.get("/dfp/baselines/{baseline_id}", response_model=DFPBaselineResponse)
+def get_dfp_baseline(baseline_id: int, db: Session = Depends(get_db)):
+    return _dfp_baseline_response(_get_dfp_baseline(baseline_id, db))
+
+
+@router.post("/dfp/baselines/{baseline_id}/samples", response_model=DFPBaselineResponse)
+def append_dfp_baseline_samples(
+    baseline_id: int,
+    req: DFPSamplesRequest,
+    db: Session = Depends(get_db),
+):
+    """Fold another block of empty-room samples into the baseline."""
+    return _append_dfp_samples(baseline_id, _as_matrix(req.rssi, "rssi"), db)
+
+
+@router.post("/dfp/baselines/{baseline_id}/samples/binary", response_model=DFPBaselineResponse)
+async def append_dfp_baseline_samples_binary(
+    baseline_id: int,
+    request: Request,
+    db: Session = Depends(get_db),
+):
+    """Binary variant: ``.npz`` body holding an ``rssi`` (T×L) block."""
+    arrays = await _read_binary_arrays(request, None, {"rssi": 2})
+    # The lookup and the merge both hit the database: keep them off the loop
+    return await run_in_threadpool(_append_dfp_samples, baseline_id, arrays["rssi"], db)
+
+
+@router.delete("/dfp/baselines/{baseline_id}", status_code=204)
+def delete_dfp_baseline(baseline_id: int, db: Session = Depends(get_db)):
+    row = _get_dfp_baseline(baseline_id, db)
+    db.delete(row)
+    db.commit()
+
+
+@router.post("/dfp/baselines/{baseline_id}/detect", response_model=DFPResponse)
+def detect_with_dfp_baseline(
+    baseline_id: int,
+    req: DFPDetectRequest,
+    db: Session = Depends(get_db),
+):
+    """Active-phase detection against a stored baseline (only new samples shipped)."""
+    row = _get_dfp_baseline(baseline_id, db)
+    if row.sample_count == 0:
+        raise HTTPException(400, "Baseline has no samples yet")
+    active = _as_matrix(req.active_rssi, "active_rssi")
+    if active.ndim != 2 or active.shape[1] != row.link_count:
+        raise HTTPException(
+            400,
+            f"active_rssi must be a (T, {row.link_count}) matrix for this baseline",
+        )
+    stats = _welford(row)
+    result = detect_anomaly(active, stats.mean, stats.std, req.threshold_sigma)
+    return DFPResponse(**result)
+
+
+# ─── DFP localisation (Radio Tomographic Imaging) ─────────────────
+
+class RTIRequest(BaseModel):
+    floor_id: int
+    z_scores: List[float]            # per-link attenuation, e.g. detect_anomaly z-scores
+    voxel_size: float = Field(0.5, gt=0)
+    ellipse_width: float = Field(0.1, gt=0)   # excess path length λ (m)
+    alpha: float = Field(1.0, gt=0)           # Tikhonov regularisation
+
+
+class RTILink(BaseModel):
+    index: int
+    ap_a: int                        # AccessPoint ids of the link endpoints
+    ap_b: int
+
+
+class RTIResponse(BaseModel):
+    x: float
+    y: float
+    peak: float
+    x0: float                        # metres of the image's lower-left corner
+    y0: float
+    voxel_size: float
+    image: List[List[float]]         # (ny, nx), row 0 at y0
+
+
+# RTI models per floor / AP layout / grid settings. Building the weight
+# matrix and its factorisation is the expensive part, so it happens once per key.
+_RTI_CACHE: Dict[tuple, RTIModel] = {}
+_RTI_CACHE_MAX = 16
+
+
+def _rti_nodes(floor_id: int, db: Session) -> Tuple[Floor, List[AccessPoint]]:
+    f = db.query(Floor).filter(Floor.id == floor_id).first()
+    if not f:
+        raise HTTPException(404, "Floor not found")
+    aps = sorted(
+        (ap for ap in f.access_points if ap.x_m is not None and ap.y_m is not None),
+        key=lambda ap: ap.id,
+    )
+    if len(aps) < 2:
+        raise HTTPException(400, "RTI needs at least 2 calibrated access points on the floor")
+    return f, aps
+
+
+def _rti_bounds(f: Floor, nodes: np.ndarray) -> Tuple[float, float, float, float]:
+    """Floor image extent in metres, or the AP bounding box + 1 m margin."""
+    if f.width_px and f.height_px and f.pixels_per_meter and f.origin_px:
+        ox, oy, ppm = f.origin_px["x"], f.origin_px["y"], f.pixels_per_meter
+        return (-ox / ppm, (oy - f.height_px) / ppm, (f.width_px - ox) / ppm, oy / ppm)
+    lo = nodes.min(axis=0) - 1.0
+    hi = nodes.max(axis=0) + 1.0
+    return (lo[0], lo[1], hi[0], hi[1])
+
+
+def _rti_model(
+    f: Floor,
+    aps: List[AccessPoint],
+    voxel_size: float,
+    ellipse_width: float,
+    alpha: float,
+) -> RTIModel:
+    nodes = np.array([(ap.x_m, ap.y_m) for ap in aps], dtype=float)
+    bounds = _rti_bounds(f, nodes)
+    key = (f.id, tuple(map(tuple, nodes.round(4))), bounds, voxel_size, ellipse_width, alpha)
+    model = _RTI_CACHE.get(key)
+    if model is None:
+        try:
+            model = RTIModel(nodes, bounds, voxel_size, ellipse_width, alpha,
+                             max_voxels=RTI_MAX_VOXELS, max_links=RTI_MAX_LINKS)
+        except ValueError as e:
+            raise HTTPException(400, str(e))
+        if len(_RTI_CACHE) >= _RTI_CACHE_MAX:
+            _RTI_CACHE.pop(next(iter(_RTI_CACHE)))
+        _RTI_CACHE[key] = model
+    return model
+
+
+@router.get("/dfp/rti/{floor_id}/links", response_model=List[RTILink])
+def get_rti_links(floor_id: int, db: Session = Depends(get_db)):
+    """Link order expected by /dfp/rti: every pair of the floor's calibrated APs."""
+    _, aps = _rti_nodes(floor_id, db)
+    return [
+        RTILink(index=i, ap_a=aps[a].id, ap_b=aps[b].id)
+        for i, (a, b) in enumerate(link_pairs(len(aps)).tolist())
+    ]
+
+
+@router.post("/dfp/rti", response_model=RTIResponse)
+def run_rti(req: RTIRequest, db: Session = Depends(get_db)):
+    """Locate a person from per-link attenuation with radio tomographic imaging."""
+    f, aps = _rti_nodes(req.floor_id, db)
+    model = _rti_model(f, aps, req.voxel_size, req.ellipse_width, req.alpha)
+    try:
+        result = model.locate(np.array(req.z_scores, dtype=float))
+    except ValueError as e:
+        raise HTTPException(400, str(e))
+    return RTIResponse(
+        x=result["x"],
+        y=result["y"],
+        peak=result["peak"],
+        x0=model.x0,
+        y0=model.y0,
+        voxel_size=model.voxel_size,
+        image=result["image"].tolist(),
+    )
+
+
 # ─── Error Analysis ──────────────────────────────────────────────
 
 class ErrorAnalysisRequest(BaseModel):
     estimated: List[List[float]]      # [(x, y), ...]
     ground_truth: List[List[float]]   # [(x, y), ...]
+    num_bins: int = Field(200, ge=2, le=10000)
 
 
 class ErrorAnalysisResponse(BaseModel):
@@ -688,10 +1742,215 @@ def run_error_analysis(req: ErrorAnalysisRequest):
 
     errors = euclidean_error(est, gt)
     stats = error_statistics(errors)
-    cdf = compute_cdf(errors)
+    cdf = compute_cdf(errors, req.num_bins)
 
-    return ErrorAnalysisResponse(
-        errors=errors.tolist(),
-        statistics=stats,
-        cdf=cdf,
+    return NumpyJSONResponse({"errors": errors, "statistics": stats, "cdf": cdf})
+
+
+class ErrorSketchRequest(BaseModel):
+    """One evaluation chunk, optionally folded into a sketch from earlier chunks."""
+    estimated: List[List[float]] = []     # [(x, y), ...]
+    ground_truth: List[List[float]] = []  # [(x, y), ...]
+    sketch: Optional[dict] = None         # state returned by a previous call
+    relative_accuracy: float = Field(0.01, gt=0, lt=1)
+    num_bins: int = Field(200, ge=2, le=10000)
+
+
+class ErrorSketchMergeRequest(BaseModel):
+    sketches: List[dict]
+    num_bins: int = Field(200, ge=2, le=10000)
+
+
+class ErrorSketchResponse(BaseModel):
+    count: int
+    sketch: dict
+    statistics: dict
+    cdf: dict
+
+
+def _load_sketch(state: dict) -> ErrorSketch:
+    try:
+        return ErrorSketch.from_dict(state)
+    except (KeyError, TypeError, ValueError, OverflowError) as e:
+        raise HTTPException(400, f"Invalid sketch state: {e}")
+
+
+def _sketch_response(sketch: ErrorSketch, num_bins: int) -> ErrorSketchResponse:
+    return ErrorSketchResponse(
+        count=sketch.count,
+        sketch=sketch.to_dict(),
+        statistics=sketch.statistics(),
+        cdf=sketch.cdf(num_bins),
     )
+
+
+@router.post("/analysis/error/sketch", response_model=ErrorSketchResponse)
+def run_error_sketch(req: ErrorSketchRequest):
+    """
+    Streaming error analysis for evaluations too large for /analysis/error.
+
+    Send the evaluation in chunks, passing back the ``sketch`` from the
+    previous response. Response size stays bounded: no per-estimate errors,
+    percentiles within ``relative_accuracy`` and a ``num_bins``-point CDF.
+    """
+    if len(req.estimated) != len(req.ground_truth):
+        raise HTTPException(400, "estimated and ground_truth must have equal length")
+
+    if req.sketch is not None:
+        sketch = _load_sketch(req.sketch)
+    else:
+        try:
+            sketch = ErrorSketch(req.relative_accuracy)
+        except ValueError as e:
+            raise HTTPException(400, str(e))
+
+    if req.estimated:
+        try:
+            est = np.asarray(req.estimated, dtype=float)
+            gt = np.asarray(req.ground_truth, dtype=float)
+        except ValueError:
+            raise HTTPException(400, "estimated and ground_truth must be rectangular matrices")
+        if est.ndim != 2 or gt.ndim != 2 or est.shape[1] < 2 or gt.shape[1] < 2:
+            raise HTTPException(400, "estimated and ground_truth rows need at least (x, y)")
+        try:
+            sketch.add(np.linalg.norm(est[:, :2] - gt[:, :2], axis=1))
+        except ValueError as e:
+            raise HTTPException(400, str(e))
+
+    return _sketch_response(sketch, req.num_bins)
+
+
+@router.post("/analysis/error/sketch/merge", response_model=ErrorSketchResponse)
+def merge_error_sketches(req: ErrorSketchMergeRequest):
+    """Combine sketches built independently (e.g. one per worker or chunk)."""
+    if not req.sketches:
+        raise HTTPException(400, "sketches must not be empty")
+
+    merged = _load_sketch(req.sketches[0])
+    for state in req.sketches[1:]:
+        try:
+            merged.merge(_load_sketch(state))
+        except ValueError as e:
+            raise HTTPException(400, str(e))
+
+    return _sketch_response(merged, req.num_bins)
+
+
+# ─── Comparative Evaluation ──────────────────────────────────────
+
+class EvaluationRequest(BaseModel):
+    """One parsed walk: per-epoch ground truth plus whatever each engine needs."""
+    ground_truth: List[List[float]]                         # T × 2
+    rssi: Optional[List[List[Optional[float]]]] = None      # T × N, null = AP unseen
+    anchors: Optional[List[List[float]]] = None             # N × 2 AP positions
+    radio_map: Optional[List[List[Optional[float]]]] = None  # M × N, same AP order
+    radio_map_coords: Optional[List[List[float]]] = None    # M × 2
+    ftm_distances: Optional[List[List[Optional[float]]]] = None  # T × F meters
+    ftm_anchors: Optional[List[List[float]]] = None         # F × 2
+    engines: Optional[List[str]] = None   # default: every engine with inputs
+    k: int = Field(3, ge=1)
+    path_loss_A: float = -40.0
+    path_loss_n: float = 2.0
+    missing_rssi: float = -100.0          # fill for unseen APs in kNN / WkNN
+    num_bins: int = Field(200, ge=2, le=10000)
+
+
+class EngineEvaluation(BaseModel):
+    estimates: List[Optional[List[float]]]   # null where the engine had no fix
+    errors: List[Optional[float]]
+    statistics: dict
+    cdf: dict
+    wall_time_s: float
+    cpu_time_s: float
+    throughput: float                        # epochs per second
+    failed: int
+
+
+class EvaluationResponse(BaseModel):
+    epochs: int
+    engines: Dict[str, EngineEvaluation]
+
+
+def _optional_matrix(rows, name: str, width: Optional[int] = None) -> Optional[np.ndarray]:
+    if rows is None:
+        return None
+    try:
+        arr = np.array(rows, dtype=float)        # None → NaN
+    except ValueError:
+        raise HTTPException(400, f"{name} must be a rectangular matrix")
+    if arr.ndim != 2 or (width is not None and arr.shape[1] != width):
+        raise HTTPException(400, f"{name} must be a matrix with {width or 'equal-length'} columns")
+    return arr
+
+
+@router.post("/evaluate", response_model=EvaluationResponse)
+def run_evaluation(req: EvaluationRequest):
+    """
+    Run several engines (LS / WLS trilateration, nearest / kNN / WkNN
+    fingerprinting, FTM) on the same walk, one after another (see
+    EVALUATION_MAX_WORKERS), and compare their error statistics, CDFs and cost.
+    """
+    with stage("parse"):
+        gt = _optional_matrix(req.ground_truth, "ground_truth", 2)
+        if gt is None or len(gt) == 0:
+            raise HTTPException(400, "ground_truth must not be empty")
+        dataset = {
+            "ground_truth": gt,
+            "rssi": _optional_matrix(req.rssi, "rssi"),
+            "anchors": _optional_matrix(req.anchors, "anchors", 2),
+            "radio_map": _optional_matrix(req.radio_map, "radio_map"),
+            "radio_map_coords": _optional_matrix(req.radio_map_coords, "radio_map_coords", 2),
+            "ftm_distances": _optional_matrix(req.ftm_distances, "ftm_distances"),
+            "ftm_anchors": _optional_matrix(req.ftm_anchors, "ftm_anchors", 2),
+            "k": req.k,
+            "path_loss_A": req.path_loss_A,
+            "path_loss_n": req.path_loss_n,
+            "missing_rssi": req.missing_rssi,
+        }
+
+    for field in ("rssi", "ftm_distances"):
+        if dataset[field] is not None and len(dataset[field]) != len(gt):
+            raise HTTPException(400, f"{field} must have one row per ground_truth epoch")
+    rssi = dataset["rssi"]
+    if rssi is not None:
+        for field in ("anchors", "radio_map"):
+            arr = dataset[field]
+            if arr is None:
+                continue
+            n_aps = len(arr) if field == "anchors" else arr.shape[1]
+            if n_aps != rssi.shape[1]:
+                raise HTTPException(400, f"{field} AP count must match rssi columns")
+    if dataset["ftm_distances"] is not None and dataset["ftm_anchors"] is not None:
+        if len(dataset["ftm_anchors"]) != dataset["ftm_distances"].shape[1]:
+            raise HTTPException(400, "ftm_anchors count must match ftm_distances columns")
+
+    engines = req.engines or available_engines(dataset)
+    if not engines:
+        raise HTTPException(400, f"No inputs for any engine. Engines: {list(ENGINES)}")
+
+    try:
+        with stage("solve"):
+            results = benchmark(dataset, engines, EVALUATION_MAX_WORKERS, req.num_bins)
+    except ValueError as e:
+        raise HTTPException(400, str(e))
+
+    def _rows(arr: np.ndarray) -> list:
+        return [None if not np.all(np.isfinite(r)) else r.tolist() for r in arr]
+
+    with stage("serialise"):
+        return EvaluationResponse(
+            epochs=len(gt),
+            engines={
+                name: EngineEvaluation(
+                    estimates=_rows(r["estimates"]),
+                    errors=[float(e) if np.isfinite(e) else None for e in r["errors"]],
+                    statistics=r["statistics"],
+                    cdf=r["cdf"],
+                    wall_time_s=r["wall_time_s"],
+                    cpu_time_s=r["cpu_time_s"],
+                    throughput=r["throughput"],
+                    failed=r["failed"],
+                )
+                for name, r in results.items()
+            },
+        )
@@ -5,17 +5,25 @@ via INGEST_API_KEYS). Provides:
   - POST /api/ingest/location   live position updates (kept in memory)
   - GET  /api/ingest/locations  most-recent positions (for the web dashboard)
   - POST /api/ingest/logfile    upload a completed GetSensorData log file
+  - POST /api/ingest/dfp/detectors[/{id}/samples]
+                                real-time device-free presence detection
 """
 
 import time
+from contextlib import contextmanager
 from pathlib import Path
-from typing import Dict, Optional
+from typing import Dict, List, Optional
 
 import shutil
 from fastapi import APIRouter, Depends, Header, HTTPException, UploadFile, File, Form
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
+from sqlalchemy.orm import Session
 
-from config import UPLOAD_DIR, INGEST_API_KEYS
+from config import UPLOAD_DIR, INGEST_API_KEYS, DFP_DETECTOR_TTL_S
+from database import get_db
+from models.dfp import DFPBaseline
+from sessions import SessionStore, SessionNotFound
+from services.device_free import SlidingPresenceDetector, WelfordBaseline
 
 router = APIRouter(prefix="/api/ingest", tags=["ingest"])
 
@@ -89,3 +97,94 @@ async def upload_logfile(
         "building_id": building_id,
         "floor_id": floor_id,
     }
+
+
+# ──────────────────────────────────────────────────
+#  Real-time device-free presence detection
+# ──────────────────────────────────────────────────
+
+class DFPDetectorCreate(BaseModel):
+    baseline_id: int                      # persisted DFP baseline to compare against
+    window_size: int = Field(50, gt=0)    # rolling window length (samples)
+    threshold_sigma: float = 2.0
+    min_links: int = Field(1, gt=0)       # links over threshold to declare presence
+
+
+class DFPDetectorSamples(BaseModel):
+    rssi: List[List[float]]               # (T, L) new samples
+    timestamps: Optional[List[float]] = None
+
+
+# In-memory detectors (same caveats as _LIVE). Each holds only its rolling
+# window, and is dropped after DFP_DETECTOR_TTL_S seconds without samples.
+_DFP_DETECTORS: SessionStore[SlidingPresenceDetector] = SessionStore(DFP_DETECTOR_TTL_S, "Detector")
+
+
+@contextmanager
+def _detector(detector_id: str, close: bool = False):
+    """Lock one detector for a push (unknown / expired ids are 404)."""
+    try:
+        with _DFP_DETECTORS.locked(detector_id, close) as det:
+            yield det
+    except SessionNotFound as e:
+        raise HTTPException(404, e.args[0])
+
+
+def _detector_state(detector_id: str, det: SlidingPresenceDetector) -> dict:
+    return {
+        "detector_id": detector_id,
+        "sample_count": det.sample_count,
+        "present": det.present,
+        "affected_links": det.affected_links,
+        "z_scores": det.z_scores.tolist(),
+        "variance_ratio": det.variance_ratio.tolist(),
+    }
+
+
+@router.post("/dfp/detectors", status_code=201)
+def create_dfp_detector(
+    req: DFPDetectorCreate,
+    db: Session = Depends(get_db),
+    _: str = Depends(require_api_key),
+):
+    """Start a streaming presence detector against a stored baseline."""
+    b = db.query(DFPBaseline).filter(DFPBaseline.id == req.baseline_id).first()
+    if not b:
+        raise HTTPException(404, "DFP baseline not found")
+    if b.sample_count == 0:
+        raise HTTPException(400, "Baseline has no samples yet")
+    stats = WelfordBaseline(b.link_count, b.sample_count, b.mean, b.m2)
+
+    detector_id = _DFP_DETECTORS.create(SlidingPresenceDetector(
+        stats.mean, stats.std, req.window_size, req.threshold_sigma, req.min_links,
+    ))
+    return {"detector_id": detector_id, "link_count": b.link_count}
+
+
+@router.post("/dfp/detectors/{detector_id}/samples")
+def push_dfp_samples(
+    detector_id: str,
+    req: DFPDetectorSamples,
+    _: str = Depends(require_api_key),
+):
+    """Feed new link samples; returns presence events plus the latest z-scores."""
+    with _detector(detector_id) as det:
+        if req.timestamps is not None and len(req.timestamps) != len(req.rssi):
+            raise HTTPException(400, "timestamps must match the number of rssi rows")
+        try:
+            events = det.push(req.rssi, req.timestamps)
+        except ValueError as e:
+            raise HTTPException(400, str(e))
+        return {"events": events, **_detector_state(detector_id, det)}
+
+
+@router.get("/dfp/detectors/{detector_id}")
+def get_dfp_detector(detector_id: str, _: str = Depends(require_api_key)):
+    with _detector(detector_id) as det:
+        return _detector_state(detector_id, det)
+
+
+@router.delete("/dfp/detectors/{detector_id}", status_code=204)
+def delete_dfp_detector(detector_id: str, _: str = Depends(require_api_key)):
+    with _detector(detector_id, close=True):
+        pass                                    # waits for an in-flight push
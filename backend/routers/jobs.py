@@ -0,0 +1,298 @@
+"""Background experiment jobs – lab runs that outlive an HTTP request.
+
+Large ``/fingerprinting-lab`` and ``/trilateration-lab`` submissions time
+out as synchronous calls. Here, submitting returns a job at once (202) and
+a worker pool of EXPERIMENT_JOB_WORKERS threads runs the lab, reporting
+progress in the ``experiment_jobs`` table. Results are stored as
+gzip-compressed JSON and streamed from disk as-is to clients that accept
+gzip.
+
+Each submission is hashed over its kind, parameters and uploaded files. A
+queued, running or finished job with the same hash is returned instead of
+starting a new one; failed jobs are never reused.
+
+``submit_job`` / ``run_job`` are the job mechanism for every background
+kind: radio-map densification (``routers/signal.py``) tracks its jobs in
+the same table with its own worker pool and ``.npz`` results.
+"""
+
+import gzip
+import hashlib
+import json
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, UploadFile, File as FastFile, Form
+from fastapi.responses import FileResponse, Response
+from starlette.concurrency import run_in_threadpool
+from sqlalchemy.orm import Session
+
+from config import UPLOAD_DIR, EXPERIMENT_JOB_WORKERS
+from database import get_db, SessionLocal
+from models.job import ExperimentJob
+from schemas.job import ExperimentJobResponse
+from responses import negotiate_encoding
+from routers.experiments import trilateration_lab, fingerprinting_lab, read_log_uploads
+
+router = APIRouter(prefix="/api/experiments/jobs", tags=["experiments"])
+
+JOB_DIR = UPLOAD_DIR / "jobs"
+JOB_DIR.mkdir(exist_ok=True)
+
+JOB_KINDS: Dict[str, Callable] = {
+    "trilateration-lab": trilateration_lab,
+    "fingerprinting-lab": fingerprinting_lab,
+}
+
+_JOB_POOL = ThreadPoolExecutor(max_workers=max(1, EXPERIMENT_JOB_WORKERS))
+_SUBMIT_LOCK = threading.Lock()       # dedupe check + insert must not interleave
+_PROGRESS_INTERVAL_S = 0.5            # minimum time between progress commits
+
+
+def input_hash(kind: str, args: Dict[str, object]) -> str:
+    """SHA-256 over the job kind and its arguments (texts, bytes, {filename: text}, scalars)."""
+    digest = hashlib.sha256(kind.encode())
+    for name in sorted(args):
+        value = args[name]
+        digest.update(f"\0{name}\0".encode())
+        if isinstance(value, dict):          # uploaded logs, in upload order
+            for fname, text in value.items():
+                digest.update(f"{fname}\0{len(text)}\0".encode())
+                digest.update(text.encode())
+        elif isinstance(value, str):
+            digest.update(f"{len(value)}\0".encode())
+            digest.update(value.encode())
+        elif isinstance(value, bytes):
+            digest.update(f"{len(value)}\0".encode())
+            digest.update(value)
+        else:
+            digest.update(json.dumps(value).encode())
+    return digest.hexdigest()
+
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def run_job(job_id: str, work: Callable[[Callable[[float], None]], Path]):
+    """
+    Run ``work(progress)`` for a queued job, tracking status, progress and
+    timing in its row. ``work`` stores the result and returns its path;
+    an HTTPException or any other exception marks the job failed.
+    """
+    db = SessionLocal()
+    try:
+        job = db.get(ExperimentJob, job_id)
+        job.status, job.started_at = "running", _now()
+        db.commit()
+        started = time.perf_counter()
+        last_commit = [started]
+
+        def progress(fraction: float):
+            now = time.perf_counter()
+            if now - last_commit[0] >= _PROGRESS_INTERVAL_S:
+                last_commit[0] = now
+                job.progress = round(fraction, 4)
+                db.commit()
+
+        try:
+            path = work(progress)
+            job.status, job.progress = "done", 1.0
+            job.result_path, job.result_bytes = str(path), path.stat().st_size
+        except HTTPException as e:
+            job.status, job.error = "failed", str(e.detail)
+        except Exception as e:               # malformed uploads must not leave the job "running"
+            job.status, job.error = "failed", f"{type(e).__name__}: {e}"
+        job.finished_at = _now()
+        job.elapsed_s = round(time.perf_counter() - started, 3)
+        db.commit()
+    finally:
+        db.close()
+
+
+def submit_job(
+    db: Session,
+    kind: str,
+    digest: str,
+    start: Callable[[str], None],
+) -> ExperimentJobResponse:
+    """
+    Reuse a queued, running or finished ``kind`` job with input hash
+    ``digest`` (whose result still exists), or insert a new queued job and
+    call ``start(job_id)`` to schedule it.
+    """
+    with _SUBMIT_LOCK:
+        previous = (
+            db.query(ExperimentJob)
+            .filter(
+                ExperimentJob.kind == kind,
+                ExperimentJob.input_hash == digest,
+                ExperimentJob.status != "failed",
+            )
+            .order_by(ExperimentJob.created_at.desc())
+            .all()
+        )
+        for job in previous:
+            if job.status != "done" or (job.result_path and os.path.exists(job.result_path)):
+                response = ExperimentJobResponse.model_validate(job)
+                response.deduplicated = True
+                return response
+
+        job = ExperimentJob(id=uuid.uuid4().hex, kind=kind, input_hash=digest,
+                            status="queued", progress=0.0)
+        db.add(job)
+        db.commit()
+        db.refresh(job)
+    start(job.id)
+    return ExperimentJobResponse.model_validate(job)
+
+
+def _lab_work(job_id: str, kind: str, args: Dict[str, object]):
+    def work(progress: Callable[[float], None]) -> Path:
+        result = JOB_KINDS[kind](**args, progress=progress)
+        path = JOB_DIR / f"{job_id}.json.gz"
+        path.write_bytes(gzip.compress(result.model_dump_json().encode(), compresslevel=6))
+        return path
+    return work
+
+
+def _submit(db: Session, kind: str, args: Dict[str, object]) -> ExperimentJobResponse:
+    return submit_job(
+        db, kind, input_hash(kind, args),
+        lambda job_id: _JOB_POOL.submit(run_job, job_id, _lab_work(job_id, kind, args)),
+    )
+
+
+def get_job_row(job_id: str, db: Session) -> ExperimentJob:
+    job = db.get(ExperimentJob, job_id)
+    if not job:
+        raise HTTPException(404, "Job not found")
+    return job
+
+
+def fail_interrupted_jobs():
+    """Mark jobs left queued / running by a previous process as failed
+    (their inputs lived in that process's memory)."""
+    db = SessionLocal()
+    try:
+        db.query(ExperimentJob).filter(ExperimentJob.status.in_(["queued", "running"])).update(
+            {"status": "failed", "error": "Interrupted by a server restart; submit again",
+             "finished_at": _now()},
+            synchronize_session=False,
+        )
+        db.commit()
+    finally:
+        db.close()
+
+
+# ─── Submission ──────────────────────────────────────────────────
+
+@router.post("/trilateration-lab", response_model=ExperimentJobResponse, status_code=202)
+async def submit_trilateration_lab(
+    aps_csv: UploadFile = FastFile(..., description="APs CSV: ssid,x,y,bssid"),
+    refpts_csv: UploadFile = FastFile(..., description="RefPts CSV: id,x,y,filetag"),
+    log_files: List[UploadFile] = FastFile(..., description="Dataset log files (one per ref point)"),
+    rssi0: float = Form(-32.0),
+    path_loss_exponent: float = Form(2.45),
+    solver: str = Form("ls"),
+    room_width: float = Form(13.0),
+    room_height: float = Form(13.0),
+    db: Session = Depends(get_db),
+):
+    """``/trilateration-lab`` as a background job; poll ``/jobs/{id}``."""
+    args = {
+        "aps_content": (await aps_csv.read()).decode("utf-8"),
+        "ref_content": (await refpts_csv.read()).decode("utf-8"),
+        "log_contents": await read_log_uploads(log_files),
+        "rssi0": rssi0,
+        "path_loss_exponent": path_loss_exponent,
+        "solver": solver,
+        "room_width": room_width,
+        "room_height": room_height,
+    }
+    return await run_in_threadpool(_submit, db, "trilateration-lab", args)
+
+
+@router.post("/fingerprinting-lab", response_model=ExperimentJobResponse, status_code=202)
+async def submit_fingerprinting_lab(
+    refpts_csv: UploadFile = FastFile(..., description="Ref Points CSV: ID,X,Y,File"),
+    testpts_csv: UploadFile = FastFile(..., description="Test Points CSV: ID,X,Y,File"),
+    train_log_files: List[UploadFile] = FastFile(..., description="Training log files"),
+    test_log_files: List[UploadFile] = FastFile(..., description="Test log files"),
+    k: int = Form(1),
+    algorithm: str = Form("nearest"),
+    max_aps: int = Form(0),
+    pixels_per_meter: float = Form(20.0),
+    scan_mode: str = Form("average"),
+    db: Session = Depends(get_db),
+):
+    """``/fingerprinting-lab`` as a background job; poll ``/jobs/{id}``."""
+    args = {
+        "ref_content": (await refpts_csv.read()).decode("utf-8"),
+        "test_content": (await testpts_csv.read()).decode("utf-8"),
+        "train_contents": await read_log_uploads(train_log_files),
+        "test_contents": await read_log_uploads(test_log_files),
+        "k": k,
+        "algorithm": algorithm,
+        "max_aps": max_aps,
+        "pixels_per_meter": pixels_per_meter,
+        "scan_mode": scan_mode,
+    }
+    return await run_in_threadpool(_submit, db, "fingerprinting-lab", args)
+
+
+# ─── Status & results ────────────────────────────────────────────
+
+@router.get("", response_model=List[ExperimentJobResponse])
+def list_jobs(
+    kind: Optional[str] = Query(None),
+    status: Optional[str] = Query(None),
+    limit: int = Query(50, ge=1, le=500),
+    db: Session = Depends(get_db),
+):
+    """Most recent jobs first."""
+    query = db.query(ExperimentJob)
+    if kind:
+        query = query.filter(ExperimentJob.kind == kind)
+    if status:
+        query = query.filter(ExperimentJob.status == status)
+    return query.order_by(ExperimentJob.created_at.desc()).limit(limit).all()
+
+
+@router.get("/{job_id}", response_model=ExperimentJobResponse)
+def get_job(job_id: str, db: Session = Depends(get_db)):
+    """Status and progress of a job."""
+    return get_job_row(job_id, db)
+
+
+@router.get("/{job_id}/result")
+def get_job_result(job_id: str, request: Request, db: Session = Depends(get_db)):
+    """
+    The lab response of a finished job. Sent gzip-encoded straight from the
+    result store when the client accepts gzip, decompressed otherwise.
+    """
+    job = get_job_row(job_id, db)
+    if job.kind not in JOB_KINDS:
+        raise HTTPException(404, f"{job.kind} results are served by their own endpoints")
+    if job.status != "done":
+        raise HTTPException(409, f"Job has no result (status: {job.status})")
+    path = JOB_DIR / f"{job.id}.json.gz"
+    if not path.exists():
+        raise HTTPException(404, "Job result missing")
+    if negotiate_encoding(request.headers.get("accept-encoding", "")) == "gzip":
+        return FileResponse(
+            path,
+            media_type="application/json",
+            headers={"Content-Encoding": "gzip", "Vary": "Accept-Encoding"},
+        )
+    return Response(
+        gzip.decompress(path.read_bytes()),
+        media_type="application/json",
+        headers={"Vary": "Accept-Encoding"},
+    )
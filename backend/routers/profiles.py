@@ -0,0 +1,76 @@
+"""Retrieval of request profiles captured by ``profiling.ProfilingMiddleware``.
+
+All endpoints require an ``X-Admin-Key`` header (keys configured via
+PROFILER_ADMIN_KEYS; with none configured they always answer 401).
+"""
+
+import re
+from typing import List, Optional
+
+from fastapi import APIRouter, Depends, Header, HTTPException
+from fastapi.responses import FileResponse
+from pydantic import BaseModel
+
+from config import PROFILER_ADMIN_KEYS
+from profiling import artifact_path, list_profiles, load_profile
+
+router = APIRouter(prefix="/api/profiles", tags=["profiles"])
+
+_PROFILE_ID = re.compile(r"[0-9a-f]{12}")
+
+
+def require_admin_key(x_admin_key: Optional[str] = Header(None)) -> str:
+    """FastAPI dependency enforcing a valid X-Admin-Key header."""
+    if not x_admin_key or x_admin_key not in PROFILER_ADMIN_KEYS:
+        raise HTTPException(status_code=401, detail="Invalid or missing admin key")
+    return x_admin_key
+
+
+class ProfileFrame(BaseModel):
+    frame: str                 # "function (path:first line)"
+    self_samples: int
+    total_samples: int
+
+
+class ProfileInfo(BaseModel):
+    id: str
+    method: str
+    path: str
+    route: Optional[str] = None
+    status: int
+    duration_s: float
+    created_at: float
+    samples: int
+    ticks: int
+    interval_s: float
+    top: List[ProfileFrame] = []
+
+
+def _profile_or_404(profile_id: str) -> dict:
+    meta = load_profile(profile_id) if _PROFILE_ID.fullmatch(profile_id) else None
+    if meta is None:
+        raise HTTPException(404, "Profile not found")
+    return meta
+
+
+@router.get("", response_model=List[ProfileInfo])
+def get_profiles(_: str = Depends(require_admin_key)):
+    """Stored profiles, newest first."""
+    return list_profiles()
+
+
+@router.get("/{profile_id}", response_model=ProfileInfo)
+def get_profile(profile_id: str, _: str = Depends(require_admin_key)):
+    """Request metadata and the hottest frames of one profile."""
+    return _profile_or_404(profile_id)
+
+
+@router.get("/{profile_id}/folded")
+def download_profile(profile_id: str, _: str = Depends(require_admin_key)):
+    """Collapsed stacks for flamegraph.pl / speedscope."""
+    _profile_or_404(profile_id)
+    return FileResponse(
+        artifact_path(profile_id, "folded"),
+        media_type="text/plain",
+        filename=f"profile_{profile_id}.folded",
+    )
@@ -5,17 +5,35 @@ the Datasets table.  No new DB models needed — everything is computed on
 the fly from uploaded CSV files.
 """
 
-from typing import List, Optional
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+import json
 import os
+import threading
 
 from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import FileResponse
 from sqlalchemy.orm import Session
+import numpy as np
 import pandas as pd
 
 from database import get_db
+from config import (
+    UPLOAD_DIR, DENSIFY_MAX_WORKERS, DENSIFY_MAX_CELLS,
+    OCCUPANCY_CELL_M, OCCUPANCY_WALL_THRESHOLD,
+)
 from models.dataset import Dataset
 from models.building import Floor
-from schemas.signal import DiscoveredAP, HeatmapPoint, HeatmapResponse
+from models.job import ExperimentJob
+from routers.buildings import floor_occupancy
+from routers.jobs import input_hash, submit_job, run_job
+from services.densification import METHODS, build_grid, densify, save_radio_map, load_radio_map
+from services.propagation import predict_rssi, config_hash
+from responses import NumpyJSONResponse
+from schemas.signal import (
+    DiscoveredAP, HeatmapResponse, DensifyRequest, RadioMapJob,
+    SyntheticMapResponse,
+)
 
 router = APIRouter(prefix="/api/signal", tags=["signal-analyzer"])
 
@@ -96,14 +114,16 @@ def _extract_aps_from_rssi(df: pd.DataFrame) -> List[DiscoveredAP]:
     return aps
 
 
+_FINGERPRINT_SKIP = {"x", "y", "z", "timestamp", "_dataset_id", "_dataset_name"}
+
+
 def _extract_aps_from_fingerprint(df: pd.DataFrame) -> List[DiscoveredAP]:
     """Extract APs from wide-form fingerprint radio maps.
 
     In these CSVs the first couple columns are x, y (and maybe z)
     and every remaining column header is a BSSID, with cells containing RSSI.
     """
-    skip = {"x", "y", "z", "timestamp", "_dataset_id", "_dataset_name"}
-    ap_cols = [c for c in df.columns if c not in skip]
+    ap_cols = [c for c in df.columns if c not in _FINGERPRINT_SKIP]
 
     aps = []
     for col in ap_cols:
@@ -160,14 +180,27 @@ def get_aps(
 #  GET /api/signal/heatmap/{bssid}  — RSSI scatter
 # ──────────────────────────────────────────────────
 
-@router.get("/heatmap/{bssid}", response_model=HeatmapResponse)
-def get_heatmap(
+def _heatmap_response(bssid: str, floor_id: int, x: np.ndarray, y: np.ndarray, rssi: np.ndarray):
+    """HeatmapResponse JSON rendered by orjson, without a model per point."""
+    points = [
+        {"x": px, "y": py, "rssi": pr}
+        for px, py, pr in zip(x.tolist(), y.tolist(), rssi.tolist())
+    ]
+    return NumpyJSONResponse({
+        "bssid": bssid,
+        "floor_id": floor_id,
+        "point_count": len(points),
+        "points": points,
+    })
+
+
+def _heatmap_arrays(
     bssid: str,
-    floor_id: Optional[int] = Query(None),
-    dataset_id: Optional[int] = Query(None),
-    db: Session = Depends(get_db),
+    floor_id: Optional[int],
+    dataset_id: Optional[int],
+    db: Session,
 ):
-    """Return {x, y, rssi} for every reading of the given BSSID."""
+    """(x, y, rssi) float arrays of every reading of the given BSSID."""
 
     if dataset_id is not None:
         ds = db.query(Dataset).get(dataset_id)
@@ -185,7 +218,7 @@ def get_heatmap(
     has_bssid_col = any(c in df.columns for c in ["bssid", "ap_id", "mac_address"])
     if has_bssid_col:
         bssid_col = next(c for c in ["bssid", "ap_id", "mac_address"] if c in df.columns)
-        subset = df[df[bssid_col].astype(str) == bssid].copy()
+        subset = df[df[bssid_col].astype(str) == bssid]
         if subset.empty:
             raise HTTPException(404, f"No readings for BSSID {bssid}")
 
@@ -194,21 +227,9 @@ def get_heatmap(
         y_col = next((c for c in ["y", "lat", "latitude"] if c in subset.columns), None)
         if x_col is None or y_col is None:
             raise HTTPException(422, "Dataset lacks x/y (or lat/lon) columns")
-
-        rssi_col = "rssi" if "rssi" in subset.columns else None
-        if rssi_col is None:
+        if "rssi" not in subset.columns:
             raise HTTPException(422, "Dataset lacks rssi column")
-
-        points = []
-        for _, row in subset.iterrows():
-            try:
-                points.append(HeatmapPoint(
-                    x=float(row[x_col]),
-                    y=float(row[y_col]),
-                    rssi=float(row[rssi_col]),
-                ))
-            except (ValueError, TypeError):
-                continue
+        rssi_col = "rssi"
 
     # --- Wide-form (fingerprint radio map) ---
     else:
@@ -219,29 +240,27 @@ def get_heatmap(
         y_col = "y" if "y" in df.columns else None
         if x_col is None or y_col is None:
             raise HTTPException(422, "Fingerprint map lacks x/y columns")
+        subset, rssi_col = df, bssid
 
-        points = []
-        for _, row in df.iterrows():
-            rssi_val = row.get(bssid)
-            try:
-                rssi_f = float(rssi_val)
-            except (ValueError, TypeError):
-                continue
-            if pd.isna(rssi_f):
-                continue
-            points.append(HeatmapPoint(
-                x=float(row[x_col]),
-                y=float(row[y_col]),
-                rssi=rssi_f,
-            ))
-
-    fid = floor_id or 0
-    return HeatmapResponse(
-        bssid=bssid,
-        floor_id=fid,
-        point_count=len(points),
-        points=points,
+    # Unparseable / missing values become NaN and their rows are skipped
+    x, y, rssi = (
+        pd.to_numeric(subset[col], errors="coerce").to_numpy(dtype=float)
+        for col in (x_col, y_col, rssi_col)
     )
+    keep = np.isfinite(x) & np.isfinite(y) & np.isfinite(rssi)
+    return x[keep], y[keep], rssi[keep]
+
+
+@router.get("/heatmap/{bssid}", response_model=HeatmapResponse)
+def get_heatmap(
+    bssid: str,
+    floor_id: Optional[int] = Query(None),
+    dataset_id: Optional[int] = Query(None),
+    db: Session = Depends(get_db),
+):
+    """Return {x, y, rssi} for every reading of the given BSSID."""
+    x, y, rssi = _heatmap_arrays(bssid, floor_id, dataset_id, db)
+    return _heatmap_response(bssid, floor_id or 0, x, y, rssi)
 
 
 # ──────────────────────────────────────────────────
@@ -256,17 +275,349 @@ def get_bssid_stats(
     db: Session = Depends(get_db),
 ):
     """Quick statistics for a single BSSID."""
-    resp = get_heatmap(bssid, floor_id=floor_id, dataset_id=dataset_id, db=db)
-    if not resp.points:
+    _, _, rssis = _heatmap_arrays(bssid, floor_id, dataset_id, db)
+    if not len(rssis):
         return {"bssid": bssid, "count": 0}
-    rssis = [p.rssi for p in resp.points]
-    import statistics
     return {
         "bssid": bssid,
         "count": len(rssis),
-        "min_rssi": round(min(rssis), 2),
-        "max_rssi": round(max(rssis), 2),
-        "mean_rssi": round(statistics.mean(rssis), 2),
-        "median_rssi": round(statistics.median(rssis), 2),
-        "std_rssi": round(statistics.stdev(rssis), 2) if len(rssis) > 1 else 0,
+        "min_rssi": round(float(rssis.min()), 2),
+        "max_rssi": round(float(rssis.max()), 2),
+        "mean_rssi": round(float(rssis.mean()), 2),
+        "median_rssi": round(float(np.median(rssis)), 2),
+        "std_rssi": round(float(rssis.std(ddof=1)), 2) if len(rssis) > 1 else 0,
     }
+
+
+# ──────────────────────────────────────────────────
+#  Radio-map densification (background jobs)
+# ──────────────────────────────────────────────────
+
+RADIO_MAP_DIR = UPLOAD_DIR / "radio_maps"
+RADIO_MAP_DIR.mkdir(exist_ok=True)
+
+# Status, progress and dedupe live in the experiment_jobs table (routers/jobs.py);
+# the grid description is written next to the .npz as {job_id}.json.
+DENSIFY_JOB_KIND = "radio-map-densify"
+_DENSIFY_POOL = ThreadPoolExecutor(max_workers=max(1, DENSIFY_MAX_WORKERS))
+
+
+def _load_radio_map_dataset(ds: Dataset):
+    """Wide-form radio map → ((M, 2) coords, (M, A) RSSI with NaN, bssids)."""
+    if not os.path.exists(ds.filepath):
+        raise HTTPException(404, "Dataset file missing")
+    df = pd.read_csv(ds.filepath)
+    df.columns = [c.strip().lower() for c in df.columns]
+    if "x" not in df.columns or "y" not in df.columns:
+        raise HTTPException(422, "Fingerprint map lacks x/y columns")
+    bssids = [c for c in df.columns if c not in _FINGERPRINT_SKIP]
+    if not bssids:
+        raise HTTPException(422, "Fingerprint map has no AP columns")
+    coords = df[["x", "y"]].apply(pd.to_numeric, errors="coerce").to_numpy(dtype=float)
+    values = df[bssids].apply(pd.to_numeric, errors="coerce").to_numpy(dtype=float)
+    keep = np.isfinite(coords).all(axis=1)
+    if not keep.any():
+        raise HTTPException(422, "Fingerprint map has no rows with numeric x/y")
+    return coords[keep], values[keep], bssids
+
+
+def _densify_work(job_id: str, coords, values, grid, bssids, method: str, params: dict):
+    def work(progress):
+        try:
+            rssi = densify(coords, values, grid, method, progress=progress, **params)
+        except (ValueError, np.linalg.LinAlgError, MemoryError) as e:
+            raise HTTPException(400, str(e))
+        path = RADIO_MAP_DIR / f"{job_id}.npz"
+        save_radio_map(str(path), grid, rssi, bssids)
+        return path
+    return work
+
+
+def _get_job(job_id: str, db: Session) -> RadioMapJob:
+    meta = RADIO_MAP_DIR / f"{job_id}.json"
+    if not job_id.isalnum() or not meta.exists():
+        raise HTTPException(404, "Radio-map job not found")
+    job = RadioMapJob.model_validate_json(meta.read_text())
+    row = db.get(ExperimentJob, job_id)
+    if row is None:                   # finished before jobs were tracked in the table
+        return job
+    return job.model_copy(update={
+        "status": row.status,
+        "progress": row.progress,
+        "elapsed_s": row.elapsed_s,
+        "error": row.error,
+    })
+
+
+@router.post("/radio-maps/densify", response_model=RadioMapJob, status_code=202)
+def start_densify(req: DensifyRequest, db: Session = Depends(get_db)):
+    """
+    Densify a surveyed radio map onto a regular grid in the background.
+
+    The grid covers the floor image (minus wall cells) when ``floor_id`` is
+    given, otherwise the bounding box of the survey. Poll the returned job;
+    when done, the dense map is downloadable as ``.npz`` and usable
+    directly with ``/api/experiments/fingerprint/binary``.
+    """
+    if req.method not in METHODS:
+        raise HTTPException(400, f"Unknown method '{req.method}'. Choose from {list(METHODS)}")
+    ds = db.query(Dataset).get(req.dataset_id)
+    if not ds:
+        raise HTTPException(404, "Dataset not found")
+    if ds.data_type != "fingerprint_radio_map":
+        raise HTTPException(400, "Dataset is not a fingerprint radio map")
+    coords, values, bssids = _load_radio_map_dataset(ds)
+
+    occupancy = None
+    if req.floor_id is not None:
+        floor = db.query(Floor).get(req.floor_id)
+        if not floor:
+            raise HTTPException(404, "Floor not found")
+        occupancy = floor_occupancy(floor)
+        bounds = occupancy.summary()["bounds_m"]
+    else:
+        bounds = (*coords.min(axis=0), *coords.max(axis=0))
+    try:
+        grid = build_grid(bounds, req.grid_spacing_m, occupancy, DENSIFY_MAX_CELLS)
+    except ValueError as e:
+        raise HTTPException(400, str(e))
+
+    if req.method == "idw":
+        params = {"k": req.k, "power": req.power, "floor_dbm": req.floor_dbm}
+    else:
+        params = {
+            "n_inducing": req.n_inducing,
+            "length_scale": req.length_scale_m,
+            "signal_db": req.signal_db,
+            "noise_db": req.noise_db,
+            "floor_dbm": req.floor_dbm,
+        }
+
+    def start(job_id: str):
+        (RADIO_MAP_DIR / f"{job_id}.json").write_text(RadioMapJob(
+            job_id=job_id,
+            status="queued",
+            dataset_id=ds.id,
+            floor_id=req.floor_id,
+            method=req.method,
+            floor_dbm=req.floor_dbm,
+            cell_count=len(grid),
+            ap_count=len(bssids),
+            survey_points=len(coords),
+        ).model_dump_json())
+        _DENSIFY_POOL.submit(
+            run_job, job_id,
+            _densify_work(job_id, coords, values, grid, bssids, req.method, params),
+        )
+
+    digest = input_hash(DENSIFY_JOB_KIND, {
+        "coords": coords.tobytes(),
+        "values": values.tobytes(),
+        "bssids": "\n".join(bssids),
+        "grid": grid.tobytes(),
+        "method": req.method,
+        "params": json.dumps(params, sort_keys=True),
+    })
+    submitted = submit_job(db, DENSIFY_JOB_KIND, digest, start)
+    job = _get_job(submitted.id, db)
+    job.deduplicated = submitted.deduplicated
+    return job
+
+
+@router.get("/radio-maps/{job_id}", response_model=RadioMapJob)
+def get_densify_job(job_id: str, db: Session = Depends(get_db)):
+    """Status and progress of a densification job."""
+    return _get_job(job_id, db)
+
+
+def _dense_map_path(job: RadioMapJob) -> str:
+    if job.status != "done":
+        raise HTTPException(409, f"Radio map is not ready (status: {job.status})")
+    path = RADIO_MAP_DIR / f"{job.job_id}.npz"
+    if not path.exists():
+        raise HTTPException(404, "Radio-map file missing")
+    return str(path)
+
+
+@router.get("/radio-maps/{job_id}/download")
+def download_dense_map(job_id: str, db: Session = Depends(get_db)):
+    """Dense map as ``.npz``: ``radio_map`` (G×A int8 dBm),
+    ``radio_map_coords`` (G×2) and ``bssids`` (A)."""
+    return FileResponse(
+        _dense_map_path(_get_job(job_id, db)),
+        media_type="application/x-npz",
+        filename=f"radio_map_{job_id}.npz",
+    )
+
+
+def _grid_heatmap(
+    dense: Dict[str, np.ndarray],
+    bssid: str,
+    floor_id: int,
+    floor_dbm: float,
+    include_unheard: bool,
+) -> NumpyJSONResponse:
+    """HeatmapResponse for one BSSID column of a gridded int8 radio map."""
+    matches = np.flatnonzero(dense["bssids"] == bssid.strip().lower())
+    if not len(matches):
+        raise HTTPException(404, f"BSSID {bssid} not in radio map")
+    rssi = dense["radio_map"][:, matches[0]]
+    coords = dense["radio_map_coords"]
+    if not include_unheard:
+        heard = rssi > max(floor_dbm, -128)   # predictions are clipped at the floor
+        coords, rssi = coords[heard], rssi[heard]
+    coords = coords.astype(float)
+    return _heatmap_response(bssid, floor_id, coords[:, 0], coords[:, 1], rssi.astype(float))
+
+
+@router.get("/radio-maps/{job_id}/heatmap/{bssid}", response_model=HeatmapResponse)
+def get_dense_heatmap(
+    job_id: str,
+    bssid: str,
+    include_unheard: bool = Query(False),
+    db: Session = Depends(get_db),
+):
+    """Predicted RSSI of one BSSID on every grid cell of a dense map."""
+    job = _get_job(job_id, db)
+    dense = load_radio_map(_dense_map_path(job))
+    return _grid_heatmap(dense, bssid, job.floor_id or 0, job.floor_dbm, include_unheard)
+
+
+# ──────────────────────────────────────────────────
+#  Synthetic radio maps (propagation model)
+# ──────────────────────────────────────────────────
+
+# Loaded maps by configuration hash; the .npz files stay on disk.
+# _SYNTHETIC_LOCK only guards the two dicts; a build holds its key's lock, so
+# one configuration is built once while other configurations proceed.
+_SYNTHETIC: Dict[str, Dict[str, np.ndarray]] = {}
+_SYNTHETIC_BUILDS: Dict[str, threading.Lock] = {}
+_SYNTHETIC_LOCK = threading.Lock()
+_SYNTHETIC_MEMORY_SLOTS = 8
+
+
+def _synthetic_params(
+    grid_spacing_m: float = Query(0.5, gt=0),
+    path_loss_n: float = Query(2.2, gt=0),
+    wall_loss_db: float = Query(5.0, ge=0),
+    max_walls: int = Query(8, ge=0),
+    walls: bool = Query(True),
+    floor_dbm: float = Query(-100.0, le=0),
+) -> dict:
+    return {
+        "grid_spacing_m": grid_spacing_m,
+        "path_loss_n": path_loss_n,
+        "wall_loss_db": wall_loss_db,
+        "max_walls": max_walls,
+        "walls": walls,
+        "floor_dbm": floor_dbm,
+    }
+
+
+def _synthetic_map(floor_id: int, params: dict, db: Session):
+    """(hash, map) for a floor's APs under ``params``, computed once per configuration."""
+    floor = db.query(Floor).get(floor_id)
+    if not floor:
+        raise HTTPException(404, "Floor not found")
+    if not floor.pixels_per_meter or not floor.origin_px:
+        raise HTTPException(400, "Floor must be calibrated and have an origin")
+    aps = [
+        {"bssid": ap.bssid.strip().lower(), "x_m": ap.x_m, "y_m": ap.y_m,
+         "tx_power_dbm": ap.tx_power_dbm, "frequency_mhz": ap.frequency_mhz}
+        for ap in (floor.access_points or []) if ap.x_m is not None and ap.y_m is not None
+    ]
+    if not aps:
+        raise HTTPException(400, "Floor has no positioned access points")
+
+    ppm, ox, oy = floor.pixels_per_meter, floor.origin_px["x"], floor.origin_px["y"]
+    occupancy = floor_occupancy(floor) if params["walls"] else None
+    if floor.width_px and floor.height_px:
+        bounds = (-ox / ppm, (oy - floor.height_px) / ppm, (floor.width_px - ox) / ppm, oy / ppm)
+    else:
+        bounds = (occupancy or floor_occupancy(floor)).summary()["bounds_m"]
+
+    image_mtime = os.path.getmtime(floor.filepath) if floor.filepath and os.path.exists(floor.filepath) else None
+    floor_key = (floor.id, image_mtime, ppm, ox, oy, OCCUPANCY_CELL_M, OCCUPANCY_WALL_THRESHOLD)
+    key = config_hash(floor_key, aps, params)
+    path = RADIO_MAP_DIR / f"synthetic_{key}.npz"
+
+    with _SYNTHETIC_LOCK:
+        cached = _SYNTHETIC.get(key)
+        if cached is not None:
+            return key, cached
+        build_lock = _SYNTHETIC_BUILDS.setdefault(key, threading.Lock())
+
+    with build_lock:
+        with _SYNTHETIC_LOCK:
+            cached = _SYNTHETIC.get(key)        # built while we waited
+        if cached is not None:
+            return key, cached
+        try:
+            if path.exists():
+                dense = load_radio_map(str(path))
+            else:
+                try:
+                    grid = build_grid(bounds, params["grid_spacing_m"], occupancy, DENSIFY_MAX_CELLS)
+                except ValueError as e:
+                    raise HTTPException(400, str(e))
+                rssi = predict_rssi(
+                    aps, grid,
+                    path_loss_n=params["path_loss_n"],
+                    wall_loss_db=params["wall_loss_db"],
+                    max_walls=params["max_walls"],
+                    floor_dbm=params["floor_dbm"],
+                    occupancy=occupancy,
+                )
+                save_radio_map(str(path), grid, rssi, [ap["bssid"] for ap in aps])
+                dense = load_radio_map(str(path))
+            with _SYNTHETIC_LOCK:
+                if len(_SYNTHETIC) >= _SYNTHETIC_MEMORY_SLOTS:
+                    _SYNTHETIC.pop(next(iter(_SYNTHETIC)))
+                _SYNTHETIC[key] = dense
+        finally:
+            with _SYNTHETIC_LOCK:
+                _SYNTHETIC_BUILDS.pop(key, None)
+        return key, dense
+
+
+@router.get("/synthetic/{floor_id}", response_model=SyntheticMapResponse)
+def get_synthetic_map(floor_id: int, params: dict = Depends(_synthetic_params), db: Session = Depends(get_db)):
+    """
+    Predicted RSSI raster for every AP placed on the floor (log-distance
+    model, optional wall attenuation from the occupancy grid). No survey
+    needed; cached per floor / AP-configuration hash.
+    """
+    key, dense = _synthetic_map(floor_id, params, db)
+    return SyntheticMapResponse(
+        floor_id=floor_id,
+        config_hash=key,
+        cell_count=len(dense["radio_map_coords"]),
+        ap_count=len(dense["bssids"]),
+        bssids=dense["bssids"].tolist(),
+        **params,
+    )
+
+
+@router.get("/synthetic/{floor_id}/download")
+def download_synthetic_map(floor_id: int, params: dict = Depends(_synthetic_params), db: Session = Depends(get_db)):
+    """Synthetic map as ``.npz`` – a cold-start fingerprint database in the
+    ``/api/experiments/fingerprint/binary`` layout."""
+    key, _ = _synthetic_map(floor_id, params, db)
+    return FileResponse(
+        str(RADIO_MAP_DIR / f"synthetic_{key}.npz"),
+        media_type="application/x-npz",
+        filename=f"synthetic_floor_{floor_id}_{key}.npz",
+    )
+
+
+@router.get("/synthetic/{floor_id}/heatmap/{bssid}", response_model=HeatmapResponse)
+def get_synthetic_heatmap(
+    floor_id: int,
+    bssid: str,
+    include_unheard: bool = Query(False),
+    params: dict = Depends(_synthetic_params),
+    db: Session = Depends(get_db),
+):
+    """Baseline heatmap of one AP from the propagation model."""
+    _, dense = _synthetic_map(floor_id, params, db)
+    return _grid_heatmap(dense, bssid, floor_id, params["floor_dbm"], include_unheard)
@@ -114,6 +114,25 @@ class FloorResponse(BaseModel):
         from_attributes = True
 
 
+class OccupancyResponse(BaseModel):
+    floor_id: int
+    rows: int
+    cols: int
+    cell_m: float
+    wall_fraction: float
+    bytes: int
+    bounds_m: list[float]  # [x_min, y_min, x_max, y_max]
+
+
+class SegmentCheckRequest(BaseModel):
+    segments: list[list[float]]  # [[x0, y0, x1, y1], ...] in meters
+
+
+class SegmentCheckResponse(BaseModel):
+    crosses: list[bool]
+    wall_count: int
+
+
 # ─── Building ──────────────────────────────────────────────────────
 
 class BuildingCreate(BaseModel):
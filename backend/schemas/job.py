@@ -0,0 +1,21 @@
+from pydantic import BaseModel
+from typing import Optional
+from datetime import datetime
+
+
+class ExperimentJobResponse(BaseModel):
+    id: str
+    kind: str
+    input_hash: str
+    status: str                       # "queued" | "running" | "done" | "failed"
+    progress: float = 0.0             # 0 … 1
+    error: Optional[str] = None
+    result_bytes: Optional[int] = None   # size of the stored (gzip) result
+    created_at: Optional[datetime] = None
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    elapsed_s: Optional[float] = None
+    deduplicated: bool = False        # an identical earlier submission was reused
+
+    class Config:
+        from_attributes = True
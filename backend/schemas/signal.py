@@ -1,6 +1,6 @@
 """Pydantic schemas for the Signal Analyzer / Heatmap endpoints."""
 
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from typing import Optional
 
 
@@ -24,3 +24,50 @@ class HeatmapResponse(BaseModel):
     floor_id: int
     point_count: int
     points: list[HeatmapPoint]
+
+
+class DensifyRequest(BaseModel):
+    """Densify a stored fingerprint radio map onto a regular floor grid."""
+    dataset_id: int                   # a 'fingerprint_radio_map' dataset
+    floor_id: Optional[int] = None    # grid over this floor, skipping walls
+    method: str = "gp"                # "gp" (sparse GP) or "idw"
+    grid_spacing_m: float = Field(0.5, gt=0)
+    floor_dbm: float = Field(-100.0, le=0)  # level used for "AP not heard"
+    # IDW
+    k: int = Field(8, ge=1)
+    power: float = Field(2.0, gt=0)
+    # Sparse GP
+    n_inducing: int = Field(256, ge=1, le=2000)
+    length_scale_m: float = Field(4.0, gt=0)
+    signal_db: float = Field(15.0, gt=0)
+    noise_db: float = Field(4.0, gt=0)
+
+
+class RadioMapJob(BaseModel):
+    job_id: str
+    status: str                       # "queued" | "running" | "done" | "failed"
+    progress: float = 0.0             # 0 … 1
+    dataset_id: int
+    floor_id: Optional[int] = None
+    method: str
+    floor_dbm: float = -100.0
+    cell_count: int = 0
+    ap_count: int = 0
+    survey_points: int = 0
+    elapsed_s: Optional[float] = None
+    error: Optional[str] = None
+    deduplicated: bool = False        # an identical earlier submission was reused
+
+
+class SyntheticMapResponse(BaseModel):
+    floor_id: int
+    config_hash: str                  # floor calibration + APs + model parameters
+    cell_count: int
+    ap_count: int
+    bssids: list[str]
+    grid_spacing_m: float
+    path_loss_n: float
+    wall_loss_db: float
+    max_walls: int
+    walls: bool
+    floor_dbm: float
@@ -1,7 +1,7 @@
 """Analysis & metrics service – error computation and CDF generation."""
 
 import numpy as np
-from typing import List, Tuple, Dict
+from typing import List, Tuple, Dict, Iterable
 
 
 def euclidean_error(
@@ -25,27 +25,238 @@ def compute_cdf(errors: np.ndarray, num_bins: int = 200) -> Dict[str, List[float
     """
     Compute CDF (Cumulative Distribution Function) of errors.
 
+    At most ``num_bins`` points are returned: every sorted error when there
+    are that few, otherwise the CDF evaluated at the right edges of
+    ``num_bins`` equal-width bins (one histogram pass, no sort).
+
     Returns:
-        {"x": sorted error values, "y": cumulative probability 0-1}
+        {"x": error values, "y": cumulative probability 0-1}
     """
-    sorted_errors = np.sort(errors)
-    cdf_y = np.arange(1, len(sorted_errors) + 1) / len(sorted_errors)
+    errors = np.asarray(errors, dtype=float)
+    n = len(errors)
+    if n == 0:
+        return {"x": [], "y": []}
+
+    if n <= num_bins:
+        sorted_errors = np.sort(errors)
+        cdf_y = np.arange(1, n + 1) / n
+        return {
+            "x": sorted_errors.tolist(),
+            "y": cdf_y.tolist(),
+        }
+
+    counts, edges = np.histogram(errors, bins=num_bins)
     return {
-        "x": sorted_errors.tolist(),
-        "y": cdf_y.tolist(),
+        "x": edges[1:].tolist(),
+        "y": (np.cumsum(counts) / n).tolist(),
     }
 
 
 def error_statistics(errors: np.ndarray) -> Dict[str, float]:
     """Summary statistics for positioning error."""
+    p50, p75, p90, p95 = np.percentile(errors, [50, 75, 90, 95])
     return {
         "mean": float(np.mean(errors)),
-        "median": float(np.median(errors)),
+        "median": float(p50),
         "std": float(np.std(errors)),
         "min": float(np.min(errors)),
         "max": float(np.max(errors)),
-        "p50": float(np.percentile(errors, 50)),
-        "p75": float(np.percentile(errors, 75)),
-        "p90": float(np.percentile(errors, 90)),
-        "p95": float(np.percentile(errors, 95)),
+        "p50": float(p50),
+        "p75": float(p75),
+        "p90": float(p90),
+        "p95": float(p95),
     }
+
+
+class ErrorSketch:
+    """
+    Mergeable streaming quantile sketch for positioning errors.
+
+    Log-spaced buckets (the DDSketch scheme): every quantile is returned
+    within ``relative_accuracy`` of the true value, memory grows only with
+    log(max / min_value) – about 700 buckets for 1 mm to 1 km at 1 % – and
+    two sketches with the same accuracy merge exactly by adding bucket
+    counts, so chunks and workers can each build one and combine them.
+    Mean, std, min and max are tracked exactly.
+    """
+
+    def __init__(self, relative_accuracy: float = 0.01, min_value: float = 1e-3):
+        if not 0 < relative_accuracy < 1:
+            raise ValueError("relative_accuracy must be in (0, 1)")
+        if not (np.isfinite(min_value) and min_value > 0):
+            raise ValueError("min_value must be a positive finite number")
+        self.relative_accuracy = relative_accuracy
+        self.min_value = min_value
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._log_gamma = np.log(self.gamma)
+        if self._log_gamma <= 0:
+            raise ValueError("relative_accuracy is too small to resolve buckets")
+
+        self.count = 0
+        self.sum = 0.0
+        self.sum_sq = 0.0
+        self.min = float("inf")
+        self.max = float("-inf")
+        self.zero_count = 0                        # errors below min_value
+        self.offset = 0                            # bucket index of bins[0]
+        self.bins = np.zeros(0, dtype=np.int64)
+
+    # Bucket span cap: ~35k buckets cover min_value=1e-3 up to float max at
+    # 1 %, so anything far beyond that is a corrupt state or absurd accuracy.
+    MAX_BINS = 1 << 20
+
+    def _ensure(self, lo: int, hi: int):
+        """Grow ``bins`` to cover bucket indices lo..hi."""
+        span_lo = min(lo, self.offset) if len(self.bins) else lo
+        span_hi = max(hi, self.offset + len(self.bins) - 1) if len(self.bins) else hi
+        if span_hi - span_lo + 1 > self.MAX_BINS:
+            raise ValueError(f"Sketch would need more than {self.MAX_BINS} buckets")
+        if len(self.bins) == 0:
+            self.offset = lo
+            self.bins = np.zeros(hi - lo + 1, dtype=np.int64)
+            return
+        new_lo = min(lo, self.offset)
+        new_hi = max(hi, self.offset + len(self.bins) - 1)
+        if new_lo == self.offset and new_hi == self.offset + len(self.bins) - 1:
+            return
+        grown = np.zeros(new_hi - new_lo + 1, dtype=np.int64)
+        grown[self.offset - new_lo:self.offset - new_lo + len(self.bins)] = self.bins
+        self.offset, self.bins = new_lo, grown
+
+    def add(self, errors: Iterable[float]) -> "ErrorSketch":
+        """Add a chunk of (non-negative) error values."""
+        e = np.abs(np.asarray(errors, dtype=float).ravel())
+        if len(e) == 0:
+            return self
+        if not np.isfinite(e).all():
+            raise ValueError("Errors must be finite")
+        self.count += len(e)
+        self.sum += float(e.sum())
+        self.sum_sq += float(np.dot(e, e))
+        self.min = min(self.min, float(e.min()))
+        self.max = max(self.max, float(e.max()))
+
+        big = e[e >= self.min_value]
+        self.zero_count += len(e) - len(big)
+        if len(big):
+            fidx = np.ceil(np.log(big) / self._log_gamma)
+            if fidx.max() - fidx.min() + 1 > self.MAX_BINS:
+                raise ValueError(f"Sketch would need more than {self.MAX_BINS} buckets")
+            idx = fidx.astype(np.int64)
+            lo, hi = int(idx.min()), int(idx.max())
+            self._ensure(lo, hi)
+            self.bins += np.bincount(idx - self.offset, minlength=len(self.bins))[:len(self.bins)]
+        return self
+
+    def merge(self, other: "ErrorSketch") -> "ErrorSketch":
+        """Fold another sketch (same accuracy / min_value) into this one."""
+        if (other.relative_accuracy != self.relative_accuracy
+                or other.min_value != self.min_value):
+            raise ValueError(
+                "Can only merge sketches with the same relative_accuracy and min_value "
+                f"({self.relative_accuracy}, {self.min_value} vs "
+                f"{other.relative_accuracy}, {other.min_value})"
+            )
+        if other.count == 0:
+            return self
+        self.count += other.count
+        self.sum += other.sum
+        self.sum_sq += other.sum_sq
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        self.zero_count += other.zero_count
+        if len(other.bins):
+            self._ensure(other.offset, other.offset + len(other.bins) - 1)
+            start = other.offset - self.offset
+            self.bins[start:start + len(other.bins)] += other.bins
+        return self
+
+    def _bucket_values(self) -> Tuple[np.ndarray, np.ndarray]:
+        """(representative value, cumulative count) per bucket, zero bucket first."""
+        idx = self.offset + np.arange(len(self.bins))
+        values = np.r_[0.0, 2 * self.gamma**idx / (self.gamma + 1)]
+        return values, np.cumsum(np.r_[self.zero_count, self.bins])
+
+    def quantile(self, q) -> np.ndarray:
+        """Approximate quantile(s) for q in [0, 1]."""
+        if self.count == 0:
+            raise ValueError("Sketch is empty")
+        values, cum = self._bucket_values()
+        rank = np.asarray(q, dtype=float) * (self.count - 1)
+        out = values[np.searchsorted(cum, rank, side="right")]
+        return np.clip(out, self.min, self.max)
+
+    def statistics(self) -> Dict[str, float]:
+        """Same keys as ``error_statistics``; percentiles are approximate."""
+        if self.count == 0:
+            return {}
+        mean = self.sum / self.count
+        p50, p75, p90, p95 = self.quantile([0.5, 0.75, 0.9, 0.95]).tolist()
+        return {
+            "mean": mean,
+            "median": p50,
+            "std": float(np.sqrt(max(self.sum_sq / self.count - mean**2, 0.0))),
+            "min": self.min,
+            "max": self.max,
+            "p50": p50,
+            "p75": p75,
+            "p90": p90,
+            "p95": p95,
+        }
+
+    def cdf(self, num_bins: int = 200) -> Dict[str, List[float]]:
+        """Fixed-resolution CDF: ``num_bins`` points from min to max error."""
+        if self.count == 0:
+            return {"x": [], "y": []}
+        values, cum = self._bucket_values()
+        x = np.linspace(self.min, self.max, num_bins)
+        y = cum[np.searchsorted(values, x, side="right") - 1] / self.count
+        y[-1] = 1.0
+        return {"x": x.tolist(), "y": y.tolist()}
+
+    def to_dict(self) -> Dict[str, object]:
+        """JSON-serialisable state, for shipping partial sketches between workers."""
+        return {
+            "relative_accuracy": self.relative_accuracy,
+            "min_value": self.min_value,
+            "count": self.count,
+            "sum": self.sum,
+            "sum_sq": self.sum_sq,
+            "min": self.min if self.count else None,
+            "max": self.max if self.count else None,
+            "zero_count": self.zero_count,
+            "offset": self.offset,
+            "bins": self.bins.tolist(),
+        }
+
+    @classmethod
+    def from_dict(cls, state: Dict[str, object]) -> "ErrorSketch":
+        """Rebuild a sketch from ``to_dict`` output; inconsistent state is a ValueError."""
+        sketch = cls(float(state["relative_accuracy"]), float(state["min_value"]))
+        sketch.count = int(state["count"])
+        sketch.sum = float(state["sum"])
+        sketch.sum_sq = float(state["sum_sq"])
+        sketch.zero_count = int(state["zero_count"])
+        sketch.offset = int(state["offset"])
+        bins = np.asarray(state["bins"], dtype=float)
+        if bins.ndim != 1 or len(bins) > cls.MAX_BINS:
+            raise ValueError(f"bins must be a list of at most {cls.MAX_BINS} counts")
+        if not (np.isfinite(bins).all() and (bins >= 0).all() and (bins == np.round(bins)).all()):
+            raise ValueError("bins must hold non-negative integer counts")
+        sketch.bins = bins.astype(np.int64)
+        if sketch.count < 0 or sketch.zero_count < 0:
+            raise ValueError("count and zero_count must be non-negative")
+        if sketch.zero_count + int(sketch.bins.sum()) != sketch.count:
+            raise ValueError("count must equal zero_count plus the bucket counts")
+        if not (np.isfinite([sketch.sum, sketch.sum_sq]).all() and sketch.sum >= 0 and sketch.sum_sq >= 0):
+            raise ValueError("sum and sum_sq must be non-negative and finite")
+        # Buckets start at the one holding min_value; lower indices never occur
+        first = int(np.ceil(np.log(sketch.min_value) / sketch._log_gamma))
+        if len(sketch.bins) and not (first <= sketch.offset <= first + cls.MAX_BINS - len(sketch.bins)):
+            raise ValueError("offset is outside the sketch's bucket range")
+        if sketch.count:
+            sketch.min = float(state["min"])
+            sketch.max = float(state["max"])
+            if not (np.isfinite([sketch.min, sketch.max]).all() and 0 <= sketch.min <= sketch.max):
+                raise ValueError("min and max must be finite with 0 <= min <= max")
+        return sketch
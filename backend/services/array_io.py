@@ -0,0 +1,120 @@
+"""Binary array payloads – float32 column blocks and .npz archives.
+
+Array-heavy experiment endpoints accept these as an alternative to JSON
+float lists:
+
+  - ``application/octet-stream``: a little-endian float32 column block.
+    Columns are stored one after another, all with the same length, and are
+    named by the caller (e.g. ``?columns=acc_x,acc_y,acc_z,gyro_z``).
+    Decoding is zero-copy – each column is a view on the request body.
+  - ``application/x-npz``: a NumPy ``.npz`` archive with named arrays
+    (``np.savez``), for payloads that need 2-D arrays or mixed lengths.
+"""
+
+import io
+import zipfile
+import numpy as np
+from typing import Dict, List, Optional
+
+COLUMN_BLOCK_MEDIA_TYPE = "application/octet-stream"
+NPZ_MEDIA_TYPE = "application/x-npz"
+
+
+def decode_column_block(body: bytes, columns: List[str]) -> Dict[str, np.ndarray]:
+    """
+    Split a little-endian float32 column block into named 1-D arrays.
+
+    Args:
+        body: Raw request body (len = 4 × n_columns × n_samples).
+        columns: Column names in the order they appear in the block.
+    Returns:
+        {name: read-only float32 view of that column}.
+    """
+    if not columns:
+        raise ValueError("At least one column name is required")
+    if len(body) % 4:
+        raise ValueError("Body length is not a multiple of 4 bytes (float32)")
+
+    raw = np.frombuffer(body, dtype="<f4")
+    if raw.size % len(columns):
+        raise ValueError(
+            f"{raw.size} float32 values cannot be split into {len(columns)} equal columns"
+        )
+    block = raw.reshape(len(columns), -1)
+    return {name: block[i] for i, name in enumerate(columns)}
+
+
+def _check_uncompressed_size(body: bytes, max_bytes: Optional[int]) -> None:
+    """Refuse archives whose members would inflate past ``max_bytes``.
+
+    Reads only the zip central directory, so a small upload that decompresses
+    to gigabytes is rejected before any member is inflated.
+    """
+    if max_bytes is None or not zipfile.is_zipfile(io.BytesIO(body)):
+        return
+    try:
+        with zipfile.ZipFile(io.BytesIO(body)) as zf:
+            total = sum(info.file_size for info in zf.infolist())
+    except (zipfile.BadZipFile, OSError) as e:
+        raise ValueError(f"Invalid .npz payload: {e}")
+    if total > max_bytes:
+        raise ValueError(
+            f".npz payload inflates to {total} bytes (limit {max_bytes})"
+        )
+
+
+def decode_npz(body: bytes, max_bytes: Optional[int] = None) -> Dict[str, np.ndarray]:
+    """Load every array from an ``.npz`` archive (pickles are refused).
+
+    ``max_bytes`` caps the total uncompressed size declared by the archive.
+    """
+    _check_uncompressed_size(body, max_bytes)
+    try:
+        npz = np.load(io.BytesIO(body), allow_pickle=False)
+    except (ValueError, OSError, EOFError, zipfile.BadZipFile) as e:
+        raise ValueError(f"Invalid .npz payload: {e}")
+    if not isinstance(npz, np.lib.npyio.NpzFile):       # a bare .npy array
+        raise ValueError("Invalid .npz payload: expected an .npz archive of named arrays")
+    try:
+        with npz:
+            return {name: npz[name] for name in npz.files}
+    except (ValueError, OSError, EOFError, zipfile.BadZipFile) as e:
+        raise ValueError(f"Invalid .npz payload: {e}")
+
+
+def check_arrays(arrays: Dict[str, np.ndarray], ndim: Dict[str, int]) -> None:
+    """
+    Validate decoded arrays against an expected dimensionality per name.
+
+    Every array named in ``ndim`` that is present must be real-valued numeric
+    (integer or float) with exactly that many dimensions; names not listed
+    are ignored.  Raises ``ValueError`` on the first mismatch.
+    """
+    for name, expected in ndim.items():
+        arr = arrays.get(name)
+        if arr is None:
+            continue
+        if arr.dtype.kind not in "iuf":
+            raise ValueError(f"Array '{name}' must be numeric, got dtype {arr.dtype}")
+        if arr.ndim != expected:
+            raise ValueError(
+                f"Array '{name}' must be {expected}-D, got shape {arr.shape}"
+            )
+
+
+def decode_arrays(
+    body: bytes,
+    content_type: str,
+    columns: Optional[List[str]] = None,
+    max_bytes: Optional[int] = None,
+) -> Dict[str, np.ndarray]:
+    """Decode a binary body according to its media type."""
+    media_type = content_type.split(";")[0].strip().lower()
+    if media_type == NPZ_MEDIA_TYPE:
+        return decode_npz(body, max_bytes)
+    if media_type == COLUMN_BLOCK_MEDIA_TYPE:
+        return decode_column_block(body, columns or [])
+    raise ValueError(
+        f"Unsupported content type '{media_type}'. "
+        f"Use {COLUMN_BLOCK_MEDIA_TYPE} or {NPZ_MEDIA_TYPE}"
+    )
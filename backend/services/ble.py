@@ -1,7 +1,9 @@
-"""BLE service – Kalman filter for RSSI smoothing."""
+"""BLE service – Kalman and moving-average filters for RSSI smoothing."""
 
+import threading
 import numpy as np
-from typing import List
+from scipy.signal import lfilter
+from typing import Dict, Hashable, List, Optional, Sequence
 
 
 class KalmanFilterRSSI:
@@ -67,6 +69,85 @@ def smooth_rssi_kalman(
     return [kf.update(r) for r in rssi_values]
 
 
+def steady_state_kalman_gain(
+    process_noise: float = 1.0,
+    measurement_noise: float = 5.0,
+) -> float:
+    """
+    Limit of the Kalman gain for the constant-state RSSI model.
+
+    The predicted covariance M = P + Q converges to the positive root of
+    M² - Q·M - Q·R = 0, giving K = M / (M + R).
+    """
+    Q, R = process_noise, measurement_noise
+    M = (Q + np.sqrt(Q * Q + 4 * Q * R)) / 2
+    return float(M / (M + R))
+
+
+def smooth_rssi_kalman_batch(
+    rssi: np.ndarray,
+    process_noise: float = 1.0,
+    measurement_noise: float = 5.0,
+    initial_error: float = 10.0,
+    steady_state: bool = False,
+) -> np.ndarray:
+    """
+    Kalman-smooth many beacons at once.
+
+    Each column runs the same recurrence as ``KalmanFilterRSSI``, started at
+    that beacon's first reading. NaN marks a missing sample: the filter
+    only predicts (P grows, estimate held). Outputs before a beacon's first
+    reading are NaN.
+
+    With ``steady_state=True`` the gain is fixed at its limit, which turns
+    the filter into the IIR filter x[k] = (1-K)·x[k-1] + K·z[k] evaluated
+    with ``lfilter``. Missing samples then hold the last reading, and early
+    outputs differ slightly from the exact filter while P converges.
+
+    Args:
+        rssi: (T, B) matrix – T time samples, B beacons.
+        process_noise: Q parameter.
+        measurement_noise: R parameter.
+        initial_error: Initial estimate error covariance P.
+        steady_state: Use the constant-gain fast path.
+    Returns:
+        (T, B) smoothed RSSI matrix.
+    """
+    z = np.asarray(rssi, dtype=float)
+    if z.ndim == 1:
+        z = z[:, None]
+    T, B = z.shape
+    if T == 0:
+        return z.copy()
+
+    observed = ~np.isnan(z)
+    started = np.logical_or.accumulate(observed, axis=0)
+    first = np.where(started.any(axis=0), observed.argmax(axis=0), 0)
+    x0 = z[first, np.arange(B)]
+
+    if steady_state:
+        K = steady_state_kalman_gain(process_noise, measurement_noise)
+        # Forward-fill gaps, and back-fill the lead-in with the first reading
+        idx = np.maximum.accumulate(np.where(observed, np.arange(T)[:, None], 0), axis=0)
+        filled = np.where(started, z[idx, np.arange(B)], x0)
+        out, _ = lfilter([K], [1.0, -(1 - K)], filled, axis=0, zi=((1 - K) * x0)[None, :])
+        out[~started] = np.nan
+        return out
+
+    Q, R = process_noise, measurement_noise
+    x = x0.copy()
+    P = np.full(B, float(initial_error))
+    out = np.full((T, B), np.nan)
+    for t in range(T):
+        live = started[t]
+        P_pred = np.where(live, P + Q, P)
+        K = np.where(observed[t], P_pred / (P_pred + R), 0.0)
+        x = np.where(observed[t], x + K * (z[t] - x), x)
+        P = np.where(live, (1 - K) * P_pred, P)
+        out[t, live] = x[live]
+    return out
+
+
 def smooth_rssi_moving_average(
     rssi_values: List[float],
     window_size: int = 5,
@@ -78,3 +159,256 @@ def smooth_rssi_moving_average(
     kernel = np.ones(window_size) / window_size
     smoothed = np.convolve(arr, kernel, mode="same")
     return smoothed.tolist()
+
+
+class MovingAverageRSSI:
+    """
+    Causal moving average over the last ``window_size`` readings.
+
+    A ring buffer plus running sum gives O(1) work per sample. Until the
+    window fills, the average is over the readings seen so far.
+    """
+
+    def __init__(self, window_size: int = 5):
+        self.window_size = max(int(window_size), 1)
+        self.buffer = np.zeros(self.window_size)
+        self.pos = 0
+        self.count = 0
+        self.total = 0.0
+
+    def update(self, measurement: float) -> float:
+        """Push one RSSI reading and return the current average."""
+        if self.count == self.window_size:
+            self.total -= self.buffer[self.pos]
+        else:
+            self.count += 1
+        self.buffer[self.pos] = measurement
+        self.total += measurement
+        self.pos = (self.pos + 1) % self.window_size
+        return self.total / self.count
+
+
+class EMAFilterRSSI:
+    """
+    Exponential moving average: x[k] = alpha * z[k] + (1 - alpha) * x[k-1].
+
+    Seeded with the first reading; O(1) per sample.
+    """
+
+    def __init__(self, alpha: float = 0.3):
+        self.alpha = alpha
+        self.x: Optional[float] = None
+
+    def update(self, measurement: float) -> float:
+        """Push one RSSI reading and return the smoothed value."""
+        if self.x is None:
+            self.x = measurement
+        else:
+            self.x = self.alpha * measurement + (1 - self.alpha) * self.x
+        return self.x
+
+
+def causal_moving_average(
+    rssi_values: List[float],
+    window_size: int = 5,
+) -> List[float]:
+    """
+    Batch form of ``MovingAverageRSSI``: output k averages readings
+    max(0, k-window+1)..k, computed from one cumulative sum.
+    """
+    if not rssi_values or window_size < 1:
+        return rssi_values
+    arr = np.asarray(rssi_values, dtype=float)
+    csum = np.concatenate(([0.0], np.cumsum(arr)))
+    k = np.arange(1, len(arr) + 1)
+    lo = np.maximum(k - window_size, 0)
+    return ((csum[k] - csum[lo]) / (k - lo)).tolist()
+
+
+def exponential_moving_average(
+    rssi_values: List[float],
+    alpha: float = 0.3,
+) -> List[float]:
+    """Batch form of ``EMAFilterRSSI`` as a first-order IIR filter."""
+    if not rssi_values:
+        return []
+    arr = np.asarray(rssi_values, dtype=float)
+    out, _ = lfilter([alpha], [1.0, -(1 - alpha)], arr, zi=[(1 - alpha) * arr[0]])
+    return out.tolist()
+
+
+class RSSIStateTable:
+    """
+    Live filter state per (device, beacon) key in an array-backed table.
+
+    Each key owns one row of the state arrays – the ``KalmanFilterRSSI``
+    state (``x`` / ``P``), the ``EMAFilterRSSI`` value (``ema``) and a
+    ``window_size`` ring buffer for ``MovingAverageRSSI`` – so a batch of
+    readings is filtered with vector operations in O(batch). Rows of keys
+    idle for longer than ``max_idle_s`` are recycled by ``evict_idle``. All
+    methods are thread-safe.
+    """
+
+    _COLUMNS = ("x", "P", "ema", "ring_sum", "ring_count", "ring_pos", "last_seen")
+
+    def __init__(
+        self,
+        capacity: int = 256,
+        initial_error: float = 10.0,
+        window_size: int = 5,
+    ):
+        self.initial_error = initial_error
+        self.window_size = max(int(window_size), 1)
+        for name in self._COLUMNS:
+            setattr(self, name, np.zeros(capacity))
+        self.ring_count = self.ring_count.astype(int)
+        self.ring_pos = self.ring_pos.astype(int)
+        self.ring = np.zeros((capacity, self.window_size))
+        self._index: Dict[Hashable, int] = {}
+        self._keys: List[Optional[Hashable]] = [None] * capacity
+        self._free: List[int] = list(range(capacity - 1, -1, -1))
+        self._last_sweep = 0.0
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+    def _grow(self):
+        old = len(self.x)
+        new = max(2 * old, 1)
+        for name in self._COLUMNS + ("ring",):
+            arr = getattr(self, name)
+            grown = np.zeros((new,) + arr.shape[1:], dtype=arr.dtype)
+            grown[:old] = arr
+            setattr(self, name, grown)
+        self._keys.extend([None] * (new - old))
+        self._free.extend(range(new - 1, old - 1, -1))
+
+    def _rows(self, keys: Sequence[Hashable], values: np.ndarray) -> np.ndarray:
+        """Row per key, allocating rows (seeded with the reading) for new keys."""
+        rows = np.empty(len(keys), dtype=int)
+        for i, key in enumerate(keys):
+            row = self._index.get(key)
+            if row is None:
+                if not self._free:
+                    self._grow()
+                row = self._free.pop()
+                self._index[key] = row
+                self._keys[row] = key
+                self.x[row] = values[i]
+                self.P[row] = self.initial_error
+                self.ema[row] = values[i]
+                self.ring_sum[row] = 0.0
+                self.ring_count[row] = 0
+                self.ring_pos[row] = 0
+            rows[i] = row
+        return rows
+
+    @staticmethod
+    def _occurrence_rank(rows: np.ndarray) -> np.ndarray:
+        """0 for the first reading of each row in the batch, 1 for the second…"""
+        order = np.argsort(rows, kind="stable")
+        sorted_rows = rows[order]
+        group_start = np.flatnonzero(np.r_[True, sorted_rows[1:] != sorted_rows[:-1]])
+        sizes = np.diff(np.r_[group_start, len(rows)])
+        rank = np.empty(len(rows), dtype=int)
+        rank[order] = np.arange(len(rows)) - np.repeat(group_start, sizes)
+        return rank
+
+    def _apply(self, keys, values, now, step) -> np.ndarray:
+        """Run ``step(rows, z)`` over the batch, readings per key in order."""
+        z = np.asarray(values, dtype=float)
+        out = np.empty(len(z))
+        if len(z) == 0:
+            return out
+        with self._lock:
+            rows = self._rows(keys, z)
+            rank = self._occurrence_rank(rows)
+            # Each round touches every row at most once, so it vectorises
+            for r in range(rank.max() + 1):
+                sel = np.flatnonzero(rank == r)
+                out[sel] = step(rows[sel], z[sel])
+            self.last_seen[rows] = now
+        return out
+
+    def update_kalman(
+        self,
+        keys: Sequence[Hashable],
+        values: Sequence[float],
+        process_noise: float = 1.0,
+        measurement_noise: float = 5.0,
+        now: float = 0.0,
+    ) -> np.ndarray:
+        """Apply one Kalman update per reading and return the filtered values."""
+        def step(rr, z):
+            P_pred = self.P[rr] + process_noise
+            K = P_pred / (P_pred + measurement_noise)
+            self.x[rr] += K * (z - self.x[rr])
+            self.P[rr] = (1 - K) * P_pred
+            return self.x[rr]
+
+        return self._apply(keys, values, now, step)
+
+    def update_moving_average(
+        self,
+        keys: Sequence[Hashable],
+        values: Sequence[float],
+        now: float = 0.0,
+    ) -> np.ndarray:
+        """Push readings into each key's ring buffer and return the averages."""
+        def step(rr, z):
+            pos = self.ring_pos[rr]
+            full = self.ring_count[rr] == self.window_size
+            self.ring_sum[rr] += z - np.where(full, self.ring[rr, pos], 0.0)
+            self.ring[rr, pos] = z
+            self.ring_count[rr] += ~full
+            self.ring_pos[rr] = (pos + 1) % self.window_size
+            return self.ring_sum[rr] / self.ring_count[rr]
+
+        return self._apply(keys, values, now, step)
+
+    def update_ema(
+        self,
+        keys: Sequence[Hashable],
+        values: Sequence[float],
+        alpha: float = 0.3,
+        now: float = 0.0,
+    ) -> np.ndarray:
+        """Apply one exponential-moving-average step per reading."""
+        def step(rr, z):
+            self.ema[rr] += alpha * (z - self.ema[rr])
+            return self.ema[rr]
+
+        return self._apply(keys, values, now, step)
+
+    def get(self, key: Hashable) -> Optional[Dict[str, float]]:
+        """Current state for a key, or None if unknown/evicted."""
+        with self._lock:
+            row = self._index.get(key)
+            if row is None:
+                return None
+            count = int(self.ring_count[row])
+            return {
+                "x": float(self.x[row]),
+                "P": float(self.P[row]),
+                "ema": float(self.ema[row]),
+                "moving_average": float(self.ring_sum[row] / count) if count else None,
+            }
+
+    def evict_idle(self, max_idle_s: float, now: float) -> int:
+        """Free rows not updated within ``max_idle_s``; returns how many."""
+        with self._lock:
+            self._last_sweep = now
+            live = np.fromiter(self._index.values(), dtype=int, count=len(self._index))
+            stale = live[now - self.last_seen[live] > max_idle_s]
+            for row in stale.tolist():
+                del self._index[self._keys[row]]
+                self._keys[row] = None
+                self._free.append(row)
+            return len(stale)
+
+    def maybe_evict(self, max_idle_s: float, now: float) -> int:
+        """Run ``evict_idle`` at most every ``max_idle_s / 10`` seconds."""
+        if now - self._last_sweep < max_idle_s / 10:
+            return 0
+        return self.evict_idle(max_idle_s, now)
@@ -1,6 +1,7 @@
 """Map calibration service – computes pixels-per-meter ratio."""
 
 import math
+import numpy as np
 from schemas.map import PointSchema
 
 
@@ -46,3 +47,14 @@ def meter_to_pixel(
     px_x = origin_px.x + x_m * pixels_per_meter
     px_y = origin_px.y - y_m * pixels_per_meter  # y is inverted in images
     return px_x, px_y
+
+
+def pixels_to_meters(
+    points_px: np.ndarray,
+    origin_px: tuple[float, float],
+    pixels_per_meter: float,
+) -> np.ndarray:
+    """Bulk ``pixel_to_meter`` for an (N, 2) array of pixel coordinates."""
+    pts = np.asarray(points_px, dtype=float).reshape(-1, 2)
+    ox, oy = origin_px
+    return np.column_stack(((pts[:, 0] - ox) / pixels_per_meter, (oy - pts[:, 1]) / pixels_per_meter))
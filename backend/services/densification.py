@@ -0,0 +1,207 @@
+"""Radio-map densification – virtual reference points from a surveyed map.
+
+A surveyed fingerprint map only covers the points that were walked. These
+engines fit a spatial model per AP over the survey and predict RSSI on a
+regular grid over the floor, so kNN can match against a dense virtual map.
+Unseen APs are treated as observed at the ``floor_dbm`` level, so
+predictions fall back to "not heard" away from where an AP was measured.
+
+Dense maps are stored as int8 dBm (one byte per cell and AP): 500 APs over
+100k cells is 50 MB, and predictions are computed in grid blocks so the
+float work arrays stay bounded as well.
+"""
+
+import numpy as np
+from scipy.linalg import cho_factor, cho_solve
+from scipy.spatial import cKDTree
+from typing import Callable, Dict, List, Optional, Tuple
+
+METHODS = ("idw", "gp")
+
+# Float elements per prediction block (grid rows × APs, × k for IDW)
+_BLOCK_ELEMS = 4_000_000
+
+
+def build_grid(
+    bounds: Tuple[float, float, float, float],
+    spacing: float,
+    occupancy=None,
+    max_cells: int = 200_000,
+) -> np.ndarray:
+    """
+    Cell centres of a regular grid over ``bounds`` (xmin, ymin, xmax, ymax)
+    in meters. With an ``OccupancyGrid``, cells that fall on a wall are
+    dropped.
+
+    Returns:
+        (G, 2) float array of grid coordinates.
+    """
+    if spacing <= 0:
+        raise ValueError("spacing must be > 0")
+    xmin, ymin, xmax, ymax = bounds
+    xs = np.arange(xmin + spacing / 2, xmax, spacing)
+    ys = np.arange(ymin + spacing / 2, ymax, spacing)
+    if len(xs) * len(ys) > max_cells:
+        raise ValueError(
+            f"Grid of {len(xs)}×{len(ys)} cells exceeds {max_cells}; increase the spacing"
+        )
+    gx, gy = np.meshgrid(xs, ys)
+    grid = np.column_stack((gx.ravel(), gy.ravel()))
+    if occupancy is not None and len(grid):
+        grid = grid[~occupancy.is_wall(grid[:, 0], grid[:, 1])]
+    if len(grid) == 0:
+        raise ValueError("Grid has no free cells")
+    return grid
+
+
+def _quantise(pred: np.ndarray, floor_dbm: float) -> np.ndarray:
+    return np.clip(np.rint(pred), max(floor_dbm, -128), 0).astype(np.int8)
+
+
+def _blocks(n: int, per_row: int, block_elems: int):
+    step = max(block_elems // max(per_row, 1), 1)
+    for start in range(0, n, step):
+        yield start, min(start + step, n)
+
+
+def idw(
+    coords: np.ndarray,
+    values: np.ndarray,
+    grid: np.ndarray,
+    k: int = 8,
+    power: float = 2.0,
+    floor_dbm: float = -100.0,
+    progress: Optional[Callable[[float], None]] = None,
+    block_elems: int = _BLOCK_ELEMS,
+) -> np.ndarray:
+    """
+    Inverse-distance weighting over the ``k`` nearest surveyed points.
+
+    Args:
+        coords: (M, 2) surveyed positions.
+        values: (M, A) RSSI in dBm, NaN where the AP was not heard.
+        grid: (G, 2) positions to predict at.
+    Returns:
+        (G, A) int8 dBm.
+    """
+    y = np.nan_to_num(np.asarray(values, dtype=np.float32), nan=floor_dbm)
+    k = min(k, len(coords))
+    dist, idx = cKDTree(coords).query(grid, k=k)
+    dist, idx = dist.reshape(len(grid), k), idx.reshape(len(grid), k)
+    w = 1.0 / np.maximum(dist, 1e-3) ** power
+    w = (w / w.sum(axis=1, keepdims=True)).astype(np.float32)
+
+    out = np.empty((len(grid), y.shape[1]), dtype=np.int8)
+    for start, stop in _blocks(len(grid), k * y.shape[1], block_elems):
+        pred = np.einsum("bk,bka->ba", w[start:stop], y[idx[start:stop]])
+        out[start:stop] = _quantise(pred, floor_dbm)
+        if progress:
+            progress(stop / len(grid))
+    return out
+
+
+def _farthest_points(coords: np.ndarray, n: int) -> np.ndarray:
+    """Indices of ``n`` well-spread points (greedy farthest-point sampling)."""
+    if n >= len(coords):
+        return np.arange(len(coords))
+    chosen = np.empty(n, dtype=np.int64)
+    chosen[0] = 0
+    d = np.linalg.norm(coords - coords[0], axis=1)
+    for i in range(1, n):
+        chosen[i] = int(np.argmax(d))
+        d = np.minimum(d, np.linalg.norm(coords - coords[chosen[i]], axis=1))
+    return chosen
+
+
+def _rbf(a: np.ndarray, b: np.ndarray, length_scale: float) -> np.ndarray:
+    d2 = np.sum(a ** 2, axis=1)[:, None] + np.sum(b ** 2, axis=1)[None, :] - 2.0 * a @ b.T
+    return np.exp(-0.5 * np.maximum(d2, 0.0) / length_scale ** 2)
+
+
+def sparse_gp(
+    coords: np.ndarray,
+    values: np.ndarray,
+    grid: np.ndarray,
+    n_inducing: int = 256,
+    length_scale: float = 4.0,
+    signal_db: float = 15.0,
+    noise_db: float = 4.0,
+    floor_dbm: float = -100.0,
+    progress: Optional[Callable[[float], None]] = None,
+    block_elems: int = _BLOCK_ELEMS,
+) -> np.ndarray:
+    """
+    Sparse Gaussian-process regression (DTC / inducing points, RBF kernel,
+    prior mean ``floor_dbm``).
+
+    Every AP shares the kernel, so the m×m system is factorised once and
+    solved for all APs together; prediction is then one (block × m) @
+    (m × A) product per grid block. With M ≤ ``n_inducing`` surveyed points
+    the inducing set is the survey itself and this is the exact GP mean.
+
+    Returns:
+        (G, A) int8 dBm.
+    """
+    coords = np.asarray(coords, dtype=float)
+    y = np.nan_to_num(np.asarray(values, dtype=float), nan=floor_dbm) - floor_dbm
+    inducing = coords[_farthest_points(coords, n_inducing)]
+
+    k_mm = _rbf(inducing, inducing, length_scale)
+    k_mn = _rbf(inducing, coords, length_scale)
+    ratio = (noise_db / signal_db) ** 2
+    system = ratio * k_mm + k_mn @ k_mn.T
+    system[np.diag_indices_from(system)] += 1e-9 * np.trace(system)   # jitter
+    weights = cho_solve(cho_factor(system), k_mn @ y).astype(np.float32)   # (m, A)
+
+    out = np.empty((len(grid), y.shape[1]), dtype=np.int8)
+    per_row = len(inducing) + y.shape[1]
+    for start, stop in _blocks(len(grid), per_row, block_elems):
+        k_bm = _rbf(grid[start:stop], inducing, length_scale).astype(np.float32)
+        out[start:stop] = _quantise(floor_dbm + k_bm @ weights, floor_dbm)
+        if progress:
+            progress(stop / len(grid))
+    return out
+
+
+def densify(
+    coords: np.ndarray,
+    values: np.ndarray,
+    grid: np.ndarray,
+    method: str = "gp",
+    progress: Optional[Callable[[float], None]] = None,
+    **params,
+) -> np.ndarray:
+    """Dispatch to ``idw`` or ``sparse_gp``."""
+    coords = np.asarray(coords, dtype=float)
+    values = np.asarray(values, dtype=float)
+    if coords.ndim != 2 or coords.shape[1] != 2 or len(coords) == 0:
+        raise ValueError("coords must be a non-empty (M, 2) array")
+    if values.ndim != 2 or len(values) != len(coords):
+        raise ValueError("values must have one row per surveyed point")
+    if method == "idw":
+        return idw(coords, values, grid, progress=progress, **params)
+    if method == "gp":
+        return sparse_gp(coords, values, grid, progress=progress, **params)
+    raise ValueError(f"Unknown method '{method}'. Choose from {list(METHODS)}")
+
+
+# ── Persistence ──────────────────────────────────────────────────
+
+def save_radio_map(path: str, grid: np.ndarray, rssi: np.ndarray, bssids: List[str]):
+    """
+    Write a dense map as ``.npz`` with the array names ``/fingerprint/binary``
+    expects, so the file can be sent back with a ``test_scan`` added.
+    """
+    np.savez(
+        path,
+        radio_map=rssi,
+        radio_map_coords=grid.astype(np.float32),
+        bssids=np.array(bssids, dtype=str),
+    )
+
+
+def load_radio_map(path: str) -> Dict[str, np.ndarray]:
+    """{"radio_map": (G, A) int8 dBm, "radio_map_coords": (G, 2) float32,
+    "bssids": (A,) str}."""
+    with np.load(path, allow_pickle=False) as npz:
+        return {name: npz[name] for name in npz.files}
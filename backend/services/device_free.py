@@ -1,7 +1,7 @@
 """Device-Free Positioning – baseline vs. active variance detection."""
 
 import numpy as np
-from typing import List, Dict, Tuple
+from typing import List, Dict, Optional, Sequence, Tuple
 
 
 def compute_baseline(
@@ -18,6 +18,57 @@ def compute_baseline(
     return rssi_matrix.mean(axis=0), rssi_matrix.std(axis=0)
 
 
+class WelfordBaseline:
+    """
+    Streaming empty-room baseline: per-link mean / variance via Welford.
+
+    Chunks of (T, L) samples are folded in with the parallel (Chan et al.)
+    form of Welford's update, so an hours-long capture never has to be held
+    in memory. ``mean`` and ``std`` match ``compute_baseline`` over all
+    samples seen (population std).
+    """
+
+    def __init__(
+        self,
+        link_count: int,
+        count: int = 0,
+        mean: Optional[Sequence[float]] = None,
+        m2: Optional[Sequence[float]] = None,
+    ):
+        self.link_count = link_count
+        self.count = count
+        self.mean = np.zeros(link_count) if mean is None else np.asarray(mean, dtype=float)
+        self.m2 = np.zeros(link_count) if m2 is None else np.asarray(m2, dtype=float)
+
+    def update(self, rssi_matrix: np.ndarray) -> "WelfordBaseline":
+        """Fold a (T, L) block of samples into the running statistics."""
+        block = np.asarray(rssi_matrix, dtype=float)
+        if block.ndim != 2 or block.shape[1] != self.link_count:
+            raise ValueError(
+                f"Expected a (T, {self.link_count}) matrix, got shape {block.shape}"
+            )
+        n_b = block.shape[0]
+        if n_b == 0:
+            return self
+
+        mean_b = block.mean(axis=0)
+        m2_b = ((block - mean_b) ** 2).sum(axis=0)
+        n = self.count + n_b
+        delta = mean_b - self.mean
+        self.mean = self.mean + delta * (n_b / n)
+        self.m2 = self.m2 + m2_b + delta**2 * (self.count * n_b / n)
+        self.count = n
+        return self
+
+    @property
+    def variance(self) -> np.ndarray:
+        return self.m2 / self.count if self.count else np.zeros(self.link_count)
+
+    @property
+    def std(self) -> np.ndarray:
+        return np.sqrt(self.variance)
+
+
 def detect_anomaly(
     active_rssi: np.ndarray,
     baseline_mean: np.ndarray,
@@ -57,6 +108,129 @@ def detect_anomaly(
     }
 
 
+_RESYNC_WINDOWS = 64
+
+
+class SlidingPresenceDetector:
+    """
+    Real-time presence detector over a rolling window of link samples.
+
+    Keeps the last ``window_size`` samples per link in a ring buffer
+    (bounded memory) together with the running per-link sum and sum of
+    squares of the window. Every new sample adds its row and subtracts the
+    row leaving the window, so a push of T samples costs O(T·L) whatever
+    the window size. Samples are centred on the baseline mean first so the
+    running sums stay small, and the sums are recomputed from the ring
+    every ``_RESYNC_WINDOWS`` windows to discard accumulated rounding.
+
+    A sample is "present" once the window is full and at least
+    ``min_links`` links have a rolling-mean z-score above
+    ``threshold_sigma``; presence start / end transitions are emitted as
+    events.
+    """
+
+    def __init__(
+        self,
+        baseline_mean: np.ndarray,
+        baseline_std: np.ndarray,
+        window_size: int = 50,
+        threshold_sigma: float = 2.0,
+        min_links: int = 1,
+    ):
+        self.baseline_mean = np.asarray(baseline_mean, dtype=float)
+        self.baseline_std = np.asarray(baseline_std, dtype=float)
+        self.link_count = len(self.baseline_mean)
+        self.window_size = max(int(window_size), 1)
+        self.threshold_sigma = threshold_sigma
+        self.min_links = max(int(min_links), 1)
+
+        self.sample_count = 0
+        self.present = False
+        self.z_scores = np.zeros(self.link_count)
+        self.variance_ratio = np.zeros(self.link_count)
+        self._ring = np.zeros((self.window_size, self.link_count))   # centred samples, slot = index % W
+        self._sum = np.zeros(self.link_count)
+        self._sum_sq = np.zeros(self.link_count)
+        self._since_resync = 0
+
+    def push(
+        self,
+        rssi_matrix: np.ndarray,
+        timestamps: Optional[Sequence[float]] = None,
+    ) -> List[Dict[str, object]]:
+        """
+        Feed a (T, L) chunk of samples.
+
+        Returns:
+            Presence events, each {"type": "presence_start" | "presence_end",
+            "sample": global sample index, "ts": timestamp or None,
+            "affected_links": [...]}.
+        """
+        block = np.asarray(rssi_matrix, dtype=float)
+        if block.ndim != 2 or block.shape[1] != self.link_count:
+            raise ValueError(
+                f"Expected a (T, {self.link_count}) matrix, got shape {block.shape}"
+            )
+        T = block.shape[0]
+        if T == 0:
+            return []
+
+        W = self.window_size
+        x = block - self.baseline_mean
+        idx = np.arange(T)
+        g = self.sample_count + idx                   # global sample index
+
+        # Row leaving the window as sample g enters: sample g − W, held in
+        # the ring (pushed earlier) or earlier in this block; none before
+        # the window has filled.
+        out = np.zeros_like(x)
+        from_ring = (g >= W) & (idx < W)
+        out[from_ring] = self._ring[g[from_ring] % W]
+        if T > W:
+            out[W:] = x[:-W]
+
+        s = self._sum + np.cumsum(x - out, axis=0)
+        s2 = self._sum_sq + np.cumsum(x**2 - out**2, axis=0)
+        n = np.minimum(g + 1, W)[:, None]
+        mean_c = s / n                                # rolling mean − baseline mean
+        var = np.maximum(s2 / n - mean_c**2, 0.0)
+
+        keep = min(T, W)
+        self._ring[g[-keep:] % W] = x[-keep:]
+        self._sum, self._sum_sq = s[-1], s2[-1]
+        self._since_resync += T
+        if self._since_resync >= _RESYNC_WINDOWS * W:
+            filled = self._ring[:min(self.sample_count + T, W)]
+            self._sum, self._sum_sq = filled.sum(axis=0), (filled**2).sum(axis=0)
+            self._since_resync = 0
+
+        safe_std = np.maximum(self.baseline_std, 1e-6)
+        z = np.abs(mean_c) / safe_std
+        flagged = z > self.threshold_sigma
+        full = (self.sample_count + np.arange(1, T + 1)) >= W
+        present = full & (flagged.sum(axis=1) >= self.min_links)
+
+        events: List[Dict[str, object]] = []
+        prev = np.r_[self.present, present[:-1]]
+        for i in np.flatnonzero(present != prev).tolist():
+            events.append({
+                "type": "presence_start" if present[i] else "presence_end",
+                "sample": self.sample_count + i,
+                "ts": float(timestamps[i]) if timestamps is not None else None,
+                "affected_links": np.flatnonzero(flagged[i]).tolist(),
+            })
+
+        self.sample_count += T
+        self.present = bool(present[-1])
+        self.z_scores = z[-1]
+        self.variance_ratio = var[-1] / np.maximum(self.baseline_std**2, 1e-6)
+        return events
+
+    @property
+    def affected_links(self) -> List[int]:
+        return np.flatnonzero(self.z_scores > self.threshold_sigma).tolist()
+
+
 def simple_attenuation_model(
     free_space_rssi: float,
     body_loss_db: float = 6.0,
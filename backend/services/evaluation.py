@@ -0,0 +1,164 @@
+"""Comparative evaluation – run several positioning engines on one dataset."""
+
+import time
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional
+
+from services.trilateration import trilaterate_ls, trilaterate_wls
+from services.fingerprinting import knn_match_batch
+from services.ftm import multilaterate
+from services.analysis import compute_cdf, error_statistics
+
+ENGINES = ("ls", "wls", "nearest", "knn", "wknn", "ftm")
+
+# Which dataset fields each engine needs
+ENGINE_INPUTS = {
+    "ls": ("rssi", "anchors"),
+    "wls": ("rssi", "anchors"),
+    "nearest": ("rssi", "radio_map", "radio_map_coords"),
+    "knn": ("rssi", "radio_map", "radio_map_coords"),
+    "wknn": ("rssi", "radio_map", "radio_map_coords"),
+    "ftm": ("ftm_distances", "ftm_anchors"),
+}
+
+
+def available_engines(dataset: Dict[str, Optional[np.ndarray]]) -> List[str]:
+    """Engines whose inputs are all present in ``dataset``."""
+    return [
+        name for name in ENGINES
+        if all(dataset.get(field) is not None for field in ENGINE_INPUTS[name])
+    ]
+
+
+def _per_epoch(
+    solver: Callable,
+    anchors: np.ndarray,
+    distances: np.ndarray,
+) -> np.ndarray:
+    """Solve epoch by epoch, using only anchors with a finite distance."""
+    out = np.full((len(distances), 2), np.nan)
+    for t, row in enumerate(distances):
+        seen = np.isfinite(row)
+        if seen.sum() < 3:
+            continue
+        try:
+            out[t] = solver(anchors[seen].tolist(), row[seen].tolist())
+        except (ValueError, np.linalg.LinAlgError):
+            continue
+    return out
+
+
+def _trilateration(dataset: dict, solver: Callable) -> np.ndarray:
+    A, n = dataset["path_loss_A"], dataset["path_loss_n"]
+    distances = 10 ** ((A - dataset["rssi"]) / (10 * n))   # NaN stays NaN
+    return _per_epoch(solver, dataset["anchors"], distances)
+
+
+def _nearest(dataset: dict) -> np.ndarray:
+    """
+    Lab-style nearest match: lowest mean |ΔRSSI| over APs seen in both the
+    reference fingerprint and the scan (as ``nearest_match_rssi_dict``).
+    """
+    rm, coords, scans = dataset["radio_map"], dataset["radio_map_coords"], dataset["rssi"]
+    rm_seen = np.isfinite(rm)
+    out = np.full((len(scans), 2), np.nan)
+    for t, scan in enumerate(scans):
+        common = rm_seen & np.isfinite(scan)
+        counts = common.sum(axis=1)
+        diff = np.where(common, np.abs(rm - scan), 0.0).sum(axis=1)
+        mean_err = np.where(counts > 0, diff / np.maximum(counts, 1), np.inf)
+        best = int(np.argmin(mean_err))
+        if np.isfinite(mean_err[best]):
+            out[t] = coords[best]
+    return out
+
+
+def _knn(dataset: dict, weighted: bool) -> np.ndarray:
+    floor = dataset["missing_rssi"]
+    rm = np.nan_to_num(dataset["radio_map"], nan=floor)
+    scans = np.nan_to_num(dataset["rssi"], nan=floor)
+    return knn_match_batch(rm, dataset["radio_map_coords"], scans, dataset["k"], weighted)
+
+
+def _ftm(dataset: dict) -> np.ndarray:
+    return _per_epoch(multilaterate, dataset["ftm_anchors"], dataset["ftm_distances"])
+
+
+_RUNNERS: Dict[str, Callable[[dict], np.ndarray]] = {
+    "ls": lambda d: _trilateration(d, trilaterate_ls),
+    "wls": lambda d: _trilateration(d, trilaterate_wls),
+    "nearest": _nearest,
+    "knn": lambda d: _knn(d, weighted=False),
+    "wknn": lambda d: _knn(d, weighted=True),
+    "ftm": _ftm,
+}
+
+
+def run_engine(name: str, dataset: dict, num_bins: int = 200) -> Dict[str, object]:
+    """
+    Run one engine over every epoch and score it against ground truth.
+
+    Returns:
+        {"estimates": (T, 2) with NaN where the engine produced no fix,
+         "errors": (T,) with NaN likewise, "statistics", "cdf",
+         "wall_time_s", "cpu_time_s", "throughput", "failed"}
+    """
+    wall0, cpu0 = time.perf_counter(), time.thread_time()
+    estimates = _RUNNERS[name](dataset)
+    wall = time.perf_counter() - wall0
+    cpu = time.thread_time() - cpu0
+
+    errors = np.linalg.norm(estimates - dataset["ground_truth"], axis=1)
+    valid = errors[np.isfinite(errors)]
+    return {
+        "estimates": estimates,
+        "errors": errors,
+        "statistics": error_statistics(valid) if len(valid) else {},
+        "cdf": compute_cdf(valid, num_bins),
+        "wall_time_s": wall,
+        "cpu_time_s": cpu,
+        "throughput": len(estimates) / wall if wall > 0 else float("inf"),
+        "failed": int(len(errors) - len(valid)),
+    }
+
+
+def benchmark(
+    dataset: dict,
+    engines: List[str],
+    max_workers: int = 1,
+    num_bins: int = 200,
+) -> Dict[str, Dict[str, object]]:
+    """
+    Run ``engines`` on the same dataset, one after another by default.
+
+    Args:
+        dataset: {"ground_truth": (T, 2), "rssi": (T, N) with NaN for unseen
+            APs, "anchors": (N, 2), "radio_map": (M, N), "radio_map_coords":
+            (M, 2), "ftm_distances": (T, F), "ftm_anchors": (F, 2),
+            "path_loss_A", "path_loss_n", "k", "missing_rssi"}. Fields an
+            engine does not use may be None.
+        engines: Subset of ``ENGINES``.
+        max_workers: Thread pool size. With more than one worker engines
+            run in parallel where NumPy/SciPy release the GIL, but then
+            ``wall_time_s`` and ``throughput`` include contention between
+            engines; ``cpu_time_s`` (per-thread) is comparable either way.
+    Returns:
+        {engine: ``run_engine`` result}, in the order requested.
+    """
+    unknown = [e for e in engines if e not in _RUNNERS]
+    if unknown:
+        raise ValueError(f"Unknown engines: {unknown}. Choose from {list(ENGINES)}")
+    missing = {
+        e: [f for f in ENGINE_INPUTS[e] if dataset.get(f) is None]
+        for e in engines
+    }
+    missing = {e: fields for e, fields in missing.items() if fields}
+    if missing:
+        raise ValueError(f"Missing inputs: {missing}")
+
+    if max_workers <= 1 or len(engines) == 1:
+        return {e: run_engine(e, dataset, num_bins) for e in engines}
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(engines))) as pool:
+        futures = {e: pool.submit(run_engine, e, dataset, num_bins) for e in engines}
+        return {e: futures[e].result() for e in engines}
@@ -70,6 +70,49 @@ def weighted_knn_match(
     return float(position[0]), float(position[1])
 
 
+def knn_match_batch(
+    radio_map: np.ndarray,
+    radio_map_coords: np.ndarray,
+    test_scans: np.ndarray,
+    k: int = 3,
+    weighted: bool = False,
+    block_elems: int = 4_000_000,
+) -> np.ndarray:
+    """
+    kNN / WkNN matching for many scans at once.
+
+    Same result as calling ``knn_match`` / ``weighted_knn_match`` per row
+    of ``test_scans``; scans are processed in blocks so the (block, M, N)
+    difference tensor stays under ``block_elems`` elements.
+
+    Args:
+        radio_map: (M, N) RSSI matrix.
+        radio_map_coords: (M, 2) coordinate matrix.
+        test_scans: (T, N) RSSI matrix.
+        k: Number of neighbours.
+        weighted: Inverse signal-distance weighting (WkNN).
+    Returns:
+        (T, 2) estimated positions.
+    """
+    m, n = radio_map.shape
+    k = min(k, m)
+    block = max(block_elems // max(m * n, 1), 1)
+    out = np.empty((len(test_scans), 2))
+
+    for start in range(0, len(test_scans), block):
+        scans = test_scans[start:start + block]
+        dist = np.sqrt(np.sum((radio_map[None, :, :] - scans[:, None, :]) ** 2, axis=2))
+        idx = np.argpartition(dist, k - 1, axis=1)[:, :k] if k < m else np.tile(np.arange(m), (len(scans), 1))
+        coords = radio_map_coords[idx]                      # (B, k, 2)
+        if weighted:
+            w = 1.0 / np.maximum(np.take_along_axis(dist, idx, axis=1), 1e-6)
+            w /= w.sum(axis=1, keepdims=True)
+            out[start:start + len(scans)] = np.einsum("bk,bkd->bd", w, coords)
+        else:
+            out[start:start + len(scans)] = coords.mean(axis=1)
+    return out
+
+
 # ─── Dict-based matching (for log-file fingerprinting) ───────────
 
 
@@ -0,0 +1,204 @@
+"""HMM map matching – snap positioning sequences onto discretised floor paths."""
+
+import numpy as np
+from scipy import sparse
+from scipy.sparse.csgraph import dijkstra
+from scipy.spatial import cKDTree
+from typing import Dict, List, Optional, Tuple
+
+# Source nodes per Dijkstra call when building the transition table
+_SOURCE_BLOCK = 256
+
+
+class PathGraph:
+    """
+    Walkable graph over the discrete points of a floor's paths.
+
+    Consecutive points of a path are linked, and points of different paths
+    closer than ``join_radius`` are linked to form junctions. Transitions
+    between two epochs are allowed up to ``max_step`` meters of walking
+    distance along the graph, with log-probability −½(d / step_sigma)²
+    normalised per source node. The table is stored sparsely, grouped by
+    target node, so one Viterbi step is a gather plus a segmented max.
+    """
+
+    def __init__(
+        self,
+        points: np.ndarray,
+        path_index: np.ndarray,
+        join_radius: float = 1.0,
+        max_step: float = 3.0,
+        step_sigma: float = 1.0,
+    ):
+        self.points = np.asarray(points, dtype=float)
+        self.path_index = np.asarray(path_index)
+        k = len(self.points)
+        if k == 0:
+            raise ValueError("Path graph needs at least one point")
+
+        # Edges: along each path, plus junctions between nearby points
+        along = np.flatnonzero(self.path_index[:-1] == self.path_index[1:])
+        joins = cKDTree(self.points).query_pairs(join_radius, output_type="ndarray")
+        src = np.concatenate((along, joins[:, 0]))
+        dst = np.concatenate((along + 1, joins[:, 1]))
+        w = np.maximum(np.linalg.norm(self.points[src] - self.points[dst], axis=1), 1e-9)
+        # csr_matrix sums duplicate entries; keep one copy of each edge
+        _, first = np.unique(src * k + dst, return_index=True)
+        adjacency = sparse.csr_matrix((w[first], (src[first], dst[first])), shape=(k, k))
+        self.edge_count = len(first)
+
+        # Transition table: graph distance ≤ max_step
+        rows, cols, dists = [], [], []
+        for start in range(0, k, _SOURCE_BLOCK):
+            block = np.arange(start, min(start + _SOURCE_BLOCK, k))
+            d = dijkstra(adjacency, directed=False, indices=block, limit=max_step)
+            r, c = np.nonzero(np.isfinite(d))
+            rows.append(block[r])
+            cols.append(c)
+            dists.append(d[r, c])
+        src, dst, dist = np.concatenate(rows), np.concatenate(cols), np.concatenate(dists)
+
+        log_p = -0.5 * (dist / step_sigma) ** 2
+        norm = np.logaddexp.reduceat(log_p, np.flatnonzero(np.r_[True, src[1:] != src[:-1]]))
+        log_p -= norm[src]                    # rows come out of dijkstra in source order
+
+        order = np.lexsort((src, dst))
+        self.trans_src = src[order]
+        self.trans_dst = dst[order]
+        self.trans_logp = log_p[order]
+        self._dst_starts = np.flatnonzero(np.r_[True, self.trans_dst[1:] != self.trans_dst[:-1]])
+
+    @property
+    def node_count(self) -> int:
+        return len(self.points)
+
+    def step(self, score: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        One max-product step: best predecessor score and index per node.
+
+        Every node can stay where it is, so each target has at least one
+        incoming transition.
+        """
+        cand = score[self.trans_src] + self.trans_logp
+        best = np.maximum.reduceat(cand, self._dst_starts)
+        hit = np.flatnonzero(cand == best[self.trans_dst])
+        _, first = np.unique(self.trans_dst[hit], return_index=True)
+        return best, self.trans_src[hit[first]]
+
+
+def viterbi(graph: PathGraph, log_emissions: np.ndarray) -> Tuple[np.ndarray, float]:
+    """
+    Most likely node sequence for a whole walk (log-space Viterbi).
+
+    Args:
+        log_emissions: (T, K) log-likelihood of each epoch at each node.
+    Returns:
+        ((T,) node indices, log score of the best path).
+    """
+    log_emissions = np.asarray(log_emissions, dtype=float)
+    T = len(log_emissions)
+    if T == 0:
+        return np.zeros(0, dtype=int), 0.0
+
+    back = np.empty((T, graph.node_count), dtype=np.int32)
+    score = log_emissions[0].copy()
+    offset = 0.0
+    for t in range(1, T):
+        best, back[t] = graph.step(score)
+        score = best + log_emissions[t]
+        top = score.max()
+        score -= top                          # keep scores near zero
+        offset += top
+
+    path = np.empty(T, dtype=np.int64)
+    path[-1] = int(np.argmax(score))
+    total = float(score[path[-1]] + offset)
+    for t in range(T - 1, 0, -1):
+        path[t - 1] = back[t, path[t]]
+    return path, total
+
+
+class ViterbiStream:
+    """
+    Fixed-lag Viterbi decoder for live map matching.
+
+    Each pushed epoch returns the decision for the epoch ``lag`` steps
+    earlier, backtracked from the currently best node. Only ``lag`` rows of
+    backpointers are kept, so memory and per-epoch cost stay constant over
+    arbitrarily long walks.
+    """
+
+    def __init__(self, graph: PathGraph, lag: int = 5):
+        if lag < 0:
+            raise ValueError("lag must be >= 0")
+        self.graph = graph
+        self.lag = lag
+        self.score: Optional[np.ndarray] = None
+        self.epoch_count = 0
+        self.decided = 0                      # epochs already emitted
+        self._back: List[np.ndarray] = []     # backpointers for epochs decided+1 .. now
+
+    def _backtrack(self) -> List[int]:
+        """Best nodes for epochs decided .. now, oldest first."""
+        node = int(np.argmax(self.score))
+        nodes = [node]
+        for bp in reversed(self._back):
+            node = int(bp[node])
+            nodes.append(node)
+        return nodes[::-1]
+
+    def _trim(self):
+        """Drop backpointers that point into already decided epochs."""
+        keep = self.epoch_count - 1 - self.decided
+        if len(self._back) > keep:
+            del self._back[:len(self._back) - keep]
+
+    def push(self, log_emission: np.ndarray) -> List[Tuple[int, int]]:
+        """Add one epoch; return newly decided (epoch, node) pairs."""
+        log_emission = np.asarray(log_emission, dtype=float)
+        if self.score is None:
+            self.score = log_emission.copy()
+        else:
+            best, bp = self.graph.step(self.score)
+            self.score = best + log_emission
+            self.score -= self.score.max()
+            self._back.append(bp)
+        self.epoch_count += 1
+        self._trim()
+
+        if self.epoch_count - self.decided <= self.lag:
+            return []
+        node = self._backtrack()[0]
+        out = [(self.decided, node)]
+        self.decided += 1
+        self._trim()
+        return out
+
+    def flush(self) -> List[Tuple[int, int]]:
+        """End of walk: decide every remaining epoch."""
+        if self.score is None or self.decided >= self.epoch_count:
+            return []
+        nodes = self._backtrack()
+        out = list(zip(range(self.decided, self.epoch_count), nodes))
+        self.decided = self.epoch_count
+        self._back = []
+        return out
+
+
+def log_emissions(
+    graph: PathGraph,
+    observations: List[Dict[str, object]],
+    measurements,
+) -> np.ndarray:
+    """
+    (T, K) emission scores of each observation at every graph node, using a
+    ``MeasurementModel`` (position fixes, trilateration ranges or raw scans).
+    Observations with nothing usable score 0 everywhere.
+    """
+    x, y = graph.points[:, 0], graph.points[:, 1]
+    out = np.zeros((len(observations), graph.node_count))
+    for t, obs in enumerate(observations):
+        ll = measurements.log_likelihood(x, y, obs)
+        if ll is not None:
+            out[t] = ll
+    return out
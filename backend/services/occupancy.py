@@ -0,0 +1,301 @@
+"""Floor occupancy grid – wall bit-array derived from the floor image."""
+
+import os
+import threading
+import numpy as np
+from typing import Dict, Optional, Tuple
+
+# Samples per block (segments × samples per segment), bounding the work arrays
+_SAMPLE_BLOCK = 8_000_000
+
+
+class OccupancyGrid:
+    """
+    Wall / free grid for one floor, stored as a packed bit-array.
+
+    Cells are ``cell_m`` meters square; a cell is a wall when any image
+    pixel inside it is darker than the threshold. Row 0 is the top of the
+    image, so a point (x_m, y_m) in floor meters (origin at ``origin_px``,
+    y up) maps to column (ox + x·ppm) / cell_px and row (oy − y·ppm) / cell_px.
+    Points outside the image count as walls.
+    """
+
+    def __init__(
+        self,
+        packed: np.ndarray,
+        shape: Tuple[int, int],
+        pixels_per_meter: float,
+        origin_px: Tuple[float, float],
+        cell_px: int,
+    ):
+        self.packed = packed                    # (rows, ceil(cols / 8)) uint8
+        self.rows, self.cols = shape
+        self.pixels_per_meter = pixels_per_meter
+        self.origin_px = origin_px
+        self.cell_px = cell_px
+
+        # Lookup copy with a one-cell wall border: clipping an index onto the
+        # border replaces the per-sample bounds test
+        walls = np.unpackbits(packed, axis=1, count=self.cols).astype(bool)
+        self._bordered = np.packbits(np.pad(walls, 1, constant_values=True), axis=1).ravel()
+        self._row_bytes = (self.cols + 2 + 7) // 8
+
+    @property
+    def cell_m(self) -> float:
+        return self.cell_px / self.pixels_per_meter
+
+    @property
+    def nbytes(self) -> int:
+        return self.packed.nbytes
+
+    @classmethod
+    def from_walls(
+        cls,
+        walls: np.ndarray,
+        pixels_per_meter: float,
+        origin_px: Tuple[float, float],
+        cell_px: int = 1,
+    ) -> "OccupancyGrid":
+        """Build from a (rows, cols) boolean wall mask already at cell resolution."""
+        walls = np.asarray(walls, dtype=bool)
+        return cls(np.packbits(walls, axis=1), walls.shape, pixels_per_meter, origin_px, cell_px)
+
+    @classmethod
+    def from_image(
+        cls,
+        image_path: str,
+        pixels_per_meter: float,
+        origin_px: Tuple[float, float],
+        cell_m: float = 0.1,
+        threshold: int = 128,
+    ) -> "OccupancyGrid":
+        """
+        Derive the grid from a floor image: dark pixels are walls.
+
+        The image is block-reduced to ``cell_m`` cells with "any pixel is a
+        wall", so thin walls survive downsampling.
+        """
+        from PIL import Image as PILImage
+
+        if pixels_per_meter <= 0:
+            raise ValueError("pixels_per_meter must be > 0")
+        try:
+            with PILImage.open(image_path) as img:
+                gray = np.asarray(img.convert("L"))
+        except (OSError, ValueError) as e:
+            raise ValueError(f"Cannot read floor image: {e}")
+
+        cell_px = max(1, int(round(cell_m * pixels_per_meter)))
+        h, w = gray.shape
+        rows, cols = -(-h // cell_px), -(-w // cell_px)
+        dark = np.zeros((rows * cell_px, cols * cell_px), dtype=bool)
+        dark[:h, :w] = gray < threshold
+        walls = dark.reshape(rows, cell_px, cols, cell_px).any(axis=(1, 3))
+        return cls.from_walls(walls, pixels_per_meter, origin_px, cell_px)
+
+    # ── Persistence ──────────────────────────────────────────────
+
+    def save(self, path: str):
+        np.savez(
+            path,
+            packed=self.packed,
+            shape=np.array([self.rows, self.cols]),
+            meta=np.array([self.pixels_per_meter, *self.origin_px, self.cell_px], dtype=float),
+        )
+
+    @classmethod
+    def load(cls, path: str) -> "OccupancyGrid":
+        with np.load(path, allow_pickle=False) as npz:
+            ppm, ox, oy, cell_px = npz["meta"].tolist()
+            rows, cols = npz["shape"].tolist()
+            return cls(npz["packed"], (rows, cols), ppm, (ox, oy), int(cell_px))
+
+    # ── Queries ──────────────────────────────────────────────────
+
+    def to_cells(self, x_m: np.ndarray, y_m: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Floor meters → fractional (row, col) cell coordinates."""
+        ox, oy = self.origin_px
+        scale = self.pixels_per_meter / self.cell_px
+        col = ox / self.cell_px + np.asarray(x_m, dtype=float) * scale
+        row = oy / self.cell_px - np.asarray(y_m, dtype=float) * scale
+        return row, col
+
+    def _wall_at(self, row: np.ndarray, col: np.ndarray) -> np.ndarray:
+        """Wall bit for fractional cell coordinates (outside = wall)."""
+        r = np.clip(np.floor(row), -1, self.rows).astype(np.int32) + 1
+        c = np.clip(np.floor(col), -1, self.cols).astype(np.int32) + 1
+        byte = self._bordered[r * self._row_bytes + (c >> 3)]
+        return ((byte >> (7 - (c & 7)).astype(np.uint8)) & 1).astype(bool)
+
+    def is_wall(self, x_m: np.ndarray, y_m: np.ndarray) -> np.ndarray:
+        """Vectorised point lookup in floor meters."""
+        return self._wall_at(*self.to_cells(x_m, y_m))
+
+    def _clip_to_grid(
+        self, r0: np.ndarray, c0: np.ndarray, r1: np.ndarray, c1: np.ndarray,
+    ) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Clip cell-space segments to the grid plus half a cell of border.
+
+        Everything outside the grid is wall, and the grid is convex, so
+        dropping the outside parts keeps every answer while bounding the
+        sample count by the grid diagonal. Segments missing the grid
+        entirely collapse onto their (outside, hence wall) start point.
+        """
+        lo = np.array([-0.5, -0.5])
+        hi = np.array([self.rows + 0.5, self.cols + 0.5])
+        p0 = np.stack([r0, c0], axis=1)
+        d = np.stack([r1 - r0, c1 - c0], axis=1)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            ta, tb = (lo - p0) / d, (hi - p0) / d
+        # Axis-parallel segments: all t when inside the slab, none otherwise
+        flat = d == 0
+        inside = (p0 >= lo) & (p0 <= hi)
+        ta = np.where(flat, np.where(inside, -np.inf, np.inf), ta)
+        tb = np.where(flat, np.where(inside, np.inf, -np.inf), tb)
+        t_in = np.clip(np.minimum(ta, tb).max(axis=1), 0.0, 1.0)
+        t_out = np.clip(np.maximum(ta, tb).min(axis=1), 0.0, 1.0)
+        t_out = np.where(t_out < t_in, t_in, t_out)
+        # Missing segments keep their raw start point, which _wall_at clamps
+        t_in = np.where(t_in == t_out, 0.0, t_in)
+        t_out = np.where(t_in == t_out, 0.0, t_out)
+        return (r0 + t_in * d[:, 0], c0 + t_in * d[:, 1],
+                r0 + t_out * d[:, 0], c0 + t_out * d[:, 1])
+
+    def _wall_hits(
+        self,
+        x0: np.ndarray,
+        y0: np.ndarray,
+        x1: np.ndarray,
+        y1: np.ndarray,
+        transitions: bool,
+    ) -> np.ndarray:
+        """
+        Per-segment wall hits along (x0, y0) → (x1, y1) in meters: the number
+        of wall samples, or with ``transitions`` the free → wall transitions.
+
+        Endpoints are converted to cell coordinates and clipped to the grid
+        once; every segment is then sampled at the same number of points, at
+        most half a cell apart along the longest segment, and the samples of
+        a block of segments (at most ``_SAMPLE_BLOCK`` in total) are tested
+        with one gather on the packed bits. A segment can only slip through
+        where two wall cells meet diagonally at a corner.
+        """
+        coords = [np.ravel(np.asarray(v, dtype=float)) for v in (x0, y0, x1, y1)]
+        if not all(np.isfinite(v).all() for v in coords):
+            raise ValueError("Segment coordinates must be finite")
+        r0, c0 = self.to_cells(coords[0], coords[1])
+        r1, c1 = self.to_cells(coords[2], coords[3])
+        out = np.zeros(len(r0), dtype=np.int32)
+        if not len(r0):
+            return out
+
+        r0, c0, r1, c1 = self._clip_to_grid(r0, c0, r1, c1)
+        r0, c0 = r0.astype(np.float32), c0.astype(np.float32)
+        dr, dc = (r1 - r0).astype(np.float32), (c1 - c0).astype(np.float32)
+        n_samples = int(np.ceil(2 * float(np.max(np.hypot(dr, dc))))) + 1
+        t = np.linspace(0.0, 1.0, n_samples, dtype=np.float32)
+        block = max(_SAMPLE_BLOCK // n_samples, 1)
+        for start in range(0, len(r0), block):
+            sl = slice(start, start + block)
+            walls = self._wall_at(
+                r0[sl, None] + dr[sl, None] * t,
+                c0[sl, None] + dc[sl, None] * t,
+            )
+            if transitions:
+                walls = walls[:, 1:] & ~walls[:, :-1]
+            out[sl] = np.count_nonzero(walls, axis=1)
+        return out
+
+    def segments_cross_wall(
+        self,
+        x0: np.ndarray,
+        y0: np.ndarray,
+        x1: np.ndarray,
+        y1: np.ndarray,
+    ) -> np.ndarray:
+        """
+        For each segment (x0, y0) → (x1, y1) in meters, whether it touches a
+        wall cell (endpoints included). Non-finite coordinates are a
+        ``ValueError``; sampling is described in ``_wall_hits``.
+        """
+        return self._wall_hits(x0, y0, x1, y1, transitions=False) > 0
+
+    def count_wall_crossings(
+        self,
+        x0: np.ndarray,
+        y0: np.ndarray,
+        x1: np.ndarray,
+        y1: np.ndarray,
+    ) -> np.ndarray:
+        """
+        Number of walls each segment (x0, y0) → (x1, y1) in meters passes
+        into, i.e. free → wall transitions along it (a wall under the start
+        point is not counted). Sampling is as in ``segments_cross_wall``.
+        """
+        return self._wall_hits(x0, y0, x1, y1, transitions=True)
+
+    def summary(self) -> Dict[str, object]:
+        walls = np.unpackbits(self.packed, axis=1, count=self.cols)
+        ox, oy = self.origin_px
+        ppm = self.pixels_per_meter
+        return {
+            "rows": self.rows,
+            "cols": self.cols,
+            "cell_m": self.cell_m,
+            "wall_fraction": float(walls.mean()) if walls.size else 0.0,
+            "bytes": self.nbytes,
+            "bounds_m": [
+                -ox / ppm,
+                (oy - self.rows * self.cell_px) / ppm,
+                (self.cols * self.cell_px - ox) / ppm,
+                oy / ppm,
+            ],
+        }
+
+
+# ── Per-floor cache ──────────────────────────────────────────────
+
+_GRIDS: Dict[str, Tuple[tuple, OccupancyGrid]] = {}
+_LOCK = threading.Lock()
+
+
+def load_floor_grid(
+    cache_path: str,
+    image_path: str,
+    pixels_per_meter: float,
+    origin_px: Tuple[float, float],
+    cell_m: float = 0.1,
+    threshold: int = 128,
+) -> OccupancyGrid:
+    """
+    Occupancy grid for a floor image, built at most once per input.
+
+    Grids are kept in memory and as ``cache_path`` (.npz) on disk. The key
+    covers the image mtime and calibration, so re-uploading the image or
+    recalibrating the floor rebuilds the grid on next use.
+    """
+    if not image_path or not os.path.exists(image_path):
+        raise ValueError("Floor has no image")
+    key = (image_path, os.path.getmtime(image_path), pixels_per_meter,
+           tuple(origin_px), cell_m, threshold)
+    key_path = cache_path + ".key"
+
+    with _LOCK:
+        cached = _GRIDS.get(cache_path)
+        if cached and cached[0] == key:
+            return cached[1]
+
+        grid: Optional[OccupancyGrid] = None
+        if os.path.exists(cache_path) and os.path.exists(key_path):
+            with open(key_path) as fh:
+                if fh.read() == repr(key):
+                    grid = OccupancyGrid.load(cache_path)
+        if grid is None:
+            grid = OccupancyGrid.from_image(image_path, pixels_per_meter, origin_px, cell_m, threshold)
+            grid.save(cache_path)
+            with open(key_path, "w") as fh:
+                fh.write(repr(key))
+
+        _GRIDS[cache_path] = (key, grid)
+        return grid
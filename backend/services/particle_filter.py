@@ -0,0 +1,349 @@
+"""Particle filter fusion – PDR motion + WiFi / FTM measurement updates."""
+
+import numpy as np
+from scipy.spatial import cKDTree
+from typing import Callable, Dict, List, Optional
+
+from services.pdr import PDRStream
+
+# Elements (steps × particles) per block of propagated steps, bounding the
+# work arrays (8 MB each in float64) whatever the particle count
+_STEP_BLOCK_ELEMS = 1_000_000
+
+
+def systematic_resample(weights: np.ndarray, rng: np.random.Generator) -> np.ndarray:
+    """
+    Systematic resampling: one uniform offset, N evenly spaced pointers.
+
+    Args:
+        weights: (N,) normalised particle weights.
+    Returns:
+        (N,) indices of the particles to keep.
+    """
+    n = len(weights)
+    positions = (rng.random() + np.arange(n)) / n
+    cumulative = np.cumsum(weights)
+    cumulative[-1] = 1.0
+    return np.searchsorted(cumulative, positions, side="right")
+
+
+class MeasurementModel:
+    """
+    Log-likelihood of a position hypothesis given one measurement dict:
+
+      - {"x", "y"}: a position fix from fingerprinting / trilateration;
+        Gaussian in the distance, ``sigma`` meters (default 3).
+      - {"distances"}: ranges to ``anchors`` (RSSI-derived or FTM, NaN =
+        unseen); Gaussian range residuals, ``sigma`` meters (default 2).
+      - {"scan"}: a raw RSSI vector (NaN = AP unseen), compared with the
+        fingerprint of the reference point nearest each hypothesis;
+        ``sigma`` dB per AP (default 6).
+
+    Shared by the particle filter and the HMM map matcher.
+    """
+
+    def __init__(
+        self,
+        anchors: Optional[np.ndarray] = None,
+        radio_map: Optional[np.ndarray] = None,
+        radio_map_coords: Optional[np.ndarray] = None,
+    ):
+        self.anchors = None if anchors is None else np.asarray(anchors, dtype=float)
+        self.radio_map = None if radio_map is None else np.asarray(radio_map, dtype=float)
+        self._rm_tree = None
+        if radio_map_coords is not None:
+            self._rm_tree = cKDTree(np.asarray(radio_map_coords, dtype=float))
+
+    def check(self, fix: Dict[str, object]) -> str:
+        """Validate a measurement dict and return its kind."""
+        if "x" in fix and "y" in fix:
+            return "position"
+        if "distances" in fix:
+            if self.anchors is None:
+                raise ValueError("Range fixes need anchors")
+            if np.shape(fix["distances"]) != (len(self.anchors),):
+                raise ValueError(f"Range fixes need {len(self.anchors)} distances")
+            return "ranges"
+        if "scan" in fix:
+            if self.radio_map is None or self._rm_tree is None:
+                raise ValueError("Scan fixes need radio_map and radio_map_coords")
+            if np.shape(fix["scan"]) != (self.radio_map.shape[1],):
+                raise ValueError(f"Scan fixes need {self.radio_map.shape[1]} RSSI values")
+            return "scan"
+        raise ValueError("A fix needs x/y, distances or scan")
+
+    def log_likelihood(
+        self,
+        x: np.ndarray,
+        y: np.ndarray,
+        fix: Dict[str, object],
+    ) -> Optional[np.ndarray]:
+        """Unnormalised log-likelihood per hypothesis, or None if the fix carries
+        no usable values (every AP / anchor unseen)."""
+        kind = self.check(fix)
+        sigma = fix.get("sigma")
+
+        if kind == "position":
+            d2 = (x - fix["x"]) ** 2 + (y - fix["y"]) ** 2
+            return -0.5 * d2 / (sigma or 3.0) ** 2
+
+        if kind == "ranges":
+            d = np.asarray(fix["distances"], dtype=float)
+            seen = np.isfinite(d)
+            if not seen.any():
+                return None
+            a = self.anchors[seen]
+            pred = np.hypot(x[:, None] - a[:, 0], y[:, None] - a[:, 1])
+            return -0.5 * np.sum((pred - d[seen]) ** 2, axis=1) / (sigma or 2.0) ** 2
+
+        s = np.asarray(fix["scan"], dtype=float)
+        seen = np.isfinite(s)
+        if not seen.any():
+            return None
+        _, nearest = self._rm_tree.query(np.column_stack((x, y)))
+        expected = self.radio_map[nearest][:, seen]
+        diff = np.nan_to_num(expected - s[seen], nan=0.0)
+        return -0.5 * np.sum(diff**2, axis=1) / ((sigma or 6.0) ** 2 * seen.sum())
+
+
+class ParticleFilter:
+    """
+    Vectorised 2-D particle filter driven by PDR steps.
+
+    Particle state lives in flat NumPy arrays (x, y, heading bias, weight).
+    Each PDR step moves every particle by its stride and heading, perturbed
+    by per-particle stride noise, per-step heading noise and a slowly
+    drifting heading bias (gyro drift / magnetic disturbance). Position
+    fixes, ranges (trilateration / FTM) or raw fingerprint scans reweight
+    the particles; systematic resampling runs when the effective sample
+    size drops below ``resample_threshold × N``.
+
+    With a ``wall_check(x0, y0, x1, y1) -> bool[]`` (e.g.
+    ``OccupancyGrid.segments_cross_wall``) every step of all particles is
+    tested in bulk, particles that walk through a wall are dropped and the
+    weights are renormalised and resampled if needed before the next step.
+    """
+
+    def __init__(
+        self,
+        n_particles: int = 2000,
+        start_x: float = 0.0,
+        start_y: float = 0.0,
+        init_spread: float = 1.0,
+        init_heading_spread: float = 0.2,
+        stride_noise: float = 0.1,
+        heading_noise: float = 0.05,
+        heading_drift: float = 0.01,
+        resample_threshold: float = 0.5,
+        anchors: Optional[np.ndarray] = None,
+        radio_map: Optional[np.ndarray] = None,
+        radio_map_coords: Optional[np.ndarray] = None,
+        wall_check: Optional[Callable[..., np.ndarray]] = None,
+        seed: Optional[int] = None,
+    ):
+        if n_particles < 1:
+            raise ValueError("n_particles must be >= 1")
+        self.n = n_particles
+        self.stride_noise = stride_noise
+        self.heading_noise = heading_noise
+        self.heading_drift = heading_drift
+        self.resample_threshold = resample_threshold
+        self.rng = np.random.default_rng(seed)
+
+        self.x = start_x + self.rng.normal(0, init_spread, n_particles)
+        self.y = start_y + self.rng.normal(0, init_spread, n_particles)
+        self.bias = self.rng.normal(0, init_heading_spread, n_particles)
+        self.weights = np.full(n_particles, 1.0 / n_particles)
+
+        self.measurements = MeasurementModel(anchors, radio_map, radio_map_coords)
+
+        self.wall_check = wall_check
+        self.resample_count = 0
+
+    # ── Motion ───────────────────────────────────────────────────
+
+    def predict(self, strides: np.ndarray, headings: np.ndarray) -> np.ndarray:
+        """
+        Propagate all particles through a run of PDR steps.
+
+        Args:
+            strides: (S,) stride lengths in meters.
+            headings: (S,) PDR heading per step (rad).
+        Returns:
+            (S, 3) weighted mean x, y and spread after each step.
+        """
+        strides = np.asarray(strides, dtype=float)
+        headings = np.asarray(headings, dtype=float)
+        means = np.empty((len(strides), 3))
+
+        # Wall kills must reweight (and possibly resample) the cloud before
+        # the next step moves it, so constrained motion goes step by step;
+        # unconstrained motion is propagated in blocks.
+        block = 1 if self.wall_check is not None else max(_STEP_BLOCK_ELEMS // self.n, 1)
+        for start in range(0, len(strides), block):
+            sl = strides[start:start + block, None]
+            hd = headings[start:start + block, None]
+            shape = (len(sl), self.n)
+
+            bias = self.bias + np.cumsum(self.rng.normal(0, self.heading_drift, shape), axis=0)
+            h = hd + bias + self.rng.normal(0, self.heading_noise, shape)
+            step = sl * (1 + self.rng.normal(0, self.stride_noise, shape))
+            xs = self.x + np.cumsum(step * np.cos(h), axis=0)
+            ys = self.y + np.cumsum(step * np.sin(h), axis=0)
+
+            w = np.broadcast_to(self.weights, shape)
+            dead = None
+            if self.wall_check is not None:
+                px = np.vstack((self.x[None], xs[:-1]))
+                py = np.vstack((self.y[None], ys[:-1]))
+                crossed = self.wall_check(px.ravel(), py.ravel(), xs.ravel(), ys.ravel())
+                dead = np.logical_or.accumulate(crossed.reshape(shape), axis=0)
+                alive_w = np.where(dead, 0.0, w)
+                total = alive_w.sum(axis=1, keepdims=True)
+                w = np.where(total > 0, alive_w / np.where(total > 0, total, 1.0), w)
+
+            self.x, self.y, self.bias = xs[-1], ys[-1], bias[-1]
+            mx = np.sum(xs * w, axis=1)
+            my = np.sum(ys * w, axis=1)
+            spread = np.sqrt(np.sum(((xs - mx[:, None]) ** 2 + (ys - my[:, None]) ** 2) * w, axis=1))
+            means[start:start + len(sl)] = np.column_stack((mx, my, spread))
+            if dead is not None and dead[-1].any():
+                self._reweight(np.where(dead[-1], -np.inf, 0.0))
+        return means
+
+    # ── Measurement updates ──────────────────────────────────────
+
+    def _reweight(self, log_likelihood: np.ndarray):
+        log_w = np.log(np.maximum(self.weights, 1e-300)) + log_likelihood
+        if not np.isfinite(log_w).any():
+            # Every particle ruled out – keep the cloud, forget the weights
+            self.weights = np.full(self.n, 1.0 / self.n)
+            return
+        w = np.exp(log_w - np.max(log_w))
+        self.weights = w / w.sum()
+        if self.effective_sample_size < self.resample_threshold * self.n:
+            self.resample()
+
+    def update_position(self, x: float, y: float, sigma: float = 3.0):
+        """Weight by a position fix (fingerprint / trilateration output)."""
+        self.update({"x": x, "y": y, "sigma": sigma})
+
+    def update_ranges(self, distances: np.ndarray, sigma: float = 2.0):
+        """Weight by ranges to ``anchors`` (RSSI-derived or FTM); NaN = unseen."""
+        self.update({"distances": distances, "sigma": sigma})
+
+    def update_fingerprint(self, scan: np.ndarray, sigma_db: float = 6.0):
+        """Weight by a raw RSSI scan against the radio map (NaN = AP unseen)."""
+        self.update({"scan": scan, "sigma": sigma_db})
+
+    def check_fix(self, fix: Dict[str, object]) -> str:
+        """Validate a measurement dict and return its kind."""
+        return self.measurements.check(fix)
+
+    def update(self, fix: Dict[str, object]):
+        """Reweight by one measurement dict: {x, y} / {distances} / {scan}."""
+        log_likelihood = self.measurements.log_likelihood(self.x, self.y, fix)
+        if log_likelihood is not None:
+            self._reweight(log_likelihood)
+
+    # ── Resampling / estimates ───────────────────────────────────
+
+    @property
+    def effective_sample_size(self) -> float:
+        return float(1.0 / np.sum(self.weights**2))
+
+    def resample(self):
+        idx = systematic_resample(self.weights, self.rng)
+        self.x, self.y, self.bias = self.x[idx], self.y[idx], self.bias[idx]
+        self.weights = np.full(self.n, 1.0 / self.n)
+        self.resample_count += 1
+
+    def estimate(self) -> Dict[str, float]:
+        """Weighted mean position and its spread (RMS distance to the mean)."""
+        mx = float(self.x @ self.weights)
+        my = float(self.y @ self.weights)
+        spread = float(np.sqrt(((self.x - mx) ** 2 + (self.y - my) ** 2) @ self.weights))
+        return {"x": mx, "y": my, "std": spread}
+
+
+def fuse(
+    pf: ParticleFilter,
+    step_times: np.ndarray,
+    strides: np.ndarray,
+    headings: np.ndarray,
+    fixes: List[Dict[str, object]],
+) -> List[Dict[str, object]]:
+    """
+    Replay PDR steps and timestamped fixes through the filter in time order.
+
+    Steps at or before a fix's ``t`` are applied before it. Returns one
+    estimate per step and per fix: {t, x, y, std, source}.
+    """
+    step_times = np.asarray(step_times, dtype=float)
+    for fix in fixes:
+        pf.check_fix(fix)
+    fixes = sorted(fixes, key=lambda f: f["t"])
+    out: List[Dict[str, object]] = []
+    done = 0
+
+    def _steps_until(end: int):
+        nonlocal done
+        if end <= done:
+            return
+        means = pf.predict(strides[done:end], headings[done:end])
+        for t, (mx, my, spread) in zip(step_times[done:end].tolist(), means.tolist()):
+            out.append({"t": t, "x": mx, "y": my, "std": spread, "source": "step"})
+        done = end
+
+    for fix in fixes:
+        _steps_until(int(np.searchsorted(step_times, fix["t"], side="right")))
+        pf.update(fix)
+        out.append({"t": float(fix["t"]), **pf.estimate(), "source": "fix"})
+    _steps_until(len(step_times))
+    return out
+
+
+class FusionStream:
+    """
+    Live fusion: a ``PDRStream`` feeding a ``ParticleFilter``.
+
+    Fixes are held back until the PDR stream has confirmed every step up to
+    their timestamp, so steps and fixes always reach the filter in time
+    order even though steps trail the live edge by the PDR look-ahead.
+    Times are seconds since the first IMU sample.
+    """
+
+    def __init__(self, pdr: PDRStream, pf: ParticleFilter):
+        self.pdr = pdr
+        self.pf = pf
+        self._pending: List[Dict[str, object]] = []
+
+    def _advance(self, result: Dict[str, object], horizon_s: float) -> List[Dict[str, object]]:
+        step_times = np.asarray(result["step_indices"], dtype=float) / self.pdr.sampling_rate
+        ready = [f for f in self._pending if f["t"] <= horizon_s]
+        self._pending = [f for f in self._pending if f["t"] > horizon_s]
+        return fuse(
+            self.pf, step_times,
+            np.asarray(result["stride_lengths"]), np.asarray(result["headings"]),
+            ready,
+        )
+
+    def push(
+        self,
+        acc_x: np.ndarray,
+        acc_y: np.ndarray,
+        acc_z: np.ndarray,
+        gyro_z: Optional[np.ndarray] = None,
+        mag_heading: Optional[np.ndarray] = None,
+        fixes: Optional[List[Dict[str, object]]] = None,
+    ) -> List[Dict[str, object]]:
+        """Feed one IMU chunk (plus any fixes) and return the new estimates."""
+        for fix in fixes or []:
+            self.pf.check_fix(fix)
+        self._pending.extend(fixes or [])
+        result = self.pdr.push(acc_x, acc_y, acc_z, gyro_z, mag_heading)
+        return self._advance(result, self.pdr.confirmed_samples / self.pdr.sampling_rate)
+
+    def flush(self) -> List[Dict[str, object]]:
+        """End of walk: confirm remaining steps and apply every held fix."""
+        return self._advance(self.pdr.flush(), float("inf"))
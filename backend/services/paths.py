@@ -0,0 +1,34 @@
+"""Path discretisation – evenly spaced points along a drawn polyline."""
+
+import numpy as np
+
+
+def discretize_polyline(waypoints: np.ndarray, spacing: float) -> np.ndarray:
+    """
+    Points every ``spacing`` units of arc length along a polyline.
+
+    The first waypoint is always included; then one point at each multiple
+    of ``spacing`` up to the total length, carrying the remainder across
+    vertices. Zero-length segments are ignored.
+
+    Args:
+        waypoints: (N, 2) vertex coordinates.
+        spacing: Distance between consecutive points (same units).
+    Returns:
+        (K, 2) point coordinates.
+    """
+    waypoints = np.asarray(waypoints, dtype=float).reshape(-1, 2)
+    if len(waypoints) < 2 or spacing <= 0:
+        return waypoints[:1].copy()
+
+    seg = np.linalg.norm(np.diff(waypoints, axis=0), axis=1)
+    keep = np.r_[True, seg > 0]
+    vertices = waypoints[keep]
+    arc = np.r_[0.0, np.cumsum(seg[seg > 0])]
+    if len(vertices) < 2:
+        return waypoints[:1].copy()
+
+    # Small tolerance so a point landing exactly on the end is kept
+    count = int(np.floor(arc[-1] / spacing + 1e-9))
+    s = np.r_[0.0, spacing * np.arange(1, count + 1)]
+    return np.column_stack((np.interp(s, arc, vertices[:, 0]), np.interp(s, arc, vertices[:, 1])))
@@ -1,8 +1,11 @@
 """Pedestrian Dead Reckoning (PDR) engine."""
 
 import numpy as np
-from scipy.signal import find_peaks
-from typing import List, Tuple, Optional
+from scipy.ndimage import maximum_filter1d, minimum_filter1d
+from scipy.signal import find_peaks, lfilter
+from typing import Dict, List, Tuple, Optional
+
+WEINBERG_HALF_WINDOW = 15  # samples around each step peak
 
 
 def detect_steps(
@@ -35,6 +38,9 @@ def weinberg_stride_length(
     Weinberg model: stride_length = K * (a_max - a_min)^(1/4)
     Computed per step using a window around each step peak.
 
+    The window extrema come from one sliding max/min pass over the whole
+    signal, gathered at the step indices.
+
     Args:
         acc_magnitude: Accelerometer magnitude time series.
         step_indices: Detected step peak indices.
@@ -42,19 +48,17 @@ def weinberg_stride_length(
     Returns:
         Array of stride lengths for each step.
     """
-    strides = []
-    half_window = 15  # samples around peak
-
-    for idx in step_indices:
-        start = max(0, idx - half_window)
-        end = min(len(acc_magnitude), idx + half_window)
-        window = acc_magnitude[start:end]
-        a_max = np.max(window)
-        a_min = np.min(window)
-        stride = K * (a_max - a_min) ** 0.25
-        strides.append(stride)
+    step_indices = np.asarray(step_indices, dtype=int)
+    if len(step_indices) == 0:
+        return np.zeros(0)
 
-    return np.array(strides)
+    # A size-2h filter covers [i-h, i+h), the same window as slicing
+    # acc[idx-h:idx+h]; "nearest" padding matches clipping at the edges.
+    acc = np.asarray(acc_magnitude, dtype=float)
+    size = 2 * WEINBERG_HALF_WINDOW
+    a_max = maximum_filter1d(acc, size, mode="nearest")[step_indices]
+    a_min = minimum_filter1d(acc, size, mode="nearest")[step_indices]
+    return K * (a_max - a_min) ** 0.25
 
 
 def height_based_stride(user_height_m: float) -> float:
@@ -67,6 +71,7 @@ def complementary_filter(
     mag_heading: np.ndarray,
     dt: float,
     alpha: float = 0.98,
+    initial_heading: Optional[float] = None,
 ) -> np.ndarray:
     """
     Complementary filter for heading estimation.
@@ -78,19 +83,63 @@ def complementary_filter(
         mag_heading: Magnetometer-derived heading (rad).
         dt: Sampling period in seconds.
         alpha: Filter coefficient (0–1). Higher = more gyro trust.
+        initial_heading: Heading before the first sample, used to continue
+            a previous chunk. If None, heading[0] = mag_heading[0].
     Returns:
         Fused heading time series (rad).
     """
+    gyro_z = np.asarray(gyro_z, dtype=float)
+    mag_heading = np.asarray(mag_heading, dtype=float)
     n = len(gyro_z)
-    heading = np.zeros(n)
-    heading[0] = mag_heading[0]
+    if n == 0:
+        return np.zeros(0)
+
+    # The recurrence is a first-order IIR filter y[k] = alpha*y[k-1] + u[k]
+    # driven by u[k] = alpha*gyro_z[k]*dt + (1-alpha)*mag_heading[k].
+    u = alpha * dt * gyro_z + (1 - alpha) * mag_heading[:n]
+    if initial_heading is not None:
+        heading, _ = lfilter([1.0], [1.0, -alpha], u, zi=[alpha * initial_heading])
+        return heading
 
-    for i in range(1, n):
-        heading[i] = alpha * (heading[i - 1] + gyro_z[i] * dt) + (1 - alpha) * mag_heading[i]
+    # Fresh start: seeded with heading[0] = mag_heading[0]
+    heading = np.empty(n)
+    heading[0] = mag_heading[0]
+    heading[1:], _ = lfilter([1.0], [1.0, -alpha], u[1:], zi=[alpha * heading[0]])
 
     return heading
 
 
+def estimate_heading(
+    gyro_z: Optional[np.ndarray],
+    mag_heading: Optional[np.ndarray],
+    dt: float,
+    alpha: float = 0.98,
+    n: int = 0,
+    initial_heading: Optional[float] = None,
+) -> np.ndarray:
+    """
+    Heading time series from whichever sensors are available.
+
+    Gyro + magnetometer are fused with the complementary filter, gyro-only
+    integrates the yaw rate, magnetometer-only uses the heading as-is and no
+    sensors holds the previous heading (zero on a fresh start) for ``n``
+    samples. ``initial_heading`` continues the series from a previous chunk.
+    """
+    has_gyro = gyro_z is not None and len(gyro_z) > 0
+    has_mag = mag_heading is not None and len(mag_heading) > 0
+
+    if has_gyro and has_mag:
+        return complementary_filter(gyro_z, mag_heading, dt, alpha, initial_heading)
+    if has_gyro:
+        heading = np.cumsum(np.asarray(gyro_z, dtype=float) * dt)
+        if initial_heading is not None:
+            heading += initial_heading
+        return heading
+    if has_mag:
+        return np.asarray(mag_heading, dtype=float)
+    return np.full(n, initial_heading or 0.0)
+
+
 def compute_trajectory(
     step_indices: np.ndarray,
     stride_lengths: np.ndarray,
@@ -109,14 +158,222 @@ def compute_trajectory(
     Returns:
         List of (x, y) positions including the start.
     """
-    trajectory = [(start_x, start_y)]
-    x, y = start_x, start_y
+    step_indices = np.asarray(step_indices, dtype=int)
+    if len(step_indices) == 0:
+        return [(start_x, start_y)]
+
+    headings = np.asarray(headings, dtype=float)
+    stride_lengths = np.asarray(stride_lengths, dtype=float)
+
+    # Steps past the end of either series reuse its last value
+    h = headings[np.minimum(step_indices, len(headings) - 1)]
+    sl = stride_lengths[np.minimum(np.arange(len(step_indices)), len(stride_lengths) - 1)]
+
+    # Prepending the start keeps the summation order of a running x += dx
+    x = np.cumsum(np.concatenate(([start_x], sl * np.cos(h))))
+    y = np.cumsum(np.concatenate(([start_y], sl * np.sin(h))))
+    return list(zip(x.tolist(), y.tolist()))
+
+
+class PDRStream:
+    """
+    Incremental PDR engine for live tracking.
+
+    IMU samples are pushed in chunks; the stream keeps the heading filter
+    state, the candidate peaks whose fate is still open and a short pending
+    window so each chunk costs O(chunk) instead of re-processing the whole
+    walk.
+
+    Steps are exactly those of the batch pipeline (``detect_steps`` over
+    the whole walk). ``find_peaks`` keeps a candidate peak unless a higher,
+    kept candidate lies within ``peak_distance``, and that rule cascades:
+    a later, higher peak can suppress the peak that would have suppressed
+    an earlier one. So a candidate is only decided once every candidate
+    within ``peak_distance`` of it is known and every higher one among them
+    is decided; steps are emitted in order up to the first undecided
+    candidate, and once the Weinberg window after them has arrived. Steps
+    therefore trail the live edge by at least ``peak_distance`` samples
+    (more while a run of rising peaks is still open) until ``flush``.
+    Candidates of exactly equal height are ordered by position, the later
+    one first. ``find_peaks`` orders such ties with an unstable sort over
+    the whole walk, so on coarsely quantised signals an equal-height pair
+    within ``peak_distance`` can resolve differently from the batch.
+    """
+
+    def __init__(
+        self,
+        sampling_rate: float = 100.0,
+        peak_height: float = 1.0,
+        peak_distance: int = 30,
+        stride_method: str = "weinberg",
+        user_height_m: float = 1.75,
+        weinberg_K: float = 0.41,
+        complementary_alpha: float = 0.98,
+        start_x: float = 0.0,
+        start_y: float = 0.0,
+    ):
+        self.sampling_rate = sampling_rate
+        self.peak_height = peak_height
+        self.peak_distance = max(int(peak_distance), 1)
+        self.stride_method = stride_method
+        self.user_height_m = user_height_m
+        self.weinberg_K = weinberg_K
+        self.complementary_alpha = complementary_alpha
+
+        self.x = start_x
+        self.y = start_y
+        self.heading: Optional[float] = None   # heading at the last sample
+        self.sample_count = 0                  # samples pushed so far
+        self.step_count = 0
+        self.last_step = -self.peak_distance   # global index of last step
+
+        # Pending window: samples from global index ``_buf_start`` onwards
+        self._acc = np.zeros(0)
+        self._headings = np.zeros(0)
+        self._buf_start = 0
+        # Candidate peaks [global index, height, kept: True/False/None while
+        # undecided], in index order. Emitted ones stay while they can still
+        # suppress an open candidate.
+        self._cands: List[list] = []
+        self._emitted = 0                      # candidates in _cands already emitted
+        self._scanned_upto = 0                 # every peak before this index is in _cands
+
+    def push(
+        self,
+        acc_x: np.ndarray,
+        acc_y: np.ndarray,
+        acc_z: np.ndarray,
+        gyro_z: Optional[np.ndarray] = None,
+        mag_heading: Optional[np.ndarray] = None,
+    ) -> Dict[str, object]:
+        """Append one chunk of IMU samples and return the newly confirmed steps."""
+        acc = np.sqrt(
+            np.asarray(acc_x, dtype=float) ** 2 +
+            np.asarray(acc_y, dtype=float) ** 2 +
+            np.asarray(acc_z, dtype=float) ** 2
+        )
+        headings = estimate_heading(
+            gyro_z, mag_heading, 1.0 / self.sampling_rate,
+            self.complementary_alpha, len(acc), self.heading,
+        )
+        if len(acc):
+            self.heading = float(headings[-1])
+
+        self._acc = np.concatenate((self._acc, acc))
+        self._headings = np.concatenate((self._headings, headings))
+        self.sample_count += len(acc)
+        return self._emit(final=False)
+
+    @property
+    def confirmed_samples(self) -> int:
+        """Samples before this global index can no longer produce new steps."""
+        if self._emitted < len(self._cands):
+            return self._cands[self._emitted][0]
+        return self._scanned_upto
+
+    def flush(self) -> Dict[str, object]:
+        """Confirm every remaining peak (end of walk)."""
+        return self._emit(final=True)
+
+    def _scan(self, final: bool):
+        """Add the candidate peaks that became known with the new samples."""
+        offset = self._buf_start
+        n = len(self._acc)
+        if final:
+            known_end = offset + n
+        else:
+            # A trailing run of equal samples may still turn into a peak or
+            # plateau; every peak before its first sample is known.
+            run = n - 1
+            while run > 0 and self._acc[run - 1] == self._acc[run]:
+                run -= 1
+            known_end = offset + max(run, 0)
+        if n >= 3:
+            peaks, props = find_peaks(self._acc, height=self.peak_height)
+            for idx, height in zip((peaks + offset).tolist(), props["peak_heights"].tolist()):
+                if idx >= self._scanned_upto:
+                    self._cands.append([idx, height, None])
+        self._scanned_upto = max(self._scanned_upto, known_end)
+
+    def _decide(self, final: bool):
+        """Settle every open candidate whose neighbourhood is settled."""
+        d = self.peak_distance
+        cands = self._cands
+        open_ = [i for i in range(len(cands)) if cands[i][2] is None]
+        # Same order as find_peaks: highest first, equal heights later first
+        for i in sorted(open_, key=lambda i: (cands[i][1], cands[i][0]), reverse=True):
+            pos, height, _ = cands[i]
+            if not final and pos + d > self._scanned_upto:
+                continue                       # an unseen candidate could still be within d
+            fate = True
+            for j in range(i - 1, -1, -1):
+                if pos - cands[j][0] >= d:
+                    break
+                fate = self._fate_against(cands[j], height, pos, fate)
+            for j in range(i + 1, len(cands)):
+                if cands[j][0] - pos >= d:
+                    break
+                fate = self._fate_against(cands[j], height, pos, fate)
+            cands[i][2] = fate
+
+    @staticmethod
+    def _fate_against(other: list, height: float, pos: int, fate):
+        """Fold one neighbour into a candidate's fate (False wins, None blocks)."""
+        if fate is False or (other[1], other[0]) <= (height, pos):
+            return fate                        # already suppressed, or lower priority
+        if other[2] is True:
+            return False
+        if other[2] is None:
+            return None
+        return fate
+
+    def _emit(self, final: bool) -> Dict[str, object]:
+        self._scan(final)
+        self._decide(final)
+
+        offset = self._buf_start
+        new_steps = []
+        while self._emitted < len(self._cands):
+            pos, _, kept = self._cands[self._emitted]
+            if kept is None:
+                break
+            if kept:
+                # The Weinberg window around the step must have arrived
+                if not final and pos + WEINBERG_HALF_WINDOW > self.sample_count:
+                    break
+                new_steps.append(pos)
+            self._emitted += 1
+        new = np.array(new_steps, dtype=int)
+
+        if self.stride_method == "height":
+            sl = np.full(len(new), height_based_stride(self.user_height_m))
+        else:
+            sl = weinberg_stride_length(self._acc, new - offset, self.weinberg_K)
+
+        traj = compute_trajectory(new - offset, sl, self._headings, self.x, self.y)[1:]
+        step_headings = self._headings[np.minimum(new - offset, len(self._headings) - 1)]
+        if len(new):
+            self.x, self.y = traj[-1]
+            self.last_step = int(new[-1])
+            self.step_count += len(new)
+
+        # Forget emitted candidates that can no longer suppress an open one
+        frontier = self.confirmed_samples
+        drop = 0
+        while drop < self._emitted and self._cands[drop][0] <= frontier - self.peak_distance:
+            drop += 1
+        del self._cands[:drop]
+        self._emitted -= drop
 
-    for i, idx in enumerate(step_indices):
-        h = headings[idx] if idx < len(headings) else headings[-1]
-        sl = stride_lengths[i] if i < len(stride_lengths) else stride_lengths[-1]
-        x += sl * np.cos(h)
-        y += sl * np.sin(h)
-        trajectory.append((float(x), float(y)))
+        # Keep the window of the next step plus one sample of left context
+        keep_from = max(self._buf_start, frontier - WEINBERG_HALF_WINDOW - 1)
+        self._acc = self._acc[keep_from - offset:]
+        self._headings = self._headings[keep_from - offset:]
+        self._buf_start = keep_from
 
-    return trajectory
+        return {
+            "step_indices": new.tolist(),
+            "stride_lengths": sl.tolist(),
+            "headings": step_headings.tolist(),
+            "trajectory": [list(p) for p in traj],
+        }
@@ -0,0 +1,75 @@
+"""Propagation model – synthetic radio maps from AP positions, no survey.
+
+Predicted RSSI of an AP at distance d (meters) is the log-distance model
+
+    RSSI = P_tx − FSPL(1 m, f) − 10·n·log10(d) − W·walls
+
+with FSPL(1 m, f) = 20·log10(f_MHz) − 27.55, optionally counting the walls
+on the straight line from the AP in the floor occupancy grid. Rasters are
+int8 dBm in the same layout as densified maps, so they serve as a cold-start
+fingerprint database and as a baseline heatmap.
+"""
+
+import hashlib
+import json
+import numpy as np
+from typing import Dict, List
+
+DEFAULT_TX_POWER_DBM = 20.0
+DEFAULT_FREQUENCY_MHZ = 2437        # 2.4 GHz channel 6
+
+
+def reference_loss_db(frequency_mhz: np.ndarray) -> np.ndarray:
+    """Free-space path loss at 1 m."""
+    return 20.0 * np.log10(np.asarray(frequency_mhz, dtype=float)) - 27.55
+
+
+def predict_rssi(
+    aps: List[Dict[str, object]],
+    grid: np.ndarray,
+    path_loss_n: float = 2.2,
+    wall_loss_db: float = 5.0,
+    max_walls: int = 8,
+    floor_dbm: float = -100.0,
+    occupancy=None,
+) -> np.ndarray:
+    """
+    Predicted RSSI raster per AP.
+
+    Args:
+        aps: [{"x_m", "y_m", "tx_power_dbm", "frequency_mhz"}] – missing
+            power / frequency fall back to the defaults above.
+        grid: (G, 2) cell centres in meters.
+        occupancy: ``OccupancyGrid`` for wall attenuation (None = free space).
+    Returns:
+        (G, A) int8 dBm, clipped to [floor_dbm, 0].
+    """
+    grid = np.asarray(grid, dtype=float)
+    out = np.empty((len(grid), len(aps)), dtype=np.int8)
+    for j, ap in enumerate(aps):
+        tx = ap.get("tx_power_dbm")
+        freq = ap.get("frequency_mhz")
+        p0 = (DEFAULT_TX_POWER_DBM if tx is None else tx) - reference_loss_db(
+            DEFAULT_FREQUENCY_MHZ if freq is None else freq)
+
+        dx, dy = grid[:, 0] - ap["x_m"], grid[:, 1] - ap["y_m"]
+        rssi = p0 - 10.0 * path_loss_n * np.log10(np.maximum(np.hypot(dx, dy), 1.0))
+        if occupancy is not None and wall_loss_db:
+            walls = occupancy.count_wall_crossings(
+                np.full(len(grid), ap["x_m"]), np.full(len(grid), ap["y_m"]),
+                grid[:, 0], grid[:, 1],
+            )
+            rssi -= wall_loss_db * np.minimum(walls, max_walls)
+        out[:, j] = np.clip(np.rint(rssi), max(floor_dbm, -128), 0)
+    return out
+
+
+def config_hash(floor_key: tuple, aps: List[Dict[str, object]], params: Dict[str, object]) -> str:
+    """Stable key of everything a synthetic map depends on."""
+    ap_part = sorted(
+        (str(ap["bssid"]), float(ap["x_m"]), float(ap["y_m"]),
+         ap.get("tx_power_dbm"), ap.get("frequency_mhz"))
+        for ap in aps
+    )
+    blob = json.dumps([list(floor_key), ap_part, sorted(params.items())], default=str)
+    return hashlib.sha1(blob.encode()).hexdigest()[:16]
@@ -0,0 +1,107 @@
+"""In-memory live sessions with an idle timeout.
+
+Live PDR, fusion and map-matching sessions and the streaming DFP detectors
+all keep per-walker state in process memory between pushes. ``SessionStore``
+holds that state:
+
+  - One store-wide lock guards the table, so creating, looking up, evicting
+    and dropping sessions from concurrent threadpool requests is safe.
+  - Each session has its own lock, held by ``locked`` for the whole push,
+    so two chunks of the same walk are applied one after the other while
+    different sessions still run in parallel.
+  - Sessions idle for more than ``ttl_s`` seconds are evicted on the next
+    create or lookup.
+
+Dev-grade and single-process: sessions are not shared between workers and
+are lost on restart.
+"""
+
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from typing import Dict, Generic, Iterator, TypeVar
+
+T = TypeVar("T")
+
+
+class SessionNotFound(KeyError):
+    """Unknown, expired or already closed session id."""
+
+
+class _Entry(Generic[T]):
+    __slots__ = ("value", "lock", "last_seen", "closed")
+
+    def __init__(self, value: T, now: float):
+        self.value = value
+        self.lock = threading.Lock()
+        self.last_seen = now
+        self.closed = False
+
+
+class SessionStore(Generic[T]):
+    """Thread-safe ``{session_id: state}`` table with idle eviction."""
+
+    def __init__(self, ttl_s: float, label: str = "Session"):
+        self.ttl_s = ttl_s
+        self.label = label
+        self._entries: Dict[str, _Entry[T]] = {}
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._entries)
+
+    def _evict_idle(self, now: float):
+        """Drop idle sessions; caller holds ``_lock``."""
+        for sid in [s for s, e in self._entries.items() if now - e.last_seen > self.ttl_s]:
+            self._entries.pop(sid).closed = True
+
+    def create(self, value: T) -> str:
+        """Register a new session and return its id."""
+        now = time.time()
+        session_id = uuid.uuid4().hex
+        with self._lock:
+            self._evict_idle(now)
+            self._entries[session_id] = _Entry(value, now)
+        return session_id
+
+    def _entry(self, session_id: str) -> _Entry[T]:
+        now = time.time()
+        with self._lock:
+            self._evict_idle(now)
+            entry = self._entries.get(session_id)
+            if entry is None:
+                raise SessionNotFound(f"{self.label} not found or expired")
+            entry.last_seen = now
+            return entry
+
+    def get(self, session_id: str) -> T:
+        """Current state of a session (not locked – for read-only use)."""
+        return self._entry(session_id).value
+
+    @contextmanager
+    def locked(self, session_id: str, close: bool = False) -> Iterator[T]:
+        """
+        Hold the session's own lock while the caller mutates its state.
+
+        With ``close`` the session is dropped when the block exits, even on
+        error; pushes already waiting on the lock then see it as gone.
+        """
+        entry = self._entry(session_id)
+        with entry.lock:
+            if entry.closed:
+                raise SessionNotFound(f"{self.label} not found or expired")
+            try:
+                yield entry.value
+            finally:
+                entry.last_seen = time.time()
+                if close:
+                    self.discard(session_id)
+
+    def discard(self, session_id: str):
+        """Drop a session if present."""
+        with self._lock:
+            entry = self._entries.pop(session_id, None)
+        if entry is not None:
+            entry.closed = True
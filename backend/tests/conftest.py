@@ -0,0 +1,5 @@
+import sys
+from pathlib import Path
+
+# Tests import the backend modules the way the app does (``services.pdr``)
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
@@ -0,0 +1,38 @@
+import io
+import zipfile
+
+import numpy as np
+import pytest
+
+from services.array_io import check_arrays, decode_npz
+
+
+def _npz(**arrays) -> bytes:
+    buf = io.BytesIO()
+    np.savez(buf, **arrays)
+    return buf.getvalue()
+
+
+def test_npz_round_trip():
+    arrays = decode_npz(_npz(acc_x=np.arange(5.0), rssi=np.ones((3, 2))), max_bytes=1 << 20)
+    check_arrays(arrays, {"acc_x": 1, "rssi": 2})
+    assert arrays["rssi"].shape == (3, 2)
+
+
+@pytest.mark.parametrize("array, message", [
+    (np.array(["a", "b"]), "numeric"),
+    (np.ones((2, 2)), "1-D"),
+    (np.array([1 + 2j]), "numeric"),
+])
+def test_check_arrays_rejects_bad_fields(array, message):
+    with pytest.raises(ValueError, match=message):
+        check_arrays({"acc_x": array}, {"acc_x": 1})
+
+
+def test_npz_inflated_size_is_capped():
+    buf = io.BytesIO()
+    with zipfile.ZipFile(buf, "w", zipfile.ZIP_DEFLATED) as zf:
+        zf.writestr("acc_x.npy", b"\0" * (8 << 20))
+    assert len(buf.getvalue()) < 64 << 10
+    with pytest.raises(ValueError, match="inflates"):
+        decode_npz(buf.getvalue(), max_bytes=1 << 20)
@@ -0,0 +1,33 @@
+import numpy as np
+import pytest
+
+from services.analysis import ErrorSketch
+
+
+def _sketch(relative_accuracy=0.01) -> ErrorSketch:
+    return ErrorSketch(relative_accuracy).add(np.random.default_rng(0).exponential(2.0, 1000))
+
+
+def test_round_trip_and_merge():
+    a, b = _sketch(), _sketch()
+    merged = ErrorSketch.from_dict(a.to_dict()).merge(b)
+    assert merged.count == 2000
+    assert merged.quantile(0.5) == pytest.approx(a.quantile(0.5))
+
+
+def test_merge_refuses_different_accuracy():
+    with pytest.raises(ValueError, match="relative_accuracy"):
+        _sketch(0.01).merge(_sketch(0.02))
+
+
+@pytest.mark.parametrize("patch", [
+    {"offset": 10**15},
+    {"bins": [-1]},
+    {"min_value": 0.0},
+    {"count": 1},
+    {"sum": float("nan")},
+])
+def test_from_dict_rejects_corrupt_state(patch):
+    state = {**_sketch().to_dict(), **patch}
+    with pytest.raises(ValueError):
+        ErrorSketch.from_dict(state)
@@ -0,0 +1,37 @@
+import numpy as np
+import pytest
+
+from services.occupancy import OccupancyGrid
+from services.particle_filter import ParticleFilter
+
+
+def _corridor() -> OccupancyGrid:
+    walls = np.zeros((40, 1000), dtype=bool)      # 4 m × 100 m at 0.1 m cells
+    walls[0] = walls[-1] = True
+    return OccupancyGrid.from_walls(walls, 10.0, (0.0, 40.0))
+
+
+@pytest.mark.parametrize("n_particles", [500, 2000])
+def test_walls_keep_the_estimate_in_the_corridor(n_particles):
+    grid = _corridor()
+    pf = ParticleFilter(
+        n_particles=n_particles, start_x=2.0, start_y=2.0, init_heading_spread=0.5,
+        heading_drift=0.05, wall_check=grid.segments_cross_wall, seed=1,
+    )
+    pf.predict(np.full(120, 0.7), np.zeros(120))
+    est = pf.estimate()
+
+    assert pf.resample_count > 0
+    assert 0.1 < est["y"] < 3.9
+    assert est["std"] < 5.0
+    assert not grid.segments_cross_wall([est["x"]], [est["y"]], [est["x"]], [est["y"]])[0]
+
+
+def test_wall_check_rejects_non_finite_and_clips_far_segments():
+    grid = _corridor()
+    with pytest.raises(ValueError):
+        grid.segments_cross_wall(np.array([np.nan]), np.array([2.0]), np.array([1.0]), np.array([2.0]))
+    # A 1e12 m move leaves the grid: clipped, so no huge sample array
+    assert grid.segments_cross_wall(np.array([1.0]), np.array([2.0]), np.array([1e12]), np.array([2.0]))[0]
+    assert grid.count_wall_crossings(np.array([1.0]), np.array([2.0]), np.array([1.0]), np.array([1e12]))[0] == 1
+    assert not grid.segments_cross_wall(np.array([1.0]), np.array([2.0]), np.array([90.0]), np.array([2.5]))[0]
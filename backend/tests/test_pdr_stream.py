@@ -0,0 +1,57 @@
+import numpy as np
+import pytest
+
+from services.pdr import (
+    PDRStream, detect_steps, weinberg_stride_length, estimate_heading, compute_trajectory,
+)
+
+
+def _walk(n: int = 60_000, seed: int = 3):
+    rng = np.random.default_rng(seed)
+    t = np.arange(n) / 100.0
+    acc_x = rng.normal(0, 0.5, n)
+    acc_y = rng.normal(0, 0.5, n)
+    acc_z = 9.81 + 2.5 * np.sin(2 * np.pi * 1.8 * t) + rng.normal(0, 0.8, n)
+    gyro_z = rng.normal(0, 0.05, n)
+    return acc_x, acc_y, acc_z, gyro_z
+
+
+def _stream(chunk: int, acc_x, acc_y, acc_z, gyro_z):
+    stream = PDRStream()
+    steps, strides, traj = [], [], []
+    for i in range(0, len(acc_x), chunk):
+        sl = slice(i, i + chunk)
+        out = stream.push(acc_x[sl], acc_y[sl], acc_z[sl], gyro_z[sl])
+        steps += out["step_indices"]
+        strides += out["stride_lengths"]
+        traj += out["trajectory"]
+    out = stream.flush()
+    return stream, steps + out["step_indices"], strides + out["stride_lengths"], traj + out["trajectory"]
+
+
+@pytest.mark.parametrize("chunk", [1, 10, 50, 100, 997, 60_000])
+def test_stream_matches_batch(chunk):
+    acc_x, acc_y, acc_z, gyro_z = _walk()
+    acc = np.sqrt(acc_x**2 + acc_y**2 + acc_z**2)
+    steps = detect_steps(acc)
+    strides = weinberg_stride_length(acc, steps)
+    headings = estimate_heading(gyro_z, None, 0.01, n=len(acc))
+    traj = compute_trajectory(steps, strides, headings)
+
+    stream, s_steps, s_strides, s_traj = _stream(chunk, acc_x, acc_y, acc_z, gyro_z)
+
+    assert s_steps == steps.tolist()
+    assert np.allclose(s_strides, strides)
+    assert np.allclose(s_traj, traj[1:])
+    assert stream.step_count == len(steps)
+
+
+def test_stream_window_stays_bounded():
+    acc_x, acc_y, acc_z, gyro_z = _walk(20_000)
+    stream = PDRStream()
+    longest = 0
+    for i in range(0, len(acc_x), 10):
+        sl = slice(i, i + 10)
+        stream.push(acc_x[sl], acc_y[sl], acc_z[sl], gyro_z[sl])
+        longest = max(longest, len(stream._acc))
+    assert longest < 300
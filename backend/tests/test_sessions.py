@@ -0,0 +1,44 @@
+import threading
+import time
+
+import pytest
+
+from sessions import SessionStore, SessionNotFound
+
+
+def test_pushes_to_one_session_are_serialised():
+    store = SessionStore(60.0)
+    sid = store.create([])
+    active = []
+
+    def push(i):
+        with store.locked(sid) as log:
+            active.append(i)
+            assert len(active) == 1
+            time.sleep(0.001)
+            log.append(i)
+            active.pop()
+
+    threads = [threading.Thread(target=push, args=(i,)) for i in range(16)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert sorted(store.get(sid)) == list(range(16))
+
+
+def test_close_and_idle_eviction():
+    store = SessionStore(60.0, "Walk")
+    sid = store.create(1)
+    with store.locked(sid, close=True) as value:
+        assert value == 1
+    with pytest.raises(SessionNotFound, match="Walk not found"):
+        store.get(sid)
+
+    store.ttl_s = 0.0
+    sid = store.create(2)
+    time.sleep(0.01)
+    store.create(3)                             # evicts the idle session
+    assert len(store) == 1
+    with pytest.raises(SessionNotFound):
+        store.get(sid)